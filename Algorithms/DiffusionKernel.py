@@ -3,54 +3,199 @@ sys.path.insert(1, '../Imports/')
 # Insert relative paths for calls from run.py
 sys.path.insert(1, 'Imports/')
 from CacheUtils import compute_if_not_cached
-from GraphUtils import format_output
-import networkx as nx
 import numpy as np
 import loader
-import csv
+import ResultsStore
+import Operators
+import ParallelSpmv
+import OutOfCore
+import QueryCache
+import NetworkProfile
+from ArgUtils import pop_option
 
+CHEBYSHEV_TOLERANCE = 1e-8
 
-def symmetric_eigen_from_graph(ppiGraph):
-    L = nx.laplacian_matrix(ppiGraph).todense()
-    return np.linalg.eigh(L)
 
+def component_eigen_from_graph(ppiGraph):
+    """
+    Eigendecomposition of the laplacian, one connected component at a time (the laplacian is block diagonal over them),
+    which costs the sum of the cubes of the component sizes instead of the cube of the network size.
+
+    @returns: (component label of every node, list of (node indexes, eigenvalues, eigenvectors) per component)
+    """
+    operators = Operators.load_operators(ppiGraph)
+    labels = operators.component_labels()
+    order = np.argsort(labels, kind="stable")
+    bounds = np.searchsorted(labels[order], np.arange(operators._numComponents + 1))
+    components = []
+    for c in range(operators._numComponents):
+        nodes = order[bounds[c]:bounds[c + 1]]
+        vals, vecs = np.linalg.eigh(operators.laplacian[nodes][:, nodes].toarray())
+        components.append((nodes, vals, vecs))
+    return labels, components
+
+
+def laplacian_spectral_bound(L):
+    # Gershgorin: every eigenvalue of L = D - A lies in [0, 2 * max degree]
+    return 2 * np.max(L.diagonal())
+
+
+def network_spectral_bound(ppiGraph, L):
+    # Gershgorin bound of L (the laplacian of ppiGraph or of some of its components), or the bound from the
+    # network profile (see NetworkProfile.py) if one is saved and it is lower
+    bound = laplacian_spectral_bound(L)
+    profileBound = NetworkProfile.spectral_bound(ppiGraph.name)
+    return bound if profileBound is None else min(bound, profileBound)
+
+
+def chebyshev_coefficients(beta, bound, tol=CHEBYSHEV_TOLERANCE):
+    """
+    Chebyshev coefficients of exp(-beta * x) on [0, bound], truncated once the remaining terms sum to less than tol.
+    With x = bound/2 * (y + 1), exp(-beta x) = exp(-a) exp(-a y) where a = beta * bound / 2, and
+    exp(-a y) = I_0(a) + 2 * sum_k (-1)^k I_k(a) T_k(y) (I_k = modified Bessel functions).
+    ive(k, a) = I_k(a) exp(-a) keeps everything finite for large a.
+
+    @returns: numpy array of coefficients c_0..c_K
+    """
+    from scipy.special import ive
+    a = beta * bound / 2
+    maxOrder = int(a + 20*np.sqrt(a + 1) + 50)
+    coefficients = 2 * ive(np.arange(maxOrder + 1), a)
+    coefficients[0] /= 2
+    coefficients[1::2] *= -1
+    # tail[K] = sum of |c_k| for k > K, an upper bound on the truncation error since |T_k| <= 1
+    tail = np.append(np.cumsum(np.abs(coefficients)[::-1])[::-1][1:], 0)
+    order = int(np.argmax(tail < tol))
+    return coefficients[:order + 1]
+
+
+def diffusion_kernel_chebyshev(L, genes, betas, tol=CHEBYSHEV_TOLERANCE, bound=None):
+    """
+    Approximates exp(-beta L) applied to genes with a truncated Chebyshev expansion, using only sparse mat-vecs.
+    All betas share the same Chebyshev basis vectors T_k(L) genes, so extra betas only cost the extra terms.
+
+    @param L: scipy sparse laplacian of the PPI network (or anything with a dot(), e.g. a ParallelSpmv.ParallelOperator)
+    @param genes: start vector, or N x k matrix of start vectors
+    @param betas: list of beta values
+    @param tol: maximum truncation error (relative to the norm of genes); the order is picked from beta and tol
+    @param bound: upper bound on the largest eigenvalue of L, Gershgorin bound if None
+
+    @returns: list with one score vector (or matrix) per beta
+    """
+    if bound is None:
+        bound = laplacian_spectral_bound(L)
+    coefficients = [chebyshev_coefficients(beta, bound, tol) for beta in betas]
+    order = max(len(c) for c in coefficients) - 1
+    print("Chebyshev expansion of order", order, "spectral bound", bound)
+
+    # shifted laplacian with spectrum in [-1, 1]: M = 2 L / bound - I
+    def shifted(x):
+        return (2.0 / bound) * L.dot(x) - x
+
+    previous = np.array(genes, dtype=np.float64)
+    results = [c[0] * previous for c in coefficients]
+    if order == 0:
+        return results
+    current = shifted(previous)
+    for k in range(1, order + 1):
+        for result, c in zip(results, coefficients):
+            if k < len(c):
+                result += c[k] * current
+        if k < order:
+            previous, current = current, 2 * shifted(current) - previous
+    return results
+
+
+def diffusion_kernel_scores(ppiGraph, genes, beta, method="eigh", ordering=None):
+    # genes is either a start vector or an N x k matrix with one start vector per column
+    # ordering: node reordering of the sparse laplacian used by the chebyshev method (see Operators.py)
+    if method == "chebyshev":
+        return diffusion_kernel_scores_for_betas(ppiGraph, genes, [beta], ordering)[0]
 
-def diffusion_kernel_core(ppiGraph, genes, beta):
     # Compute matrix exponential with eigen decomposition
     # Faster since it uses the fact that the matrix is real, symetric
+    labels, components = compute_if_not_cached(component_eigen_from_graph, ppiGraph, fileName=ppiGraph.name)
+    genes = np.asarray(genes, dtype=np.float64)
+    scores = np.zeros(genes.shape)
+    seeded = genes != 0 if genes.ndim == 1 else np.any(genes != 0, axis=1)
+    # components without seed genes score zero, only the seeded ones are computed
+    for c in np.unique(labels[seeded]):
+        nodes, vals, vecs = components[c]
+        # exp(-beta L) = P exp(-beta D) P^T, applied to the genes without forming the N x N kernel
+        projected = np.dot(np.transpose(vecs), genes[nodes])
+        if projected.ndim == 1:
+            projected = np.exp(-beta*vals) * projected
+        else:
+            projected = np.exp(-beta*vals)[:, np.newaxis] * projected
+        scores[nodes] = np.dot(vecs, projected)
+    return scores
+
+
+def diffusion_kernel_scores_for_betas(ppiGraph, genes, betas, ordering=None):
+    # Scores for several betas from one shared Chebyshev recurrence, e.g. for a beta sweep
+    if isinstance(ppiGraph, OutOfCore.OutOfCoreNetwork):
+        # laplacian streamed from disk, see OutOfCore.py
+        return diffusion_kernel_chebyshev(ppiGraph.laplacian, genes, betas, bound=network_spectral_bound(ppiGraph, ppiGraph.laplacian))
+    # only the connected components that hold a seed are expanded, the others score zero
+    operators = Operators.load_operators(ppiGraph, ordering)
+    genes = operators.permute(genes)
+    rows = operators.seeded_rows(genes)
+    if rows is not None and len(rows) == 0:
+        # no seed in the network: every score is zero, as with the eigh method
+        return [np.zeros(np.shape(genes)) for _ in betas]
+    results = diffusion_kernel_chebyshev(operators.parallel("laplacian", rows), operators.restrict(genes, rows), betas,
+                                         bound=network_spectral_bound(ppiGraph, operators.restricted_matrix("laplacian", rows)))
+    return [operators.unpermute(operators.expand(result, rows)) for result in results]
 
-    vals, vecs = compute_if_not_cached(symmetric_eigen_from_graph, ppiGraph, fileName=ppiGraph.name)
-    result = np.dot(np.dot(np.dot(genes, np.transpose(vecs)),
-                           np.diag(np.exp(-beta*vals))), vecs)
-    result = np.array(result).flatten()
-    return format_output(ppiGraph, result)
+
+def diffusion_kernel_core(ppiGraph, genes, beta, method="eigh", ordering=None):
+    params = {"beta": beta, "method": method, "ordering": ordering}
+    return QueryCache.DEFAULT_CACHE.output("dk", ppiGraph, [genes], params,
+                                           lambda: diffusion_kernel_scores(ppiGraph, genes, beta, method, ordering))
 
 # Standard Wrapper Function
+# method: "eigh" (exact, O(n^3) eigendecomposition, cached) or "chebyshev" (sparse polynomial approximation)
+# Repeated queries are answered from the query cache (see QueryCache.py).
 
 
-def diffusion_kernel(ppiGraph, diseaseGenes, beta=1):
+def diffusion_kernel(ppiGraph, diseaseGenes, beta=1, method="eigh", ordering=None):
     print("running diffusion kernel..")
-    return diffusion_kernel_core(ppiGraph, diseaseGenes, beta)
+    return diffusion_kernel_core(ppiGraph, diseaseGenes, beta, method, ordering)
 
 
 if __name__ == '__main__':
 
+    # Optional arguments: --method eigh|chebyshev, --order rcm|degree|community, --threads N,
+    #                     --engine outofcore (chebyshev on a laplacian streamed from disk), --memory MB,
+    #                     --no-cache (always recompute, see QueryCache.py)
+    ParallelSpmv.threads_option(sys.argv)
+    cache = QueryCache.cache_option(sys.argv)
+    method = pop_option(sys.argv, "--method", "eigh")
+    ordering = pop_option(sys.argv, "--order")
+    engine = pop_option(sys.argv, "--engine", "dense")
+    memoryBudget = OutOfCore.memory_option(sys.argv)
+    if engine == "outofcore":
+        method = "chebyshev"
     pathToPPINetworkFile = sys.argv[1]
     pathToDiseaseGeneFile = sys.argv[2]
     beta = float(sys.argv[3])
     outputFile = sys.argv[4]
 
     print("loading data from files..")
-    ppiGraph = compute_if_not_cached(
-        loader.load_graph, pathToPPINetworkFile, fileName=pathToPPINetworkFile)
+    ppiGraph = OutOfCore.load_graph(pathToPPINetworkFile, engine, memoryBudget)
     diseaseGenes = loader.load_start_vector(pathToDiseaseGeneFile, ppiGraph)
 
-    results = diffusion_kernel(ppiGraph, diseaseGenes, beta)
+    print("running diffusion kernel..")
+    params = {"beta": beta, "method": method, "ordering": ordering}
+    scores = cache.scores("dk", ppiGraph, [diseaseGenes], params,
+                          lambda: diffusion_kernel_scores(ppiGraph, diseaseGenes, beta, method, ordering))
 
-    print("Saving results to", outputFile)
-    with open(outputFile, "w", newline='') as of:
-        outputWriter = csv.writer(of, quoting=csv.QUOTE_ALL)
-        outputWriter.writerow(["Gene", "Ranking"])
-        for row in results:
-            outputWriter.writerow(row)
+    metadata = {"algorithm": "dk", "network": pathToPPINetworkFile,
+                "diseaseGenes": pathToDiseaseGeneFile, "params": {"beta": beta, "method": method, "engine": engine}}
+    runId = ResultsStore.save_ranking(list(ppiGraph.nodes()), scores, metadata)
+    print("Saved run", runId, "to", ResultsStore.DEFAULT_STORE_PATH)
+    if outputFile.endswith(".csv"):
+        print("Saving results to", outputFile)
+        ResultsStore.export_csv(runId, outputFile)
+    cache.report()
     print("done.")
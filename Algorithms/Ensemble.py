@@ -0,0 +1,197 @@
+"""
+Ensemble of random walk with restart, PageRank and the diffusion kernel, fused into one ranking.
+
+All three algorithms run on one set of shared sparse operators (see Operators.py). Random walk and PageRank are the
+same fixed point x = d W x + offset on the normalized adjacency matrix, so they are solved together as the columns of
+one multi-column solve (with a damping factor per column), and the diffusion kernel is a Chebyshev expansion on the
+laplacian of the same operators. The scores are fused from their ranks (see Fusion.py).
+
+With learned fusion a random fraction of the disease genes is held out: training versions of the start vectors are
+added as extra columns to the same solves, and every algorithm is weighted by how well it ranked the held out genes.
+"""
+import sys
+sys.path.insert(1, '../Imports/')
+sys.path.insert(1, '../Algorithms/')
+# Insert relative paths for calls from run.py
+sys.path.insert(1, 'Imports/')
+sys.path.insert(1, 'Algorithms/')
+import csv
+import time
+import numpy as np
+import DiffusionKernel as dk
+import PageRank as pr
+import DiseaseSets
+import Evaluation
+import Fusion
+import Operators
+import OutOfCore
+import ParallelSpmv
+import ResultsStore
+import Solvers
+import StringNameConverter as snc
+import loader
+from ArgUtils import pop_option
+
+ALGORITHMS = ["rwr", "pr", "dk"]
+DEFAULT_PARAMS = {"rwr": 0.4, "pr": pr.BETA, "dk": 1.0}
+HOLDOUT_FRACTION = 0.2
+MAX_ITERATIONS = 500
+NORM_THRESHOLD = 10**(-6)
+
+
+def shared_operators(graph, ordering=None):
+    """
+    The normalized adjacency and laplacian operators of a graph with their permutations, built (or loaded) once.
+
+    @returns: (normalized, laplacian, spectral bound of the laplacian, permute, unpermute)
+    """
+    if isinstance(graph, OutOfCore.OutOfCoreNetwork):
+        def identity(vector):
+            return vector
+        return graph.normalized, graph.laplacian, dk.network_spectral_bound(graph, graph.laplacian), identity, identity
+    operators = Operators.load_operators(graph, ordering)
+    return (operators.parallel("normalized"), operators.parallel("laplacian"), dk.network_spectral_bound(graph, operators.laplacian),
+            operators.permute, operators.unpermute)
+
+
+def ensemble_scores(graph, startVectors, priorBias, params=DEFAULT_PARAMS, ordering=None, solver="fixed"):
+    """
+    Scores of all three algorithms from shared operators.
+
+    @param graph: CompactGraph (or OutOfCore.OutOfCoreNetwork) of the PPI network
+    @param startVectors: N x k matrix of start vectors, one column per seed set (e.g. all seeds and training seeds)
+    @param priorBias: N x k matrix of PageRank prior bias vectors, matching startVectors
+    @param params: dict with the restart probability "rwr", the PageRank beta "pr" and the diffusion kernel beta "dk"
+    @param ordering, solver: node reordering and iterative solver, see RandomWalk.random_walk_scores()
+
+    @returns: dict of algorithm name -> N x k score matrix, in graph.nodes() order
+    """
+    normalized, laplacian, bound, permute, unpermute = shared_operators(graph, ordering)
+    start = permute(np.asarray(startVectors, dtype=np.float64))
+    priors = permute(np.asarray(priorBias, dtype=np.float64))
+    k = start.shape[1]
+
+    # random walk (x = (1 - R) W x + R s) and PageRank (x = (1 - beta) W x + beta p, from s) side by side
+    startTime = time.time()
+    damping = np.concatenate([np.full(k, 1 - params["rwr"]), np.full(k, 1 - params["pr"])])
+    offset = np.hstack([params["rwr"] * start, params["pr"] * priors])
+    walks, iterations = Solvers.solve(normalized, damping, offset, np.hstack([start, start]), NORM_THRESHOLD, MAX_ITERATIONS, solver)
+    print("time for rwr and pr:", time.time() - startTime)
+
+    startTime = time.time()
+    kernel = dk.diffusion_kernel_chebyshev(laplacian, start, [params["dk"]], bound=bound)[0]
+    print("time for dk:", time.time() - startTime)
+    return {"rwr": unpermute(walks[:, :k]), "pr": unpermute(walks[:, k:]), "dk": unpermute(kernel)}
+
+
+def learned_weights(scores, seedIndexes, heldout):
+    """
+    Weights from the training columns (column 1) of the ensemble scores: the mean reciprocal rank of the held out
+    genes among all proteins that were not training seeds.
+    """
+    candidates = np.ones(scores["rwr"].shape[0], dtype=bool)
+    candidates[np.delete(seedIndexes, heldout)] = False
+    heldoutRanks = [Evaluation.heldout_ranks(scores[name][:, 1], seedIndexes[heldout], candidates) for name in ALGORITHMS]
+    for name, ranks in zip(ALGORITHMS, heldoutRanks):
+        print("held out genes,", name, "mean reciprocal rank:", np.mean(1/ranks))
+    return Fusion.learn_weights(heldoutRanks)
+
+
+def ensemble(graph, startVector, priorBias, params=DEFAULT_PARAMS, fusion="rank", weights=None, ordering=None, solver="fixed"):
+    """
+    Runs all three algorithms and fuses their scores.
+
+    @param startVector: start vector of the disease genes
+    @param priorBias: PageRank prior bias vector
+    @param fusion: "rank", "borda" or "learned", see Fusion.py
+    @param weights: optional weights of rwr, pr and dk for rank and borda fusion (learned fusion computes its own)
+
+    @returns: (fused score vector, N x 3 matrix of rwr, pr and dk scores, weights used)
+    """
+    startVectors = np.asarray(startVector, dtype=np.float64)[:, np.newaxis]
+    priors = np.asarray(priorBias, dtype=np.float64)[:, np.newaxis]
+    seedIndexes = np.flatnonzero(startVectors[:, 0] > 0)
+    heldout = None
+    if fusion == "learned":
+        heldout = Evaluation.random_splits(len(seedIndexes), HOLDOUT_FRACTION, 1)[0]
+        training = np.zeros_like(startVectors)
+        training[np.delete(seedIndexes, heldout)] = 1
+        startVectors = np.hstack([startVectors, Evaluation.normalize_columns(training)])
+        priors = np.hstack([priors, Evaluation.normalize_columns(priors * training)])
+
+    scores = ensemble_scores(graph, startVectors, priors, params, ordering, solver)
+    if heldout is not None:
+        weights = learned_weights(scores, seedIndexes, heldout)
+    columns = np.column_stack([scores[name][:, 0] for name in ALGORITHMS])
+    if weights is not None:
+        weights = Fusion.normalize_weights(weights, len(ALGORITHMS))
+        print("fusion weights:", dict(zip(ALGORITHMS, weights.tolist())))
+    return Fusion.fuse(columns, fusion, weights), columns, weights
+
+
+def write_ensemble_csv(graph, fused, columns, outputFile):
+    """
+    Writes the fused ranking with one extra column of raw scores per algorithm.
+    """
+    table = snc.load_lookup_table()
+    nodes = list(graph.nodes())
+    with open(outputFile, "w", newline='') as of:
+        outputWriter = csv.writer(of, quoting=csv.QUOTE_ALL)
+        outputWriter.writerow(["Gene", "Name", "Fused"] + ALGORITHMS)
+        for i in np.argsort(-fused, kind="stable"):
+            outputWriter.writerow([nodes[i], snc.string_to_name(table, nodes[i]), fused[i]] + list(columns[i]))
+
+
+def main():
+    """
+    Runs the ensemble from the command line:
+        python3 Algorithms/Ensemble.py ppi-file disease-gene-file priors-file output-file
+    priors-file may be the disease gene file itself for a uniform prior bias.
+    Optional arguments: --fusion rank|borda|learned, --weights w_rwr,w_pr,w_dk, --r R, --beta BETA, --dk-beta BETA,
+    --engine sparse|outofcore, --memory MB, --order rcm|degree|community, --threads N, --solver fixed|aitken|anderson
+    Saves the fused and the per algorithm rankings to the results store, and the fused ranking with the per algorithm
+    scores as a .csv file if the output file path ends in .csv.
+    """
+    ParallelSpmv.threads_option(sys.argv)
+    fusion = pop_option(sys.argv, "--fusion", "rank")
+    weights = pop_option(sys.argv, "--weights", None, lambda value: [float(w) for w in value.split(",")])
+    params = {"rwr": pop_option(sys.argv, "--r", DEFAULT_PARAMS["rwr"], float),
+              "pr": pop_option(sys.argv, "--beta", DEFAULT_PARAMS["pr"], float),
+              "dk": pop_option(sys.argv, "--dk-beta", DEFAULT_PARAMS["dk"], float)}
+    engine = pop_option(sys.argv, "--engine", "sparse")
+    ordering = pop_option(sys.argv, "--order")
+    solver = pop_option(sys.argv, "--solver", "fixed")
+    memoryBudget = OutOfCore.memory_option(sys.argv)
+    pathToPPINetworkFile = sys.argv[1]
+    pathToDiseaseGeneFile = sys.argv[2]
+    pathToPriorBiasFile = sys.argv[3]
+    outputFile = sys.argv[4]
+    if fusion not in Fusion.FUSION_METHODS:
+        print("Unknown fusion method", fusion, "- use one of", Fusion.FUSION_METHODS)
+        sys.exit(1)
+
+    print("loading data from files..")
+    ppiGraph = OutOfCore.load_graph(pathToPPINetworkFile, engine, memoryBudget)
+    diseaseGenes = loader.load_start_vector(pathToDiseaseGeneFile, ppiGraph)
+    priorBias = DiseaseSets.load_priors_vector(pathToPriorBiasFile, ppiGraph)
+
+    fused, columns, weights = ensemble(ppiGraph, diseaseGenes, priorBias, params, fusion, weights, ordering, solver)
+
+    nodes = list(ppiGraph.nodes())
+    metadata = {"algorithm": "ensemble", "network": pathToPPINetworkFile, "diseaseGenes": pathToDiseaseGeneFile,
+                "priors": pathToPriorBiasFile, "params": {"fusion": fusion, "engine": engine, "solver": solver,
+                                                          "weights": None if weights is None else [float(w) for w in weights], **params}}
+    runId = ResultsStore.save_ranking(nodes, fused, metadata)
+    for j, name in enumerate(ALGORITHMS):
+        ResultsStore.save_ranking(nodes, columns[:, j], {"algorithm": name, "network": pathToPPINetworkFile,
+                                                         "diseaseGenes": pathToDiseaseGeneFile, "params": {"param": params[name]},
+                                                         "ensemble": runId})
+    print("Saved run", runId, "to", ResultsStore.DEFAULT_STORE_PATH)
+    if outputFile.endswith(".csv"):
+        print("Saving results to", outputFile)
+        write_ensemble_csv(ppiGraph, fused, columns, outputFile)
+    print("done.")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,11 +4,16 @@ sys.path.insert(1, '../Imports/')
 # Insert relative paths for calls from run.py
 sys.path.insert(1, 'Imports/')
 import loader
-import networkx as nx
-import csv
 import numpy as np
-from scipy.spatial import distance
 import GraphUtils
+import ResultsStore
+import Operators
+import ParallelSpmv
+import Solvers
+import OutOfCore
+import QueryCache
+import TargetScoring
+from ArgUtils import pop_option
 from CacheUtils import compute_if_not_cached
 
 BETA = 0.4
@@ -16,28 +21,51 @@ EPSILON = .000001  # 10^(-6)
 
 def compute_matrix(graph):
     return np.asarray(GraphUtils.normalize_adjacency_matrix(
-        nx.to_numpy_matrix(graph)))
+        GraphUtils.dense_adjacency_matrix(graph)))
 
 # Given a np.array matrix, starting vector, prior bias vector, and back
 # probability, calculate the rank of each node in the graph.
-def rank_genes(graph, startingVector, priorBias, beta):
+# startingVector and priorBias may also be N x k matrices, one column per
+# disease gene set, which are all ranked in the same loop.
+# engine "sparse" uses the shared sparse operators (see Operators.py), optionally
+# with the nodes reordered for cache locality and the mat-vecs split over the
+# --threads setting (see ParallelSpmv.py); results are always returned in
+# graph.nodes() order.
+# solver picks the iterative solver ("fixed", "aitken" or "anderson", see Solvers.py)
+# and x0 is an optional warm start, e.g. the result for a neighbouring beta.
+# With topK the loop runs until the top topK genes and their order are certified
+# (see Solvers.TopKCertificate) instead of until EPSILON; lower scores are then
+# only approximate.
+# engine "outofcore" streams the operator of an OutOfCore.OutOfCoreNetwork from disk.
+def rank_genes(graph, startingVector, priorBias, beta, engine="dense", ordering=None, solver="fixed", x0=None, topK=None):
     print("Starting PageRank")
 
+    if engine == "outofcore":
+        return rank_genes_matrix(graph.normalized, startingVector, priorBias, beta, solver, x0, topK)
+
+    if engine == "sparse":
+        # only the connected components with prior bias are propagated, the others score zero
+        operators = Operators.load_operators(graph, ordering)
+        priors = operators.permute(priorBias)
+        rows = operators.seeded_rows(priors)
+        if x0 is not None:
+            x0 = operators.restrict(operators.permute(x0), rows)
+        result = rank_genes_matrix(operators.parallel("normalized", rows), operators.restrict(operators.permute(startingVector), rows),
+                                   operators.restrict(priors, rows), beta, solver, x0, topK)
+        return operators.unpermute(operators.expand(result, rows))
+
     # Load matrix from pickled object if exists to save time converting file.
     matrix = compute_if_not_cached(compute_matrix, graph, fileName=graph.name)
+    return rank_genes_matrix(matrix, startingVector, priorBias, beta, solver, x0, topK)
 
-    d = float('inf')
-    prevVector = np.copy(startingVector)
-    iterations = 0
-    while d > EPSILON:
-        result = (1 - beta) * np.matmul(matrix, prevVector)
-        result = np.add(result, beta*priorBias)
-        d = distance.sqeuclidean(result, prevVector)
-        prevVector = result
-        iterations += 1
-        print("finished iteration:", iterations)
+
+def rank_genes_matrix(matrix, startingVector, priorBias, beta, solver="fixed", x0=None, topK=None):
+    # x = (1 - beta) W x + beta * priorBias, starting from startingVector (or x0)
+    if x0 is None:
+        x0 = startingVector
+    result, iterations = Solvers.solve(matrix, 1 - beta, beta * np.asarray(priorBias), x0, EPSILON, None, solver, topK)
     print("Finished PageRank")
-    return prevVector
+    return result
 
 
 def load_priors(priorsFile, graph):
@@ -51,7 +79,7 @@ def load_priors(priorsFile, graph):
             if len(splitting) == 2:
                 splitting[1] = int(splitting[1])
             proteinList.append(splitting)
-    listOfNodes = list(graph.nodes)
+    listOfNodes = list(graph.nodes())
     for protein in proteinList:
         index = listOfNodes.index(protein[0])
         if len(protein) == 1:
@@ -64,12 +92,26 @@ def load_priors(priorsFile, graph):
     return priorBias
 
 
-def page_rank(graph, startVector, priorBias, beta=BETA):
-    return GraphUtils.format_output(graph, rank_genes(graph, startVector, priorBias, beta))
+# Repeated queries are answered from the query cache (see QueryCache.py).
+def page_rank(graph, startVector, priorBias, beta=BETA, engine="dense", ordering=None, solver="fixed", topK=None):
+    params = {"beta": beta, "engine": engine, "ordering": ordering, "solver": solver, "topK": topK}
+    return QueryCache.DEFAULT_CACHE.output("pr", graph, [startVector, priorBias], params,
+                                           lambda: rank_genes(graph, startVector, priorBias, beta, engine, ordering, solver, topK=topK))
 
 
 def main():
-    
+    # Optional arguments: --engine dense|sparse|outofcore, --order rcm|degree|community, --threads N,
+    #                     --solver fixed|aitken|anderson, --top-k K, --memory MB (out-of-core memory budget),
+    #                     --no-cache (always propagate, see QueryCache.py),
+    #                     --targets file (score only the candidate proteins in file, see TargetScoring.py)
+    ParallelSpmv.threads_option(sys.argv)
+    cache = QueryCache.cache_option(sys.argv)
+    engine = pop_option(sys.argv, "--engine", "dense")
+    ordering = pop_option(sys.argv, "--order")
+    solver = pop_option(sys.argv, "--solver", "fixed")
+    topK = pop_option(sys.argv, "--top-k", None, int)
+    memoryBudget = OutOfCore.memory_option(sys.argv)
+    pathToTargetFile = pop_option(sys.argv, "--targets")
     pathToPPINetworkFile = sys.argv[1]
     pathToDiseaseGeneFile = sys.argv[2]
     pathToPriorBiasFile = sys.argv[3]
@@ -77,18 +119,28 @@ def main():
     outputFile = sys.argv[5]
 
     print("loading data from files..")
-    ppiGraph = compute_if_not_cached(
-        loader.load_graph, pathToPPINetworkFile, fileName=pathToPPINetworkFile)
+    ppiGraph = OutOfCore.load_graph(pathToPPINetworkFile, engine, memoryBudget)
     diseaseGenes = loader.load_start_vector(pathToDiseaseGeneFile, ppiGraph)
     priorBias = load_priors(pathToPriorBiasFile, ppiGraph)
-    results = page_rank(ppiGraph, diseaseGenes,priorBias, beta)
-
-    print("Saving results to", outputFile)
-    with open(outputFile, "w", newline='') as of:
-        outputWriter = csv.writer(of, quoting=csv.QUOTE_ALL)
-        outputWriter.writerow(["Gene", "Ranking"])
-        for row in results:
-            outputWriter.writerow(row)
+    metadata = {"algorithm": "pr", "network": pathToPPINetworkFile, "diseaseGenes": pathToDiseaseGeneFile,
+                "priors": pathToPriorBiasFile, "params": {"beta": beta, "engine": engine, "solver": solver, "topK": topK}}
+    if pathToTargetFile is not None:
+        nodes, targets = TargetScoring.load_targets(pathToTargetFile, ppiGraph)
+        scores = TargetScoring.page_rank_targets(ppiGraph, priorBias, targets, beta)
+        metadata["targets"] = pathToTargetFile
+        metadata["params"] = {"beta": beta, "tol": TargetScoring.TOLERANCE}
+    else:
+        params = {"beta": beta, "engine": engine, "ordering": ordering, "solver": solver, "topK": topK}
+        nodes = list(ppiGraph.nodes())
+        scores = cache.scores("pr", ppiGraph, [diseaseGenes, priorBias], params,
+                              lambda: rank_genes(ppiGraph, diseaseGenes, priorBias, beta, engine, ordering, solver, topK=topK))
+
+    runId = ResultsStore.save_ranking(nodes, scores, metadata)
+    print("Saved run", runId, "to", ResultsStore.DEFAULT_STORE_PATH)
+    if outputFile.endswith(".csv"):
+        print("Saving results to", outputFile)
+        ResultsStore.export_csv(runId, outputFile)
+    cache.report()
     print("done.")
 
 
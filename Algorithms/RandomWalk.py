@@ -2,11 +2,17 @@ import sys
 sys.path.insert(1, '../Imports/')
 # Insert relative paths for calls from run.py
 sys.path.insert(1, 'Imports/')
-from scipy.spatial import distance
 import numpy as np
-import csv
-import networkx as nx
 import GraphUtils
+import ResultsStore
+import Operators
+import ParallelSpmv
+import Solvers
+import OutOfCore
+import LowRank
+import TargetScoring
+import QueryCache
+from ArgUtils import pop_option
 from CacheUtils import compute_if_not_cached
 import loader
 
@@ -14,34 +20,29 @@ import loader
 
 
 
-def random_walk_matrix(matrix, startVector, R, maxIterations, normThreshold):
+def random_walk_matrix(matrix, startVector, R, maxIterations, normThreshold, solver="fixed", x0=None, topK=None):
     """
     Runs Random Walk with Restart using a matrix implementation
 
-    @param matrix: numpy array, normalized adjancency matrix of entire PPI network
-    @param startVector: numpy array, contains weighted start probabilities
+    @param matrix: numpy array or scipy sparse matrix, normalized adjancency matrix of entire PPI network
+    @param startVector: numpy array, contains weighted start probabilities. May also be an N x k matrix with one start vector per column,
+                        in which case all k walks are run together and the loop stops once every column has converged
     @param R: float, probability of restart parameter
     @param maxInterations: integer, maximum number of iterations to run
     @param normThreshold: integer, threshold at which the algorithm stops running if the difference between two steps is less than it
+    @param solver: "fixed" (plain iteration), "aitken" or "anderson" (accelerated), see Solvers.py
+    @param x0: optional first iterate, e.g. the result for a neighbouring R as warm start (default: startVector)
+    @param topK: optional integer, iterate until the top topK proteins and their order are certified (see Solvers.TopKCertificate)
+                 instead of until normThreshold; scores below the top topK are then only approximate
 
-    @returns numpy array, final vector containing ranked proteins
+    @returns numpy array, final vector (or N x k matrix) containing ranked proteins
     """
     print("STARTING RANDOM WALK")
 
-    previousVector = np.copy(startVector)
-    iterations = 0
-    diff = float('inf')
-
-    while diff > normThreshold and iterations < maxIterations:
-        print("iteration:", iterations)
-
-        # Perform one step of the walk
-        newVector = (1 - R) * np.matmul(matrix, previousVector)
-        newVector = np.add(newVector, R * startVector)
-
-        diff = distance.sqeuclidean(newVector, previousVector)
-        previousVector = newVector
-        iterations += 1
+    if x0 is None:
+        x0 = startVector
+    # x = (1 - R) W x + R s, stopping once the squared euclidean distance of the least converged column is below normThreshold
+    newVector, iterations = Solvers.solve(matrix, 1 - R, R * np.asarray(startVector), x0, normThreshold, maxIterations, solver, topK)
 
     return newVector
 
@@ -50,23 +51,30 @@ def create_normalized_matrix(ppiGraph):
     """
     Generates normalized adjacency matrix.
 
-    @param ppiGraph: a networkx graph containing the entire PPI network
+    @param ppiGraph: a networkx graph or CompactGraph containing the entire PPI network
     @returns: a numpy array that contains the normalized adjacency matrix
     """
 
-    return np.asarray(GraphUtils.normalize_adjacency_matrix(nx.to_numpy_matrix(ppiGraph)))
-
+    return np.asarray(GraphUtils.normalize_adjacency_matrix(GraphUtils.dense_adjacency_matrix(ppiGraph)))
 
-def random_walk(graph, startVector, r=0.4):
 
+def random_walk_scores(graph, startVector, r=0.4, engine="dense", ordering=None, solver="fixed", x0=None, topK=None):
     """
-    This method can be called from anywhere (such as validation scripts) and does whatever it needs to do to produce a properly formatted output,
-    using only the given parameters.
-
-    @param graph: a networkx graph object containing the entire PPI network
-    @param startVector: a numpy array that contains the weighted start probabilities for each protein in the network
-
-    @returns: a nested list of tuples, in sorted order of probability, where each item contains the name of a gene, and its respective probability as determined by the algorithm
+    Runs random walk with restart on the PPI network and returns the raw probability vector, in graph.nodes() order.
+
+    @param graph: a networkx graph or CompactGraph object containing the entire PPI network
+    @param startVector: a numpy array that contains the weighted start probabilities for each protein in the network,
+                        or an N x k matrix with one start vector per column
+    @param r: float, probability of restart
+    @param engine: "dense" (cached N x N numpy matrix), "sparse" (scipy sparse operators, see Operators.py)
+                   or "outofcore" (graph must be an OutOfCore.OutOfCoreNetwork, whose operator is streamed from disk)
+                   or "lowrank" (stored randomized low-rank factorization for this r, built on first use, see LowRank.py;
+                   the rank is set with LowRank.set_rank() (--rank), solver and topK do not apply)
+    @param ordering: node reordering used by the sparse engine: None, "rcm", "degree" or "community"
+    The sparse engine splits its mat-vecs over the threads set with ParallelSpmv.set_threads() (--threads).
+    @param solver, x0, topK: iterative solver, warm start and top-k stopping, see random_walk_matrix()
+
+    @returns: numpy array, steady state probability of each protein (N x k for a matrix of start vectors)
     """
 
     print("INITIALIZING RANDOM WALK")
@@ -76,38 +84,101 @@ def random_walk(graph, startVector, r=0.4):
 
     print("creating matrix")
 
+    if engine == "outofcore":
+        return random_walk_matrix(graph.normalized, startVector, r, maxIterations, normThreshold, solver, x0, topK)
+
+    if engine == "lowrank":
+        return LowRank.load_operator(graph, r).scores(startVector)
+
+    if engine == "sparse":
+        # only the connected components that hold a seed are propagated, the others score zero
+        operators = Operators.load_operators(graph, ordering)
+        start = operators.permute(startVector)
+        rows = operators.seeded_rows(start)
+        if x0 is not None:
+            x0 = operators.restrict(operators.permute(x0), rows)
+        probabilityVector = random_walk_matrix(operators.parallel("normalized", rows), operators.restrict(start, rows), r, maxIterations,
+                                               normThreshold, solver, x0, topK)
+        return operators.unpermute(operators.expand(probabilityVector, rows))
+
     matrix = compute_if_not_cached(create_normalized_matrix, graph, fileName=graph.name)
 
-    probabilityVector = random_walk_matrix(matrix, startVector, r, maxIterations, normThreshold)
+    return random_walk_matrix(matrix, startVector, r, maxIterations, normThreshold, solver, x0, topK)
 
+
+def random_walk(graph, startVector, r=0.4, engine="dense", ordering=None, solver="fixed", topK=None):
+
+    """
+    This method can be called from anywhere (such as validation scripts) and does whatever it needs to do to produce a properly formatted output,
+    using only the given parameters.
+
+    @param graph: a networkx graph object containing the entire PPI network
+    @param startVector: a numpy array that contains the weighted start probabilities for each protein in the network
+    @param engine, ordering, solver, topK: see random_walk_scores()
+    Repeated queries are answered from the query cache (see QueryCache.py).
+
+    @returns: a nested list of tuples, in sorted order of probability, where each item contains the name of a gene, and its respective probability as determined by the algorithm
+    """
+
+    params = {"r": r, "engine": engine, "ordering": ordering, "solver": solver, "topK": topK}
+    if engine == "lowrank":
+        params["rank"] = LowRank.get_rank()
     # format probabilityVector into usable output
     print("formatting output")
-    return GraphUtils.format_output(graph, probabilityVector)
+    return QueryCache.DEFAULT_CACHE.output("rwr", graph, [startVector], params,
+                                           lambda: random_walk_scores(graph, startVector, r, engine, ordering, solver, topK=topK))
 
 
 def main():
     """
     Allows random_walk() to be run through run.py.
     Parses command line arguments and feeds them as parameters to random_walk().
-    Outputs list of ranked proteins as a .csv file in specified file path. 
+    Optional arguments: --engine dense|sparse|outofcore|lowrank, --memory MB (out-of-core memory budget), --rank K (low-rank engine), --order rcm|degree|community, --threads N, --solver fixed|aitken|anderson,
+    --top-k K (iterate until the top K proteins are certified; the rest of the ranking is approximate),
+    --no-cache (always propagate, see QueryCache.py),
+    --targets file (score only the candidate proteins in file, by backward push from each of them, see TargetScoring.py)
+    Saves the ranked proteins to the results store, and as a .csv file if the output file path ends in .csv.
     """
+    ParallelSpmv.threads_option(sys.argv)
+    cache = QueryCache.cache_option(sys.argv)
+    rank = LowRank.rank_option(sys.argv)
+    engine = pop_option(sys.argv, "--engine", "dense")
+    ordering = pop_option(sys.argv, "--order")
+    solver = pop_option(sys.argv, "--solver", "fixed")
+    topK = pop_option(sys.argv, "--top-k", None, int)
+    memoryBudget = OutOfCore.memory_option(sys.argv)
+    pathToTargetFile = pop_option(sys.argv, "--targets")
     pathToPPINetworkFile = sys.argv[1]
     pathToDiseaseGeneFile = sys.argv[2]
     R = float(sys.argv[3])
     outputFile = sys.argv[4]
 
     print("loading data from files..")
-    ppiGraph = compute_if_not_cached(loader.load_graph, pathToPPINetworkFile, fileName=pathToPPINetworkFile)
+    ppiGraph = OutOfCore.load_graph(pathToPPINetworkFile, engine, memoryBudget)
     diseaseGenes = loader.load_start_vector(pathToDiseaseGeneFile, ppiGraph)
 
-    results = random_walk(ppiGraph, diseaseGenes, R)
-
-    print("Saving results to", outputFile)
-    with open(outputFile, "w", newline='') as of:
-        outputWriter = csv.writer(of, quoting=csv.QUOTE_ALL)
-        outputWriter.writerow(["Gene", "Ranking"])
-        for row in results:
-            outputWriter.writerow(row)
+    metadata = {"algorithm": "rwr", "network": pathToPPINetworkFile,
+                "diseaseGenes": pathToDiseaseGeneFile, "params": {"r": R, "engine": engine, "solver": solver, "topK": topK}}
+    if pathToTargetFile is not None:
+        nodes, targets = TargetScoring.load_targets(pathToTargetFile, ppiGraph)
+        probabilityVector = TargetScoring.random_walk_targets(ppiGraph, diseaseGenes, targets, R)
+        metadata["targets"] = pathToTargetFile
+        metadata["params"] = {"r": R, "tol": TargetScoring.TOLERANCE}
+    else:
+        params = {"r": R, "engine": engine, "ordering": ordering, "solver": solver, "topK": topK}
+        if engine == "lowrank":
+            params["rank"] = rank
+            metadata["params"]["rank"] = rank
+        nodes = list(ppiGraph.nodes())
+        probabilityVector = cache.scores("rwr", ppiGraph, [diseaseGenes], params,
+                                         lambda: random_walk_scores(ppiGraph, diseaseGenes, R, engine, ordering, solver, topK=topK))
+
+    runId = ResultsStore.save_ranking(nodes, probabilityVector, metadata)
+    print("Saved run", runId, "to", ResultsStore.DEFAULT_STORE_PATH)
+    if outputFile.endswith(".csv"):
+        print("Saving results to", outputFile)
+        ResultsStore.export_csv(runId, outputFile)
+    cache.report()
     print("done.")
 
 
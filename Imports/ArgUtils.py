@@ -0,0 +1,16 @@
+def pop_option(argv, name, default=None, cast=str):
+    """
+    Removes "--name value" from an argument list and returns the value, so positional arguments keep their indexes.
+    e.g. pop_option(sys.argv, "--engine", "dense")
+
+    @returns: cast(value), or default if the option is not given
+    """
+    if name not in argv:
+        return default
+    i = argv.index(name)
+    if i + 1 >= len(argv):
+        print("Missing value for option", name)
+        return default
+    value = argv[i + 1]
+    del argv[i:i + 2]
+    return cast(value)
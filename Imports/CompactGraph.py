@@ -0,0 +1,139 @@
+import numpy as np
+
+
+class CompactGraph:
+    """
+    Read-only, array based replacement for the networkx graph of a PPI network.
+
+    Nodes are int32 ids in file order (the same order networkx would give them). Their names live in one packed
+    byte string plus an offsets array. Edges are stored in CSR form (indptr, indices), with the STRING confidence
+    of every edge in a parallel int16 array. A self loop is stored once, in its own row, so it adds 1 to the degree of
+    its node (networkx counts it twice) and number_of_edges() counts it once, like networkx.
+
+    It implements the part of the networkx API our code uses: name, nodes(), number_of_nodes(), number_of_edges(),
+    degree(), neighbors(), has_node() / in, so it can be passed to the loaders, GraphUtils and all three algorithms.
+    Only the arrays are pickled; the name list and name -> id index are rebuilt lazily.
+    """
+
+    def __init__(self, name, nameTable, nameOffsets, indptr, indices, confidence):
+        self.name = name
+        self.nameTable = nameTable
+        self.nameOffsets = nameOffsets
+        self.indptr = indptr
+        self.indices = indices
+        self.confidence = confidence
+        self.degrees = np.diff(indptr).astype(np.int32)
+        self._names = None
+        self._index = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_names"] = None
+        state["_index"] = None
+        return state
+
+    def _node_names(self):
+        if self._names is None:
+            table = self.nameTable
+            offsets = self.nameOffsets
+            self._names = [table[offsets[i]:offsets[i + 1]].decode() for i in range(len(offsets) - 1)]
+        return self._names
+
+    def node_id(self, node):
+        # int id of a node name
+        if self._index is None:
+            self._index = {n: i for i, n in enumerate(self._node_names())}
+        return self._index[node]
+
+    def nodes(self):
+        return self._node_names()
+
+    def number_of_nodes(self):
+        return len(self.nameOffsets) - 1
+
+    def number_of_edges(self):
+        # every edge is stored in both rows except self loops, which are stored once
+        rows = np.repeat(np.arange(self.number_of_nodes(), dtype=np.int32), self.degrees)
+        loops = np.count_nonzero(self.indices == rows)
+        return (len(self.indices) + loops) // 2
+
+    def has_node(self, node):
+        try:
+            self.node_id(node)
+            return True
+        except KeyError:
+            return False
+
+    def __contains__(self, node):
+        return self.has_node(node)
+
+    def __len__(self):
+        return self.number_of_nodes()
+
+    def degree(self, node=None):
+        # degree of one node, or the array of all degrees if node is None (a self loop counts once)
+        if node is None:
+            return self.degrees
+        return int(self.degrees[self.node_id(node)])
+
+    def neighbors(self, node):
+        i = self.node_id(node)
+        names = self._node_names()
+        return [names[j] for j in self.indices[self.indptr[i]:self.indptr[i + 1]]]
+
+    def adjacency_matrix(self, weighted=False):
+        """
+        scipy CSR adjacency matrix in nodes() order; entries are 1, or the STRING confidence if weighted.
+        """
+        import scipy.sparse
+        n = self.number_of_nodes()
+        data = self.confidence.astype(np.float64) if weighted else np.ones(len(self.indices))
+        return scipy.sparse.csr_matrix((data, self.indices, self.indptr), shape=(n, n))
+
+    def to_networkx(self):
+        # full networkx graph, for the few scripts that need networkx algorithms
+        import networkx as nx
+        graph = nx.Graph(name=self.name)
+        names = self._node_names()
+        graph.add_nodes_from(names)
+        for i in range(self.number_of_nodes()):
+            for k in range(self.indptr[i], self.indptr[i + 1]):
+                j = self.indices[k]
+                if i <= j:
+                    graph.add_edge(names[i], names[j], confidence=str(self.confidence[k]))
+        return graph
+
+
+def from_edge_arrays(name, names, sources, targets, confidence):
+    """
+    Builds a CompactGraph from parallel edge arrays. Edges are undirected; a repeated edge keeps its last confidence,
+    like networkx add_edge.
+
+    @param names: list of node names, index = node id
+    @param sources, targets: int arrays of node ids
+    @param confidence: int array, STRING confidence of every edge
+    """
+    n = len(names)
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    confidence = np.asarray(confidence, dtype=np.int16)
+    low = np.minimum(sources, targets)
+    high = np.maximum(sources, targets)
+    keys = low*n + high
+    # keep the last occurrence of every undirected edge
+    reversedKeys = keys[::-1]
+    _, firstInReversed = np.unique(reversedKeys, return_index=True)
+    keep = len(keys) - 1 - firstInReversed
+    low, high, confidence = low[keep], high[keep], confidence[keep]
+    loops = low == high
+    rows = np.concatenate([low, high[~loops]])
+    cols = np.concatenate([high, low[~loops]])
+    data = np.concatenate([confidence, confidence[~loops]])
+    order = np.lexsort((cols, rows))
+    rows, cols, data = rows[order], cols[order], data[order]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    encoded = [node.encode() for node in names]
+    nameOffsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=nameOffsets[1:])
+    return CompactGraph(name, b"".join(encoded), nameOffsets, indptr, cols.astype(np.int32), data)
@@ -0,0 +1,77 @@
+import os
+import numpy as np
+import loader
+
+DATA_PATH = "Data/"
+
+
+def get_files_in_directory(path):
+    return [f for f in os.listdir(path) if os.path.isfile(os.path.join(path, f))]
+
+
+def find_data_files(t, path=DATA_PATH):
+    """
+    Returns every file in path that has t as one of its dot separated name parts (e.g. 'diseasegenes' or 'priors'), sorted by name.
+    """
+    return sorted(os.path.join(path, f) for f in get_files_in_directory(path) if t in f.split('.'))
+
+
+def disease_name(path):
+    """
+    Short name of a disease gene or priors file, e.g. Data/lymphoma-proteins.diseasegenes.tsv -> lymphoma-proteins
+    """
+    return os.path.basename(path).split(".")[0]
+
+
+def find_priors_file(diseaseGeneFilePath, priorsFiles):
+    """
+    Returns the priors file belonging to a disease gene file, or None if there is none.
+    """
+    for f in priorsFiles:
+        if disease_name(f) == disease_name(diseaseGeneFilePath):
+            return f
+    return None
+
+
+def load_seed_matrix(paths, ppi_graph):
+    """
+    Stacks the start vectors of several disease gene files into an N x k matrix, one column per file.
+    """
+    seeds = np.zeros((ppi_graph.number_of_nodes(), len(paths)), order='F')
+    for j, path in enumerate(paths):
+        seeds[:, j] = loader.load_start_vector(path, ppi_graph)
+    return seeds
+
+
+def load_priors_vector(path, ppi_graph):
+    """
+    Loads a prior bias file (one protein per line, optionally followed by a tab and an integer weight) into a vector summing to 1.
+    Proteins that are not in the network are skipped.
+    """
+    index = {node: i for i, node in enumerate(ppi_graph.nodes())}
+    priors = np.zeros(ppi_graph.number_of_nodes())
+    with open(path, 'r') as input_file:
+        for line in input_file:
+            fields = line.rstrip('\n').split('\t')
+            if fields[0] not in index:
+                continue
+            priors[index[fields[0]]] += int(fields[1]) if len(fields) == 2 else 1
+    total = np.sum(priors)
+    if total > 0:
+        priors = priors / total
+    return priors
+
+
+def load_prior_matrix(diseaseGeneFiles, ppi_graph, priorsFiles=None):
+    """
+    Builds the N x k PageRank prior bias matrix for the disease gene files.
+    Each column comes from the matching priors file, or from the disease gene file itself when there is no priors file
+    (the same fallback run.py uses when no prior bias file is selected).
+    """
+    if priorsFiles is None:
+        priorsFiles = find_data_files("priors")
+    priors = np.zeros((ppi_graph.number_of_nodes(), len(diseaseGeneFiles)), order='F')
+    for j, path in enumerate(diseaseGeneFiles):
+        priorsFile = find_priors_file(path, priorsFiles)
+        priors[:, j] = load_priors_vector(priorsFile if priorsFile is not None else path, ppi_graph)
+    return priors
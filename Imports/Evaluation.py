@@ -0,0 +1,164 @@
+import numpy as np
+
+
+def auroc(scores, positives, candidates=None):
+    """
+    Area under the ROC curve of a score vector, computed from ranks (Mann-Whitney U) instead of sweeping every threshold.
+
+    @param scores: numpy array, one score per node
+    @param positives: boolean numpy array, True for nodes in the ground truth
+    @param candidates: optional boolean numpy array, only these nodes are ranked (e.g. to leave the seed genes out)
+
+    @returns: float, AUROC, or nan if there are no positive or no negative candidates
+    """
+    from scipy.stats import rankdata
+    scores = np.asarray(scores)
+    positives = np.asarray(positives, dtype=bool)
+    if candidates is not None:
+        scores = scores[candidates]
+        positives = positives[candidates]
+    numPositives = np.count_nonzero(positives)
+    numNegatives = len(scores) - numPositives
+    if numPositives == 0 or numNegatives == 0:
+        return float('nan')
+    ranks = rankdata(scores)
+    return (np.sum(ranks[positives]) - numPositives*(numPositives + 1)/2) / (numPositives*numNegatives)
+
+
+def cross_auroc_table(scores, seeds):
+    """
+    AUROC of every column of a score matrix against every disease gene set.
+    Seed genes of the scored column are removed from the candidates, so the diagonal is nan and the
+    off diagonal entries measure how well one gene set recovers the unseen genes of another.
+
+    @param scores: N x k numpy array, one column per seed set
+    @param seeds: N x k numpy array, the seed matrix that produced scores (non zero = seed gene)
+
+    @returns: k x k numpy array, entry [i, j] is the AUROC of column i against gene set j
+    """
+    seedMask = np.asarray(seeds) > 0
+    k = seedMask.shape[1]
+    table = np.full((k, k), float('nan'))
+    for i in range(k):
+        candidates = ~seedMask[:, i]
+        for j in range(k):
+            if i != j:
+                table[i, j] = auroc(scores[:, i], seedMask[:, j], candidates)
+    return table
+
+
+def heldout_ranks(scores, heldout, candidates=None):
+    """
+    Exact rank of held out genes, found by counting how many candidates score higher (O(N) per gene, no sorting).
+
+    @param scores: numpy array of the scores of one run (length N)
+    @param heldout: numpy array of node indexes of the held out genes
+    @param candidates: optional boolean numpy array, nodes that compete for a rank (e.g. everything except the training genes)
+
+    @returns: numpy int array, 1-based rank of every held out gene (ties count in the gene's favour)
+    """
+    scores = np.asarray(scores)
+    heldout = np.asarray(heldout)
+    competing = scores if candidates is None else scores[candidates]
+    ranks = np.empty(len(heldout), dtype=np.int64)
+    for i, node in enumerate(heldout):
+        ranks[i] = 1 + np.count_nonzero(competing > scores[node])
+    return ranks
+
+
+def leave_one_out_folds(numGenes):
+    """
+    One fold per gene, holding out that gene.
+    @returns: list of numpy arrays of held out positions (into the disease gene list)
+    """
+    return [np.array([i]) for i in range(numGenes)]
+
+
+def k_fold_splits(numGenes, k, seed=0):
+    """
+    Randomly partitions the disease genes into k folds of (nearly) equal size.
+    """
+    order = np.random.RandomState(seed).permutation(numGenes)
+    return [np.sort(fold) for fold in np.array_split(order, k) if len(fold) > 0]
+
+
+def random_splits(numGenes, testFraction, repeats, seed=0):
+    """
+    Repeated random splits, each holding out round(testFraction * numGenes) genes (at least one).
+    """
+    rng = np.random.RandomState(seed)
+    testSize = max(1, int(round(testFraction*numGenes)))
+    return [np.sort(rng.choice(numGenes, testSize, replace=False)) for _ in range(repeats)]
+
+
+def training_mask(geneIndexes, folds, numNodes):
+    """
+    Boolean N x F matrix, column f is True for the disease genes used for training in fold f.
+
+    @param geneIndexes: numpy array, node index of every disease gene
+    @param folds: list of numpy arrays of held out positions into geneIndexes
+    @param numNodes: number of nodes in the network
+    """
+    mask = np.zeros((numNodes, len(folds)), dtype=bool)
+    for f, fold in enumerate(folds):
+        mask[geneIndexes, f] = True
+        mask[geneIndexes[fold], f] = False
+    return mask
+
+
+def normalize_columns(matrix):
+    """
+    Scales every column of a non negative matrix to sum to 1 (all zero columns are left alone).
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    totals = np.sum(matrix, axis=0)
+    totals[totals == 0] = 1
+    return matrix / totals
+
+
+def cross_validate(score_folds, geneIndexes, folds, numNodes, batchSize=None, excludeTraining=False, on_batch=None):
+    """
+    Runs held out gene validation with every fold as one column of a multi-column propagation.
+
+    @param score_folds: function taking an N x F boolean training mask and returning the N x F score matrix
+    @param geneIndexes: numpy array, node index of every disease gene
+    @param folds: list of numpy arrays of held out positions into geneIndexes (see leave_one_out_folds, k_fold_splits, random_splits)
+    @param numNodes: number of nodes in the network
+    @param batchSize: number of folds propagated together, all of them if None
+    @param excludeTraining: if True the training genes of a fold do not compete for ranks
+    @param on_batch: optional function called after every batch with (positions of its folds in folds, their ranks)
+
+    @returns: list with, for every fold, the 1-based ranks of its held out genes
+    """
+    geneIndexes = np.asarray(geneIndexes)
+    if batchSize is None:
+        batchSize = len(folds)
+    ranks = []
+    for start in range(0, len(folds), batchSize):
+        batch = folds[start:start + batchSize]
+        mask = training_mask(geneIndexes, batch, numNodes)
+        scores = np.asarray(score_folds(mask)).reshape(numNodes, len(batch))
+        for f, fold in enumerate(batch):
+            candidates = ~mask[:, f] if excludeTraining else None
+            ranks.append(heldout_ranks(scores[:, f], geneIndexes[fold], candidates))
+        if on_batch is not None:
+            on_batch(list(range(start, start + len(batch))), ranks[start:])
+    return ranks
+
+
+def rank_summary(ranks, thresholds=(10, 50, 100, 150, 500)):
+    """
+    Summary of a rank distribution: count, mean, median, quartiles, mean reciprocal rank and the fraction found within each threshold.
+    """
+    ranks = np.asarray(ranks)
+    summary = {
+        "count": len(ranks),
+        "mean": float(np.mean(ranks)),
+        "median": float(np.median(ranks)),
+        "q1": float(np.percentile(ranks, 25)),
+        "q3": float(np.percentile(ranks, 75)),
+        "mrr": float(np.mean(1/ranks)),
+    }
+    for t in thresholds:
+        summary["top" + str(t)] = float(np.mean(ranks <= t))
+    return summary
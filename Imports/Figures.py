@@ -0,0 +1,156 @@
+"""
+Figures as data, rendered off the critical path.
+
+Validation code builds a json serializable spec of every figure (kind, output path, labels and the plotted numbers)
+instead of drawing it, and hands it to a FigureRenderer. The renderer saves the spec next to the image (same name,
+.json) and draws the PNG with the non-interactive Agg backend in a pool of worker processes, so computation never
+waits on matplotlib, nothing needs a display, and many figures are drawn in parallel. Saved specs can be drawn again
+later, e.g. after changing a style, with Scripts/render-figures.py.
+
+Spec kinds:
+    curves      {"curves": [{"x": [...], "y": [...], "color": ..., "label": ...}, ...]}, e.g. ROC curves
+    violin      {"groups": [[...], ...], "labels": [...]}
+    boxplot     {"groups": [[...], ...], "labels": [...]}, with every value drawn as a jittered point
+Every spec also has "kind", "path" (the PNG) and optionally "title", "xlabel" and "ylabel".
+"""
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+JITTER = 0.05
+
+
+def spec_path(imagePath):
+    return os.path.splitext(imagePath)[0] + ".json"
+
+
+def save_spec(spec):
+    directory = os.path.dirname(spec["path"])
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(spec_path(spec["path"]), "w") as f:
+        json.dump(spec, f)
+
+
+def load_spec(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def draw_curves(axes, spec):
+    for curve in spec["curves"]:
+        axes.plot(curve["x"], curve["y"], color=curve.get("color"), label=curve.get("label"))
+    if any(curve.get("label") for curve in spec["curves"]):
+        axes.legend(loc=spec.get("legend", "lower right"))
+
+
+def draw_violin(axes, spec):
+    axes.violinplot(spec["groups"])
+    axes.set_xticks(range(1, len(spec["groups"]) + 1))
+    axes.set_xticklabels(spec["labels"])
+
+
+def draw_boxplot(axes, spec):
+    import numpy as np
+    rng = np.random.RandomState(0)
+    axes.boxplot(spec["groups"])
+    for i, group in enumerate(spec["groups"]):
+        axes.scatter(rng.uniform(i + 1 - JITTER, i + 1 + JITTER, len(group)), group, marker=".", alpha=0.7)
+    axes.set_xticks(range(1, len(spec["groups"]) + 1))
+    axes.set_xticklabels(spec["labels"])
+
+
+DRAW = {"curves": draw_curves, "violin": draw_violin, "boxplot": draw_boxplot}
+
+
+def render(spec):
+    """
+    Draws one spec to its PNG with the Agg backend.
+
+    @returns: path of the PNG
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    figure, axes = plt.subplots()
+    DRAW[spec["kind"]](axes, spec)
+    axes.set_title(spec.get("title", ""))
+    axes.set_xlabel(spec.get("xlabel", ""))
+    axes.set_ylabel(spec.get("ylabel", ""))
+    directory = os.path.dirname(spec["path"])
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    figure.savefig(spec["path"])
+    plt.close(figure)
+    return spec["path"]
+
+
+class FigureRenderer:
+    """
+    Renders figure specs in worker processes while the caller keeps computing, e.g.
+        with FigureRenderer() as renderer:
+            for ...:
+                renderer.submit({"kind": "curves", "path": "Results/roc.png", "curves": [...]})
+    Leaving the with block waits for every figure. With workers=0 figures are drawn in this process instead.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self.workers = workers
+        self.pool = None
+        self.futures = []
+        self.rendered = []
+
+    def submit(self, spec, saveSpec=True):
+        if saveSpec:
+            save_spec(spec)
+        if self.workers == 0:
+            self.rendered.append(render(spec))
+            return
+        if self.pool is None:
+            # spawn: the workers do not inherit the threads (e.g. of ParallelSpmv) or the state of this process
+            self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self.futures.append(self.pool.submit(render, spec))
+
+    def close(self):
+        """
+        Waits for every submitted figure.
+
+        @returns: list of the rendered PNG paths
+        """
+        for future in self.futures:
+            self.rendered.append(future.result())
+        self.futures = []
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        return self.rendered
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        paths = self.close()
+        if paths:
+            print("Rendered", len(paths), "figures")
+
+
+def render_all(specs, workers=DEFAULT_WORKERS):
+    """
+    Renders a list of specs in parallel (without saving them again).
+
+    @returns: list of the rendered PNG paths
+    """
+    with FigureRenderer(workers) as renderer:
+        for spec in specs:
+            renderer.submit(spec, saveSpec=False)
+    return renderer.rendered
+
+
+def workers_option(argv):
+    """
+    Pops the --figure-workers N option (processes drawing figures, 0 draws them in this process) from argv.
+    """
+    from ArgUtils import pop_option
+    return pop_option(argv, "--figure-workers", DEFAULT_WORKERS, int)
@@ -0,0 +1,80 @@
+"""
+Fusion of the score vectors of several algorithms into one ranking.
+
+Every function takes an N x A score matrix (one column per algorithm, higher = better) and returns one fused score
+vector of length N (higher = better), so the result can be ranked, formatted and stored like any algorithm output.
+Raw scores of different algorithms are not comparable, so everything is fused from per-column ranks.
+
+    rank       (weighted) average rank over the algorithms
+    borda      Borda count: every algorithm gives depth + 1 - rank points to its top depth proteins
+    learned    weighted average rank, with weights learned from held out disease genes (see learn_weights)
+"""
+import numpy as np
+
+BORDA_DEPTH = 1000
+FUSION_METHODS = ["rank", "borda", "learned"]
+
+
+def rank_matrix(scores):
+    """
+    1-based ranks of every column of a score matrix (1 = highest score), ties keep node order.
+
+    @param scores: N x A numpy array
+    @returns: N x A numpy int array
+    """
+    scores = np.asarray(scores)
+    order = np.argsort(-scores, axis=0, kind="stable")
+    ranks = np.empty(scores.shape, dtype=np.int64)
+    positions = np.broadcast_to(np.arange(1, scores.shape[0] + 1)[:, np.newaxis], scores.shape)
+    np.put_along_axis(ranks, order, positions, axis=0)
+    return ranks
+
+
+def normalize_weights(weights, numAlgorithms):
+    if weights is None:
+        return np.full(numAlgorithms, 1/numAlgorithms)
+    weights = np.asarray(weights, dtype=np.float64)
+    return weights / np.sum(weights)
+
+
+def rank_average(scores, weights=None):
+    """
+    Fused score 1 - (weighted mean rank) / N, so the protein with the best average rank scores highest.
+    """
+    ranks = rank_matrix(scores)
+    return 1 - np.dot(ranks, normalize_weights(weights, ranks.shape[1])) / ranks.shape[0]
+
+
+def borda(scores, weights=None, depth=BORDA_DEPTH):
+    """
+    Fused score = (weighted) Borda count. Proteins below rank depth get no points from that algorithm,
+    so only the top of each ranking votes.
+    """
+    ranks = rank_matrix(scores)
+    points = np.maximum(depth + 1 - ranks, 0)
+    return np.dot(points, normalize_weights(weights, ranks.shape[1]))
+
+
+def learn_weights(heldoutRanks):
+    """
+    Weights proportional to the mean reciprocal rank every algorithm gave the held out disease genes.
+
+    @param heldoutRanks: list with, for every algorithm, a numpy array of the ranks of the held out genes
+    @returns: numpy array of weights summing to 1 (equal weights if no algorithm found anything)
+    """
+    mrr = np.array([np.mean(1/np.asarray(ranks, dtype=np.float64)) for ranks in heldoutRanks])
+    if not np.any(mrr > 0):
+        return normalize_weights(None, len(mrr))
+    return mrr / np.sum(mrr)
+
+
+def fuse(scores, method="rank", weights=None):
+    """
+    Fuses an N x A score matrix with the named method (see FUSION_METHODS).
+    "learned" is a weighted rank average, the weights have to be given (see learn_weights).
+    """
+    if method == "borda":
+        return borda(scores, weights)
+    if method == "learned" and weights is None:
+        raise ValueError("learned fusion needs weights, see Fusion.learn_weights")
+    return rank_average(scores, weights)
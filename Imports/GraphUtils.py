@@ -1,6 +1,8 @@
 import numpy as np
 import StringNameConverter as snc
 
+# networkx and scipy are imported inside the functions that need them, to keep start-up fast
+
 
 def normalize_adjacency_matrix(adjacency_matrix):
     # ravel there so that diag is nx1 instead of 1xn
@@ -9,11 +11,42 @@ def normalize_adjacency_matrix(adjacency_matrix):
     return np.asarray(np.matmul(np.matmul(sqrt_d_inverse, adjacency_matrix), sqrt_d_inverse))
 
 
-def format_output(graph, raw_output_vector):
+def sparse_adjacency_matrix(graph):
+    # scipy CSR adjacency matrix in graph.nodes() order (unweighted, like the dense matrices)
+    # graph is a networkx graph or a CompactGraph
+    if hasattr(graph, "adjacency_matrix"):
+        return graph.adjacency_matrix()
+    import networkx as nx
+    import scipy.sparse
+    return scipy.sparse.csr_matrix(nx.adjacency_matrix(graph, nodelist=list(graph.nodes()), weight=None), dtype=np.float64)
+
+
+def dense_adjacency_matrix(graph):
+    return sparse_adjacency_matrix(graph).toarray()
+
+
+def laplacian_matrix(graph):
+    # scipy CSR laplacian D - A in graph.nodes() order
+    import scipy.sparse
+    adjacency = sparse_adjacency_matrix(graph)
+    return scipy.sparse.csr_matrix(scipy.sparse.diags(np.ravel(adjacency.sum(axis=1))) - adjacency)
+
+
+def normalize_sparse_adjacency_matrix(adjacency_matrix):
+    # Same as normalize_adjacency_matrix, D^-1/2 A D^-1/2, without densifying
+    import scipy.sparse
+    degrees = np.ravel(adjacency_matrix.sum(axis=1))
+    sqrt_d_inverse = scipy.sparse.diags(1/np.sqrt(degrees))
+    return scipy.sparse.csr_matrix(sqrt_d_inverse.dot(adjacency_matrix).dot(sqrt_d_inverse))
+
+
+def format_output(graph, raw_output_vector, table=None):
     # format probabilityVector into usable output
+    # table: optional name lookup table, to avoid reloading it when formatting many outputs
     l = list(zip(graph.nodes(), raw_output_vector))
     l.sort(key=lambda tup: tup[1], reverse=True)
-    table = snc.load_lookup_table()
+    if table is None:
+        table = snc.load_lookup_table()
     output = []
     for tup in l:
         pair = [tup[0], snc.string_to_name(table, tup[0]), tup[1]]
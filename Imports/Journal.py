@@ -0,0 +1,104 @@
+"""
+Append-only journal of completed validation folds, so that long runs can be resumed.
+
+Every completed fold is one json line, written and fsynced as soon as its batch of folds is done. A record is keyed by
+the job (network file and content digest, split, top k), the algorithm, the disease gene file, the fold (its held out
+genes), the parameter and whether training genes are excluded from the ranks; a rerun of the same job skips every fold
+that is already in the journal, and an edited network file or a different exclusion setting is run again. A line cut
+off by a crash is dropped when the journal is opened again. The journal can be read at any time (see read_records and
+Scripts/journal-status.py) to look at the results of a run that is still going.
+"""
+import json
+import os
+import time
+
+JOURNAL_SUFFIX = ".journal"
+BATCH_SIZE = 50  # folds propagated together between two checkpoints
+
+
+def journal_path(outputFile):
+    return outputFile + JOURNAL_SUFFIX
+
+
+def record_key(record):
+    # records of older journals have no digest and so never match a new run
+    return (record["network"], record.get("digest"), record["split"], record["topK"], record["algorithm"],
+            record["diseaseGenes"], record["fold"], tuple(record["genes"]), record["param"],
+            record.get("excludeTraining", False))
+
+
+def read_records(path):
+    """
+    Reads every complete record of a journal (a partly written last line is skipped).
+
+    @returns: list of dicts, in the order they were written
+    """
+    records = []
+    if not os.path.isfile(path):
+        return records
+    with open(path, "r") as journal:
+        for line in journal:
+            if not line.endswith("\n"):
+                break
+            records.append(json.loads(line))
+    return records
+
+
+class Journal:
+    """
+    Journal of one validation job, e.g.
+        journal = Journal("Results/lymphoma.txt.journal", network="Data/...ppi.txt", split="loo", topK=None,
+                          digest=QueryCache.network_digest(graph))
+    """
+
+    def __init__(self, path, network, split, topK=None, digest=None):
+        self.path = path
+        self.job = {"network": network, "digest": digest, "split": split, "topK": topK}
+        self._truncate_partial_line()
+        self.completed = {record_key(record): record for record in read_records(path)}
+        if self.completed:
+            print("Resuming from", path, "-", len(self.completed), "completed folds")
+
+    def _truncate_partial_line(self):
+        # a write interrupted by a crash leaves a line without newline, which would corrupt the next record
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, "rb+") as journal:
+            data = journal.read()
+            if data and not data.endswith(b"\n"):
+                journal.truncate(data.rfind(b"\n") + 1)
+
+    def _record(self, algorithm, diseaseGenes, param, fold, genes, excludeTraining):
+        record = dict(self.job)
+        record.update({"algorithm": algorithm, "diseaseGenes": diseaseGenes, "param": param,
+                       "fold": int(fold), "genes": list(genes), "excludeTraining": bool(excludeTraining)})
+        return record
+
+    def lookup(self, algorithm, diseaseGenes, param, fold, genes, excludeTraining=False):
+        """
+        @returns: list of ranks of the held out genes of a completed fold, or None if it has not been run
+        """
+        record = self._record(algorithm, diseaseGenes, param, fold, genes, excludeTraining)
+        record = self.completed.get(record_key(record))
+        return None if record is None else record["ranks"]
+
+    def append(self, algorithm, diseaseGenes, param, folds, genes, ranks, excludeTraining=False):
+        """
+        Durably records a batch of completed folds.
+
+        @param folds: list of fold numbers
+        @param genes: list with the held out genes of every fold
+        @param ranks: list with the ranks of the held out genes of every fold
+        @param excludeTraining: whether the ranks were computed with the training genes excluded
+        """
+        lines = []
+        for fold, foldGenes, foldRanks in zip(folds, genes, ranks):
+            record = self._record(algorithm, diseaseGenes, param, fold, foldGenes, excludeTraining)
+            record["ranks"] = [int(rank) for rank in foldRanks]
+            record["time"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+            self.completed[record_key(record)] = record
+            lines.append(json.dumps(record, sort_keys=True) + "\n")
+        with open(self.path, "a") as journal:
+            journal.write("".join(lines))
+            journal.flush()
+            os.fsync(journal.fileno())
@@ -0,0 +1,195 @@
+"""
+Randomized low-rank approximation of the random walk with restart operator.
+
+Random walk with restart solves x = (1 - r) W x + r s, so x = r K s with K = (I - (1 - r) W)^-1. K itself is not low
+rank (its eigenvalues lie in [1/(2 - r), 1/r]), but K = I + E with E = (1 - r) W K, and the eigenvalues of E,
+(1 - r) l / (1 - (1 - r) l) for the eigenvalues l of W, are only large for the few l close to 1 or -1. So
+    x ~ r (s + U diag(values) U^T s)
+with the k dominant eigenpairs (values, U) of E is accurate with a few hundred components, and every query is two
+thin matrix products.
+
+The eigenpairs are found with a randomized range finder (Halko, Martinsson & Tropp): E is applied to a random
+N x (k + oversampling) block, with a few power iterations, by solving the random walk for every column at once
+(Solvers.py). The eigenpairs are sorted by magnitude, so the first j columns are the best rank j approximation the
+factorization holds, and one factorization gives the error of every smaller rank (see accuracy_report).
+
+Factorizations are saved as .npy files (U as float32) in the cache folder and opened memory-mapped.
+"""
+import json
+import os
+import tempfile
+import time
+import numpy as np
+import Solvers
+
+DEFAULT_RANK = 256
+OVERSAMPLING = 16
+POWER_ITERATIONS = 2
+SOLVE_TOLERANCE = 10**(-16)  # squared step size, far below the approximation error
+SOLVE_MAX_ITERATIONS = 1000
+TOP = 150
+CACHE_FOLDER = os.path.join(tempfile.gettempdir(), "DiseaseGeneNetworkAnalysisCache")
+
+_rank = DEFAULT_RANK
+
+
+def set_rank(rank):
+    global _rank
+    _rank = max(1, int(rank))
+
+
+def get_rank():
+    return _rank
+
+
+def rank_option(argv):
+    """
+    Pops the --rank K option (rank of the low-rank random walk engine) from argv and applies it.
+    """
+    from ArgUtils import pop_option
+    rank = pop_option(argv, "--rank", None, int)
+    if rank is not None:
+        set_rank(rank)
+    return _rank
+
+
+def default_directory(graph, r, rank):
+    return os.path.join(CACHE_FOLDER, "{0}-lowrank-r{1}-k{2}".format(os.path.basename(graph.name), r, rank))
+
+
+def apply_error_operator(normalized, r, block):
+    # E X = K X - X, with K X the solution of Y = (1 - r) W Y + X for every column
+    solution, iterations = Solvers.solve(normalized, 1 - r, block, block, SOLVE_TOLERANCE, SOLVE_MAX_ITERATIONS, "anderson")
+    return solution - block
+
+
+def randomized_eigenpairs(normalized, r, rank, oversampling=OVERSAMPLING, powerIterations=POWER_ITERATIONS, seed=0):
+    """
+    The rank dominant eigenpairs of E = (I - (1 - r) W)^-1 - I.
+
+    @param normalized: symmetric normalized adjacency operator W (scipy sparse matrix or ParallelSpmv operator)
+    @returns: (values, N x rank matrix U), sorted by decreasing |value|
+    """
+    n = normalized.shape[0]
+    columns = min(n, rank + oversampling)
+    block = np.random.RandomState(seed).standard_normal((n, columns))
+    basis, _ = np.linalg.qr(apply_error_operator(normalized, r, block))
+    for i in range(powerIterations):
+        # E is symmetric, so power iterations only need E itself
+        basis, _ = np.linalg.qr(apply_error_operator(normalized, r, basis))
+    projected = np.dot(basis.T, apply_error_operator(normalized, r, basis))
+    values, vectors = np.linalg.eigh((projected + projected.T) / 2)
+    order = np.argsort(-np.abs(values))[:rank]
+    return values[order], np.dot(basis, vectors[:, order])
+
+
+class LowRankOperator:
+    """
+    Stored factorization x ~ r (s + U diag(values) U^T s) of the random walk with restart for one r.
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.metadata = json.load(f)
+        self.directory = directory
+        self.r = self.metadata["r"]
+        self.values = np.load(os.path.join(directory, "values.npy"))
+        self.vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+
+    def rank(self):
+        return len(self.values)
+
+    def scores(self, startVector, rank=None):
+        """
+        Approximate random walk scores for a start vector or N x k matrix of start vectors, using the first rank
+        components (all of them if None).
+        """
+        startVector = np.asarray(startVector, dtype=np.float64)
+        k = self.rank() if rank is None else min(rank, self.rank())
+        vectors = self.vectors[:, :k]
+        values = self.values[:k] if startVector.ndim == 1 else self.values[:k, np.newaxis]
+        coefficients = values * np.dot(vectors.T, startVector.astype(np.float32))
+        return self.r * (startVector + np.dot(vectors, coefficients.astype(np.float32)))
+
+
+def build(graph, r, rank=DEFAULT_RANK, directory=None):
+    """
+    Computes the factorization of a graph for restart probability r and saves it.
+
+    @returns: LowRankOperator
+    """
+    import Operators
+    import QueryCache
+    if directory is None:
+        directory = default_directory(graph, r, rank)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    print("Building rank", rank, "approximation of the random walk operator, r =", r)
+    startTime = time.time()
+    operators = Operators.load_operators(graph)
+    values, vectors = randomized_eigenpairs(operators.parallel("normalized"), r, rank)
+    np.save(os.path.join(directory, "values.npy"), values)
+    np.save(os.path.join(directory, "vectors.npy"), vectors.astype(np.float32))
+    # meta.json is written last, so an interrupted build is never mistaken for a finished one
+    metadata = {"network": QueryCache.network_digest(graph), "r": r, "rank": len(values), "nodes": graph.number_of_nodes(),
+                "seconds": time.time() - startTime}
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump(metadata, f)
+    print("Built in", metadata["seconds"], "seconds, stored in", directory)
+    return LowRankOperator(directory)
+
+
+def is_built(graph, r, directory):
+    import QueryCache
+    path = os.path.join(directory, "meta.json")
+    if not os.path.isfile(path):
+        return False
+    with open(path) as f:
+        metadata = json.load(f)
+    return metadata["network"] == QueryCache.network_digest(graph) and metadata["r"] == r
+
+
+def load_operator(graph, r, rank=None, directory=None):
+    """
+    Opens the factorization of a graph for restart probability r (of rank get_rank() if None), building it first if needed.
+    """
+    if rank is None:
+        rank = get_rank()
+    if directory is None:
+        directory = default_directory(graph, r, rank)
+    if not is_built(graph, r, directory):
+        return build(graph, r, rank, directory)
+    return LowRankOperator(directory)
+
+
+def top_overlap(approximate, exact, candidates, k=TOP):
+    # fraction of the exact top k candidates that is also in the approximate top k (seeds are left out, their r s term is exact)
+    candidates = np.flatnonzero(candidates)
+    k = min(k, len(candidates) - 1)
+    top = candidates[np.argpartition(-exact[candidates], k)[:k]]
+    approximateTop = candidates[np.argpartition(-approximate[candidates], k)[:k]]
+    return len(np.intersect1d(top, approximateTop)) / k
+
+
+def accuracy_report(operator, graph, startVectors, ranks, k=TOP):
+    """
+    Compares the low-rank scores with the exact random walk (sparse engine, converged) for several ranks.
+
+    @param startVectors: N x m matrix of start vectors, e.g. one per disease gene file
+    @param ranks: list of ranks, at most operator.rank()
+    @returns: list of dicts with the rank, the mean relative euclidean error, the mean top k overlap (non seed proteins) and the time of one query
+    """
+    import Operators
+    operators = Operators.load_operators(graph)
+    exact, iterations = Solvers.solve(operators.parallel("normalized"), 1 - operator.r, operator.r * startVectors, startVectors,
+                                      SOLVE_TOLERANCE, SOLVE_MAX_ITERATIONS, "anderson")
+    report = []
+    for rank in ranks:
+        approximate = operator.scores(startVectors, rank)
+        startTime = time.time()
+        operator.scores(startVectors[:, 0], rank)
+        seconds = time.time() - startTime
+        errors = np.linalg.norm(approximate - exact, axis=0) / np.linalg.norm(exact, axis=0)
+        overlaps = [top_overlap(approximate[:, j], exact[:, j], startVectors[:, j] == 0, k) for j in range(startVectors.shape[1])]
+        report.append({"rank": rank, "error": float(np.mean(errors)), "overlap": float(np.mean(overlaps)), "seconds": seconds})
+    return report
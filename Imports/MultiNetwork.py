@@ -0,0 +1,110 @@
+"""
+Several PPI networks (e.g. STRING versions or confidence cut-offs of one network) aligned on one node index.
+
+The union of the proteins of all networks, in the node order of the first network followed by the proteins that only
+later networks have, is the aligned index. It behaves like a graph for the loaders (nodes(), number_of_nodes()), so
+disease gene and priors files are read once into aligned seed matrices. gather() picks the rows of one network out of
+an aligned matrix, in that network's node order, and scatter() puts that network's scores back into the aligned index,
+with nan for the proteins it does not have. Stacking the scattered scores of every network gives one
+networks x proteins x columns array that is ranked in a single sort.
+"""
+import os
+import numpy as np
+
+
+def network_label(path):
+    """
+    Short name of a links file, e.g. Data/9606.protein.links.v11.0.conf400.ppi.txt -> 9606.protein.links.v11.0.conf400
+    """
+    parts = os.path.basename(path).split(".")
+    return ".".join(part for part in parts if part not in ("ppi", "txt"))
+
+
+class AlignedNetworks:
+    """
+    Node alignment of several graphs (networkx graphs or CompactGraphs), see the module docstring.
+    rows[i][j] is the aligned index of node j (in graph.nodes() order) of network i.
+    """
+
+    def __init__(self, graphs):
+        self.graphs = list(graphs)
+        self.name = "+".join(graph.name for graph in self.graphs)
+        index = {}
+        for graph in self.graphs:
+            for node in graph.nodes():
+                index.setdefault(node, len(index))
+        self._nodes = list(index)
+        self.rows = [np.fromiter((index[node] for node in graph.nodes()), dtype=np.int64, count=graph.number_of_nodes())
+                     for graph in self.graphs]
+
+    def nodes(self):
+        return self._nodes
+
+    def number_of_nodes(self):
+        return len(self._nodes)
+
+    def number_of_networks(self):
+        return len(self.graphs)
+
+    def gather(self, i, matrix):
+        # rows of an aligned vector or N x k matrix that belong to network i, in its node order
+        return np.asfortranarray(np.asarray(matrix)[self.rows[i]])
+
+    def scatter(self, i, matrix, fill=np.nan):
+        # scores of network i in the aligned index, fill for the proteins network i does not have
+        matrix = np.asarray(matrix)
+        aligned = np.full((self.number_of_nodes(),) + matrix.shape[1:], fill)
+        aligned[self.rows[i]] = matrix
+        return aligned
+
+    def present(self):
+        """
+        @returns: networks x N boolean array, True where a network has the protein
+        """
+        mask = np.zeros((len(self.graphs), self.number_of_nodes()), dtype=bool)
+        for i, rows in enumerate(self.rows):
+            mask[i, rows] = True
+        return mask
+
+
+def aligned_ranks(scores):
+    """
+    Ranks every column of every network at once.
+
+    @param scores: networks x N x k array of aligned scores, nan for proteins a network does not have
+    @returns: networks x N x k int32 array of 1-based ranks within each network (1 = highest score, ties keep node
+              order), 0 for proteins a network does not have
+    """
+    scores = np.asarray(scores)
+    # nan sorts last, so the proteins a network has take ranks 1..n
+    order = np.argsort(-scores, axis=1, kind="stable")
+    ranks = np.empty(scores.shape, dtype=np.int32)
+    positions = np.arange(1, scores.shape[1] + 1, dtype=np.int32).reshape((1, -1) + (1,) * (scores.ndim - 2))
+    np.put_along_axis(ranks, order, np.broadcast_to(positions, scores.shape), axis=1)
+    ranks[np.isnan(scores)] = 0
+    return ranks
+
+
+def rank_changes(ranks, reference=0):
+    """
+    Rank change of every protein against the reference network (positive = ranked lower than in the reference).
+
+    @param ranks: networks x N (x k) rank array from aligned_ranks
+    @returns: int32 array of the same shape, 0 where either network lacks the protein
+    """
+    ranks = np.asarray(ranks)
+    changes = ranks - ranks[reference]
+    changes[(ranks == 0) | (ranks[reference] == 0)] = 0
+    return changes.astype(np.int32)
+
+
+def top_rows(ranks, top):
+    """
+    Aligned indexes of the proteins ranked within top in any network, ordered by their best rank.
+
+    @param ranks: networks x N rank array of one column
+    """
+    ranks = np.asarray(ranks)
+    best = np.min(np.where(ranks > 0, ranks, np.iinfo(np.int32).max), axis=0)
+    rows = np.flatnonzero(best <= top)
+    return rows[np.argsort(best[rows], kind="stable")]
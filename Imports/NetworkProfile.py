@@ -0,0 +1,177 @@
+"""
+Profile of a PPI links file, made in one streaming pass without building a graph object.
+
+The file is read in chunks; every line becomes an int64 key of its undirected edge and an int16 confidence, so the
+pass holds 10 bytes per line instead of a graph. Repeated edges (STRING lists every edge in both directions) keep their
+last confidence, like loader.load_compact_graph. From the unique edges the profile has
+    - the degree distribution and the confidence histogram
+    - the connected component sizes
+    - the largest eigenvalue of the laplacian L = D - A, estimated with Lanczos (scipy eigsh), and two upper bounds
+      that need only the degrees: Gershgorin (2 * max degree) and Anderson & Morley (max over edges of d_u + d_v)
+
+The profile is saved as json in the cache folder, next to the other cached versions of the network, and is reused as
+long as the links file keeps its size and modification time. Algorithms read it with cached_profile, e.g. the
+Chebyshev diffusion kernel takes its spectral bound from it, which is often far below Gershgorin and so needs fewer
+terms.
+"""
+import json
+import os
+import tempfile
+import numpy as np
+
+CACHE_FOLDER = os.path.join(tempfile.gettempdir(), "DiseaseGeneNetworkAnalysisCache")
+LINES_PER_CHUNK = 2**16
+CONFIDENCE_BIN = 50  # STRING confidences run from 0 to 1000
+EIGENVALUE_TOLERANCE = 1e-6
+SPECTRAL_MARGIN = 1.01  # the spectral bound is the Lanczos estimate plus 1%, at most the Anderson & Morley bound
+
+
+def profile_path(path):
+    return os.path.join(CACHE_FOLDER, os.path.basename(path) + "-profile.json")
+
+
+def read_edge_keys(path):
+    """
+    Streams a links file into edge keys (low id << 32 | high id) and confidences.
+
+    @returns: (list of protein names in file order, int64 key array, int16 confidence array, number of lines)
+    """
+    ids = {}
+    keys = []
+    confidences = []
+    lines = 0
+    with open(path, 'r') as input_file:
+        input_file.readline()
+        while True:
+            chunk = input_file.readlines(LINES_PER_CHUNK * 32)
+            if not chunk:
+                break
+            pairs = np.empty((len(chunk), 2), dtype=np.int64)
+            confidence = np.empty(len(chunk), dtype=np.int16)
+            for i, line in enumerate(chunk):
+                data = line.split(" ")
+                pairs[i, 0] = ids.setdefault(data[0], len(ids))
+                pairs[i, 1] = ids.setdefault(data[1], len(ids))
+                confidence[i] = int(data[2])
+            keys.append((np.min(pairs, axis=1) << 32) | np.max(pairs, axis=1))
+            confidences.append(confidence)
+            lines += len(chunk)
+    if not keys:
+        return list(ids), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int16), 0
+    return list(ids), np.concatenate(keys), np.concatenate(confidences), lines
+
+
+def unique_edges(keys, confidence):
+    # last occurrence of every undirected edge, as (low ids, high ids, confidences)
+    _, firstInReversed = np.unique(keys[::-1], return_index=True)
+    keep = len(keys) - 1 - firstInReversed
+    keys = keys[keep]
+    return keys >> 32, keys & 0xFFFFFFFF, confidence[keep]
+
+
+def counts(values):
+    # [[value, count], ...] for the distinct values, ascending
+    distinct, numbers = np.unique(values, return_counts=True)
+    return [[int(v), int(c)] for v, c in zip(distinct, numbers)]
+
+
+def largest_laplacian_eigenvalue(low, high, degrees, tol=EIGENVALUE_TOLERANCE):
+    # Lanczos estimate, or None if it does not converge
+    import scipy.sparse
+    from scipy.sparse.linalg import eigsh, ArpackNoConvergence
+    n = len(degrees)
+    if n < 3:
+        return float(2 * np.max(degrees)) if n else 0.0
+    rows = np.concatenate([low, high])
+    cols = np.concatenate([high, low])
+    adjacency = scipy.sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n))
+    laplacian = scipy.sparse.diags(degrees.astype(np.float64)) - adjacency
+    try:
+        return float(eigsh(laplacian, k=1, which="LA", tol=tol, return_eigenvectors=False)[0])
+    except ArpackNoConvergence:
+        return None
+
+
+def profile_network(path):
+    """
+    Profiles a links file (see the module docstring).
+
+    @returns: json serializable dict
+    """
+    from scipy.sparse.csgraph import connected_components
+    import scipy.sparse
+    names, keys, confidence, lines = read_edge_keys(path)
+    low, high, confidence = unique_edges(keys, confidence)
+    n = len(names)
+    loops = low == high
+    # a self loop adds one to the degree, like the row count of the adjacency matrix
+    degrees = np.bincount(low, minlength=n) + np.bincount(high[~loops], minlength=n)
+    # the laplacian ignores self loops
+    low, high = low[~loops], high[~loops]
+    laplacianDegrees = np.bincount(low, minlength=n) + np.bincount(high, minlength=n)
+
+    adjacency = scipy.sparse.coo_matrix((np.ones(len(low)), (low, high)), shape=(n, n))
+    numComponents, labels = connected_components(adjacency, directed=False)
+    sizes = np.bincount(labels)
+
+    bins = np.arange(0, 1000 + CONFIDENCE_BIN, CONFIDENCE_BIN)
+    confidenceHistogram, _ = np.histogram(confidence, bins=bins)
+    estimate = largest_laplacian_eigenvalue(low, high, laplacianDegrees)
+    gershgorin = float(2 * np.max(laplacianDegrees)) if n else 0.0
+    andersonMorley = float(np.max(laplacianDegrees[low] + laplacianDegrees[high])) if len(low) else 0.0
+    status = os.stat(path)
+    return {
+        "source": path, "size": status.st_size, "mtime": status.st_mtime,
+        "nodes": n, "edges": int(len(confidence)), "lines": lines, "selfLoops": int(np.count_nonzero(loops)),
+        "degree": {"min": int(np.min(degrees)), "max": int(np.max(degrees)), "mean": float(np.mean(degrees)),
+                   "median": float(np.median(degrees))} if n else {},
+        "degreeHistogram": counts(degrees),
+        "confidenceBins": bins.tolist(), "confidenceHistogram": confidenceHistogram.tolist(),
+        "components": int(numComponents), "largestComponent": int(np.max(sizes)) if n else 0,
+        "componentSizes": counts(sizes)[::-1],
+        "laplacianEstimate": estimate, "gershgorinBound": gershgorin, "andersonMorleyBound": andersonMorley,
+        "spectralBound": andersonMorley if estimate is None else min(andersonMorley, estimate * SPECTRAL_MARGIN),
+    }
+
+
+def is_current(profile, path):
+    status = os.stat(path)
+    return profile["size"] == status.st_size and profile["mtime"] == status.st_mtime
+
+
+def cached_profile(path):
+    """
+    The saved profile of a links file, or None if it was never profiled (or the file changed since).
+    """
+    cachePath = profile_path(path)
+    if not os.path.isfile(path) or not os.path.isfile(cachePath):
+        return None
+    with open(cachePath, "r") as f:
+        profile = json.load(f)
+    return profile if is_current(profile, path) else None
+
+
+def load_profile(path, refresh=False):
+    """
+    The profile of a links file, from the cache or made and saved now.
+    """
+    profile = None if refresh else cached_profile(path)
+    if profile is not None:
+        return profile
+    profile = profile_network(path)
+    if not os.path.isdir(CACHE_FOLDER):
+        os.makedirs(CACHE_FOLDER)
+    temporary = profile_path(path) + ".tmp"
+    with open(temporary, "w") as f:
+        json.dump(profile, f)
+    os.replace(temporary, profile_path(path))
+    return profile
+
+
+def spectral_bound(path):
+    """
+    Bound on the largest laplacian eigenvalue of a network (and of any of its components) from its saved profile
+    (Lanczos estimate plus SPECTRAL_MARGIN, at most the Anderson & Morley bound), or None if it has none.
+    """
+    profile = cached_profile(path)
+    return None if profile is None else profile["spectralBound"]
@@ -0,0 +1,140 @@
+"""
+Degree preserving permutation null model for propagation scores.
+
+The disease genes are replaced by random proteins of (almost) the same degree: proteins are grouped into degree bins
+and every seed is swapped for a random protein from its own bin, keeping its start weight. Many of these random seed
+sets are propagated together as the columns of one multi-column run, and only running statistics per protein are
+kept (Welford mean / variance and the number of random scores at least as high as the real one), so the full
+N x samples matrix is never stored.
+"""
+import numpy as np
+
+MIN_BIN_SIZE = 100
+NUM_SAMPLES = 1000
+BATCH_SIZE = 100
+
+
+def degree_bins(degrees, minBinSize=MIN_BIN_SIZE):
+    """
+    Groups proteins into bins of similar degree. Bins hold at least minBinSize proteins (except when the network is
+    smaller), and proteins with the same degree always share a bin.
+
+    @param degrees: numpy array, degree of every protein
+    @returns: numpy int array, bin of every protein
+    """
+    degrees = np.asarray(degrees)
+    n = len(degrees)
+    order = np.argsort(degrees, kind="stable")
+    sortedDegrees = degrees[order]
+    bins = np.empty(n, dtype=np.int64)
+    binId = 0
+    start = 0
+    while start < n:
+        end = min(start + minBinSize, n)
+        end = int(np.searchsorted(sortedDegrees, sortedDegrees[end - 1], side="right"))
+        if n - end < minBinSize:
+            end = n
+        bins[order[start:end]] = binId
+        binId += 1
+        start = end
+    return bins
+
+
+class SeedSampler:
+    """
+    Draws random seed sets that match a start vector bin by bin: every seed is replaced by a distinct random protein
+    from its degree bin, which gets the seed's start weight.
+    """
+
+    def __init__(self, seedVector, bins, seed=0):
+        self.seedVector = np.asarray(seedVector)
+        self.numNodes = len(self.seedVector)
+        self.rng = np.random.RandomState(seed)
+        seeds = np.flatnonzero(self.seedVector)
+        self.groups = []
+        for b in np.unique(bins[seeds]):
+            members = np.flatnonzero(bins == b)
+            binSeeds = seeds[bins[seeds] == b]
+            self.groups.append((members, self.seedVector[binSeeds]))
+
+    def sample(self, numSamples):
+        """
+        @returns: N x numSamples start matrix, one random seed set per column
+        """
+        samples = np.zeros((self.numNodes, numSamples))
+        columns = np.arange(numSamples)[:, np.newaxis]
+        for members, weights in self.groups:
+            c = len(weights)
+            keys = self.rng.random_sample((numSamples, len(members)))
+            if c < len(members):
+                picks = np.argpartition(keys, c - 1, axis=1)[:, :c]
+            else:
+                picks = np.argsort(keys, axis=1)
+            samples[members[picks], columns] = weights
+        return samples
+
+
+class RunningStats:
+    """
+    Streaming per protein statistics of null scores, updated one batch (N x b matrix) at a time.
+    """
+
+    def __init__(self, observed):
+        self.observed = np.asarray(observed, dtype=np.float64)
+        self.count = 0
+        self.mean = np.zeros(len(self.observed))
+        self.m2 = np.zeros(len(self.observed))
+        self.exceedances = np.zeros(len(self.observed), dtype=np.int64)
+
+    def update(self, samples):
+        # Welford / Chan update: merge the mean and squared deviations of the batch into the running ones
+        b = samples.shape[1]
+        batchMean = np.mean(samples, axis=1)
+        batchM2 = np.sum(np.square(samples - batchMean[:, np.newaxis]), axis=1)
+        delta = batchMean - self.mean
+        total = self.count + b
+        self.mean += delta * (b / total)
+        self.m2 += batchM2 + np.square(delta) * (self.count * b / total)
+        self.count = total
+        self.exceedances += np.count_nonzero(samples >= self.observed[:, np.newaxis], axis=1)
+
+    def std(self):
+        if self.count < 2:
+            return np.zeros(len(self.mean))
+        return np.sqrt(self.m2 / (self.count - 1))
+
+    def zscores(self):
+        # proteins whose null score never changes get a z-score of 0
+        std = self.std()
+        z = np.zeros(len(self.mean))
+        nonzero = std > 0
+        z[nonzero] = (self.observed[nonzero] - self.mean[nonzero]) / std[nonzero]
+        return z
+
+    def pvalues(self):
+        # empirical one sided p-value, (exceedances + 1) / (samples + 1) so it is never 0
+        return (self.exceedances + 1) / (self.count + 1)
+
+
+def null_model(score_function, seedVector, degrees, numSamples=NUM_SAMPLES, batchSize=BATCH_SIZE,
+               minBinSize=MIN_BIN_SIZE, seed=0):
+    """
+    Scores the real seed set and numSamples degree matched random seed sets.
+
+    @param score_function: function mapping an N x b start matrix to the N x b score matrix of an algorithm
+    @param seedVector: numpy array, start vector of the disease genes
+    @param degrees: numpy array, degree of every protein
+    @param batchSize: number of random seed sets propagated together
+
+    @returns: RunningStats of the null scores, with the real scores as observed
+    """
+    seedVector = np.asarray(seedVector, dtype=np.float64)
+    observed = np.asarray(score_function(seedVector[:, np.newaxis])).reshape(len(seedVector))
+    bins = degree_bins(degrees, minBinSize)
+    sampler = SeedSampler(seedVector, bins, seed)
+    stats = RunningStats(observed)
+    for start in range(0, numSamples, batchSize):
+        b = min(batchSize, numSamples - start)
+        stats.update(np.asarray(score_function(sampler.sample(b))).reshape(len(seedVector), b))
+        print("null model: scored", stats.count, "of", numSamples, "random seed sets")
+    return stats
@@ -0,0 +1,191 @@
+import numpy as np
+import GraphUtils
+import ParallelSpmv
+from CacheUtils import compute_if_not_cached
+
+
+def rcm_order(adjacency):
+    """
+    Reverse Cuthill-McKee: keeps neighbours close together so each row touches a narrow band of the vector.
+    """
+    import scipy.sparse
+    from scipy.sparse.csgraph import reverse_cuthill_mckee
+    return np.asarray(reverse_cuthill_mckee(scipy.sparse.csr_matrix(adjacency), symmetric_mode=True), dtype=np.int64)
+
+
+def degree_order(adjacency):
+    """
+    Highest degree first, so the hub entries that almost every row reads stay together in cache.
+    """
+    degrees = np.ravel(adjacency.sum(axis=1))
+    return np.argsort(-degrees, kind="stable")
+
+
+def community_order(adjacency, iterations=20):
+    """
+    Groups nodes by community (synchronous label propagation), highest degree first within a community.
+    """
+    n = adjacency.shape[0]
+    coo = adjacency.tocoo()
+    rows = coo.row.astype(np.int64)
+    cols = coo.col.astype(np.int64)
+    labels = np.arange(n, dtype=np.int64)
+    for _ in range(iterations):
+        # count how often each label occurs among the neighbours of every node
+        keys, counts = np.unique(rows*n + labels[cols], return_counts=True)
+        keyRows = keys // n
+        keyLabels = keys % n
+        # most frequent neighbour label per node, smallest label on ties
+        best = np.lexsort((keyLabels, -counts, keyRows))
+        first = best[np.unique(keyRows[best], return_index=True)[1]]
+        newLabels = labels.copy()
+        newLabels[keyRows[first]] = keyLabels[first]
+        if np.array_equal(newLabels, labels):
+            break
+        labels = newLabels
+    degrees = np.ravel(adjacency.sum(axis=1))
+    return np.lexsort((-degrees, labels))
+
+
+MAX_RESTRICTED_OPERATORS = 8
+
+ORDERINGS = {
+    "rcm": rcm_order,
+    "degree": degree_order,
+    "community": community_order,
+}
+
+
+class Operators:
+    """
+    Sparse operators of a PPI network, built once and shared by the algorithms:
+        adjacency   A
+        normalized  D^-1/2 A D^-1/2 (random walk / PageRank)
+        laplacian   D - A (diffusion kernel)
+        degrees     row sums of A
+
+    If an ordering is given the nodes are renumbered before the operators are built; order[i] is the graph.nodes() index of
+    operator row i. Vectors go in with permute() and come back with unpermute(), so callers always see graph.nodes() order.
+    parallel(name) gives an operator for multi-threaded products with the --threads setting (see ParallelSpmv.py).
+
+    The operators are block diagonal over the connected components of the network, and a component without any seed
+    (or prior) always scores zero in all three algorithms. seeded_rows() picks the rows of the components that hold
+    a seed, and parallel(name, rows) gives the operator restricted to them, so propagation skips the other components.
+    Vectors go in with restrict() and come back, zero filled, with expand().
+    """
+
+    def __init__(self, adjacency, ordering=None):
+        import scipy.sparse
+        adjacency = scipy.sparse.csr_matrix(adjacency, dtype=np.float64)
+        self.ordering = ordering
+        self.order = None
+        if ordering is not None:
+            self.order = ORDERINGS[ordering](adjacency)
+            adjacency = adjacency[self.order][:, self.order].tocsr()
+        adjacency.sort_indices()
+        self.adjacency = adjacency
+        self.degrees = np.ravel(adjacency.sum(axis=1))
+        self.normalized = GraphUtils.normalize_sparse_adjacency_matrix(adjacency)
+        self.laplacian = scipy.sparse.csr_matrix(scipy.sparse.diags(self.degrees) - adjacency)
+        self._parallel = {}
+        self.component_labels()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_parallel"] = {}
+        return state
+
+    def parallel(self, name, rows=None):
+        # "normalized" or "laplacian" (restricted to rows, see seeded_rows), row blocked for the configured number of threads
+        cache = self.__dict__.setdefault("_parallel", {})
+        if rows is None:
+            key = (name, ParallelSpmv.get_threads())
+        else:
+            key = (name, ParallelSpmv.get_threads(), len(rows), hash(rows.tobytes()))
+        if key not in cache:
+            if rows is not None and len(cache) >= MAX_RESTRICTED_OPERATORS:
+                # forget the restricted operators of earlier seed sets, keep the full ones
+                for old in [k for k in cache if len(k) > 2]:
+                    del cache[old]
+            cache[key] = ParallelSpmv.parallel_operator(self.restricted_matrix(name, rows))
+        return cache[key]
+
+    def restricted_matrix(self, name, rows=None):
+        # rows are whole components, so the block of the operator on them is exact
+        matrix = getattr(self, name)
+        if rows is None:
+            return matrix
+        return matrix[rows][:, rows].tocsr()
+
+    def component_labels(self):
+        # component of every operator row, computed on first use (operators cached before components were added lack it)
+        if "_labels" not in self.__dict__:
+            from scipy.sparse.csgraph import connected_components
+            self._numComponents, self._labels = connected_components(self.adjacency, directed=False)
+        return self._labels
+
+    def seeded_rows(self, *vectors):
+        """
+        Operator order indexes of the nodes in components with a non zero entry in any of the vectors
+        (operator order, vectors or N x k matrices).
+
+        @returns: sorted numpy int array, or None if every component is seeded
+        """
+        labels = self.component_labels()
+        seeded = np.zeros(self._numComponents, dtype=bool)
+        for vector in vectors:
+            nonzero = np.asarray(vector) != 0
+            if nonzero.ndim > 1:
+                nonzero = np.any(nonzero, axis=1)
+            seeded[labels[nonzero]] = True
+        if np.all(seeded):
+            return None
+        rows = np.flatnonzero(seeded[labels])
+        print("Propagating over", len(rows), "of", len(labels), "nodes,", np.count_nonzero(seeded), "of", self._numComponents,
+              "components hold seeds")
+        return rows
+
+    @staticmethod
+    def restrict(vector, rows):
+        if rows is None or vector is None:
+            return vector
+        return np.asarray(vector)[rows]
+
+    def expand(self, vector, rows):
+        # restricted result -> full length, zero in the components without seeds
+        if rows is None:
+            return vector
+        result = np.zeros((self.number_of_nodes(),) + np.shape(vector)[1:], dtype=np.result_type(vector))
+        result[rows] = vector
+        return result
+
+    def number_of_nodes(self):
+        return self.adjacency.shape[0]
+
+    def permute(self, vector):
+        # graph.nodes() order -> operator order (works on vectors and N x k matrices)
+        if self.order is None:
+            return vector
+        return np.asarray(vector)[self.order]
+
+    def unpermute(self, vector):
+        # operator order -> graph.nodes() order
+        if self.order is None:
+            return vector
+        result = np.empty_like(vector)
+        result[self.order] = vector
+        return result
+
+
+def build_operators(graph, ordering=None):
+    return Operators(GraphUtils.sparse_adjacency_matrix(graph), ordering)
+
+
+def load_operators(graph, ordering=None):
+    """
+    Builds the operators of a graph, or loads them from the cache.
+
+    @param graph: networkx graph or CompactGraph of the PPI network
+    @param ordering: None (graph.nodes() order), "rcm", "degree" or "community"
+    """
+    return compute_if_not_cached(build_operators, graph, ordering, fileName=graph.name + "-" + str(ordering))
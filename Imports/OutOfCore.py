@@ -0,0 +1,355 @@
+"""
+Out-of-core backend for networks whose operators do not fit in memory.
+
+The adjacency matrix is built straight from the PPI file into row blocks on local disk, without ever holding the
+whole matrix (or a graph object) in memory:
+    pass 1  reads the file, numbers the proteins and writes the edges as int32 pairs to a spill file, counting the
+            entries of every row. The rows are then cut into blocks that fit the memory budget.
+    pass 2  streams the edge spill file and appends both directions of every edge to the spill file of its row block.
+    pass 3  turns every block spill file into a CSR block (duplicates removed), saved as .npy files.
+
+Propagation streams the blocks through each product: the next block is read from its memory-mapped file on a
+background thread while the current one is multiplied, so at most two blocks are in memory at once. Only vectors of
+length N (one per solver buffer) are kept in memory besides the blocks.
+
+OutOfCoreNetwork has the graph methods the loaders and output functions need (nodes(), number_of_nodes(), degree()),
+and its .normalized and .laplacian operators work with Solvers.py and the Chebyshev diffusion kernel.
+"""
+import json
+import os
+import tempfile
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+MEMORY_BUDGET = 1024 * 2**20  # bytes
+# bytes per matrix entry while building a block (row, col, sort key and np.unique temporaries); streaming a block
+# needs 12 (int32 index + float64 value), so two streamed blocks always fit in the budget of one built block
+BYTES_PER_ENTRY = 40
+LINES_PER_CHUNK = 2**16
+CACHE_FOLDER = os.path.join(tempfile.gettempdir(), "DiseaseGeneNetworkAnalysisCache")
+
+
+def default_directory(path):
+    return os.path.join(CACHE_FOLDER, os.path.basename(path) + "-outofcore")
+
+
+def block_bounds(rowCounts, blockEntries):
+    """
+    Cuts the rows into contiguous blocks of at most blockEntries entries (a single larger row gets its own block).
+
+    @returns: numpy array of row boundaries, block i holds rows bounds[i]:bounds[i+1]
+    """
+    totals = np.cumsum(rowCounts)
+    bounds = [0]
+    n = len(rowCounts)
+    while bounds[-1] < n:
+        before = totals[bounds[-1] - 1] if bounds[-1] > 0 else 0
+        end = int(np.searchsorted(totals, before + blockEntries, side="right"))
+        bounds.append(min(max(end, bounds[-1] + 1), n))
+    return np.array(bounds, dtype=np.int64)
+
+
+def read_edges(path, directory):
+    """
+    Pass 1: numbers the proteins in file order and writes the edges as int32 (source, target) pairs.
+
+    @returns: (list of protein names, int64 array of entries per row)
+    """
+    ids = {}
+    rowCounts = np.zeros(0, dtype=np.int64)
+    with open(path, 'r') as input_file, open(os.path.join(directory, "edges.spill"), "wb") as spill:
+        input_file.readline()
+        while True:
+            lines = input_file.readlines(LINES_PER_CHUNK * 32)
+            if not lines:
+                break
+            pairs = np.empty((len(lines), 2), dtype=np.int32)
+            for i, line in enumerate(lines):
+                data = line.split(" ")
+                pairs[i, 0] = ids.setdefault(data[0], len(ids))
+                pairs[i, 1] = ids.setdefault(data[1], len(ids))
+            pairs.tofile(spill)
+            if len(ids) > len(rowCounts):
+                rowCounts = np.concatenate([rowCounts, np.zeros(len(ids) - len(rowCounts), dtype=np.int64)])
+            # both directions, a self loop only once
+            loops = pairs[:, 0] == pairs[:, 1]
+            rowCounts += np.bincount(pairs[:, 0], minlength=len(ids))
+            rowCounts += np.bincount(pairs[~loops, 1], minlength=len(ids))
+    return list(ids), rowCounts
+
+
+def split_edges(directory, bounds, blockEntries):
+    """
+    Pass 2: appends both directions of every edge to the spill file of the row block it belongs to.
+    """
+    step = max(1, blockEntries // 2)
+    with open(os.path.join(directory, "edges.spill"), "rb") as edges:
+        while True:
+            pairs = np.fromfile(edges, dtype=np.int32, count=2 * step).reshape(-1, 2)
+            if len(pairs) == 0:
+                break
+            loops = pairs[:, 0] == pairs[:, 1]
+            rows = np.concatenate([pairs[:, 0], pairs[~loops, 1]])
+            cols = np.concatenate([pairs[:, 1], pairs[~loops, 0]])
+            blocks = np.searchsorted(bounds, rows, side="right") - 1
+            order = np.argsort(blocks, kind="stable")
+            rows, cols, blocks = rows[order], cols[order], blocks[order]
+            splits = np.searchsorted(blocks, np.arange(len(bounds)))
+            for b in range(len(bounds) - 1):
+                if splits[b] < splits[b + 1]:
+                    with open(os.path.join(directory, "block-{0}.spill".format(b)), "ab") as spill:
+                        np.stack([rows[splits[b]:splits[b + 1]], cols[splits[b]:splits[b + 1]]], axis=1).tofile(spill)
+    os.remove(os.path.join(directory, "edges.spill"))
+
+
+def build_block(directory, b, start, end, n):
+    """
+    Pass 3: turns the spill file of block b (rows start:end) into CSR arrays, removing repeated edges.
+
+    @returns: (number of entries of every row of the block, number of self loops)
+    """
+    spillPath = os.path.join(directory, "block-{0}.spill".format(b))
+    if os.path.isfile(spillPath):
+        pairs = np.fromfile(spillPath, dtype=np.int32).reshape(-1, 2)
+        keys = np.unique((pairs[:, 0].astype(np.int64) - start) * n + pairs[:, 1])
+        del pairs
+        os.remove(spillPath)
+    else:
+        keys = np.zeros(0, dtype=np.int64)
+    rows = keys // n
+    indices = (keys % n).astype(np.int32)
+    rowCounts = np.bincount(rows, minlength=end - start)
+    indptr = np.zeros(end - start + 1, dtype=np.int64)
+    np.cumsum(rowCounts, out=indptr[1:])
+    np.save(os.path.join(directory, "block-{0}.indptr.npy".format(b)), indptr)
+    np.save(os.path.join(directory, "block-{0}.indices.npy".format(b)), indices)
+    return rowCounts, int(np.count_nonzero(rows + start == indices))
+
+
+def build_network(path, directory, memoryBudget=MEMORY_BUDGET):
+    """
+    Builds the out-of-core blocks of a PPI file (same nodes, node order and edges as loader.load_compact_graph).
+    """
+    print("building out-of-core network for", path, "in", directory)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    for f in os.listdir(directory):
+        os.remove(os.path.join(directory, f))
+    blockEntries = max(1, memoryBudget // BYTES_PER_ENTRY)
+
+    names, rowCounts = read_edges(path, directory)
+    n = len(names)
+    bounds = block_bounds(rowCounts, blockEntries)
+    print("nodes:", n, "row blocks:", len(bounds) - 1)
+    split_edges(directory, bounds, blockEntries)
+
+    degrees = np.zeros(n, dtype=np.int64)
+    loops = 0
+    for b in range(len(bounds) - 1):
+        degrees[bounds[b]:bounds[b + 1]], blockLoops = build_block(directory, b, bounds[b], bounds[b + 1], n)
+        loops += blockLoops
+    np.save(os.path.join(directory, "degrees.npy"), degrees)
+    with open(os.path.join(directory, "nodes.txt"), "w") as f:
+        f.write("\n".join(names))
+    status = os.stat(path)
+    metadata = {"source": path, "size": status.st_size, "mtime": status.st_mtime, "nodes": n,
+                "edges": int((np.sum(degrees) + loops) // 2), "blockEntries": int(blockEntries), "bounds": bounds.tolist()}
+    # written last, so a build that was interrupted is never mistaken for a finished one
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump(metadata, f)
+
+
+class OutOfCoreOperator:
+    """
+    Streams the row blocks of an OutOfCoreNetwork through a product with a vector or N x k matrix.
+        kind "adjacency"   A x
+        kind "normalized"  D^-1/2 A D^-1/2 x
+        kind "laplacian"   (D - A) x
+    """
+
+    def __init__(self, network, kind):
+        self.network = network
+        self.kind = kind
+        n = network.number_of_nodes()
+        self.shape = (n, n)
+        degrees = network.degrees.astype(np.float64)
+        self.scale = None
+        if kind == "normalized":
+            self.scale = np.zeros(n)
+            self.scale[degrees > 0] = 1 / np.sqrt(degrees[degrees > 0])
+        elif kind == "laplacian":
+            self.scale = degrees
+
+    def diagonal(self):
+        if self.kind == "laplacian":
+            return self.scale
+        return np.zeros(self.shape[0])
+
+    def dot(self, x, out=None):
+        x = np.asarray(x, dtype=np.float64)
+        if out is None:
+            out = np.empty(x.shape)
+        return self.dot_into(x, out)
+
+    def dot_into(self, x, out):
+        def column(v):
+            return v if x.ndim == 1 else v[:, np.newaxis]
+
+        if self.kind == "normalized":
+            self.network.adjacency_product(x * column(self.scale), out)
+            out *= column(self.scale)
+        elif self.kind == "laplacian":
+            self.network.adjacency_product(x, out)
+            np.subtract(x * column(self.scale), out, out=out)
+        else:
+            self.network.adjacency_product(x, out)
+        return out
+
+
+class OutOfCoreNetwork:
+    """
+    PPI network stored as memory-mapped CSR row blocks (see build_network), with enough of the graph API for the
+    loaders and output functions.
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, "meta.json")) as f:
+            metadata = json.load(f)
+        self.directory = directory
+        self.name = metadata["source"]
+        self.bounds = np.array(metadata["bounds"], dtype=np.int64)
+        self.blockEntries = metadata["blockEntries"]
+        self.numEdges = metadata["edges"]
+        self.degrees = np.load(os.path.join(directory, "degrees.npy"))
+        self._names = None
+        self._index = None
+        self._resident = None
+        self._ones = None
+        self.normalized = OutOfCoreOperator(self, "normalized")
+        self.laplacian = OutOfCoreOperator(self, "laplacian")
+
+    def number_of_blocks(self):
+        return len(self.bounds) - 1
+
+    def load_block(self, b):
+        # reads block b from its memory-mapped files into memory (runs on the prefetch thread)
+        arrays = []
+        for part in ("indptr", "indices"):
+            mapped = np.load(os.path.join(self.directory, "block-{0}.{1}.npy".format(b, part)), mmap_mode="r")
+            arrays.append(np.array(mapped))
+            del mapped
+        return arrays
+
+    def blocks(self):
+        """
+        Yields (start row, end row, indptr, indices) of every block, reading the next block ahead on a background thread.
+        A network that fits in a single block is kept in memory.
+        """
+        if self.number_of_blocks() == 1:
+            if self._resident is None:
+                self._resident = self.load_block(0)
+            yield (self.bounds[0], self.bounds[1]) + tuple(self._resident)
+            return
+        with ThreadPoolExecutor(max_workers=1) as prefetch:
+            upcoming = prefetch.submit(self.load_block, 0)
+            for b in range(self.number_of_blocks()):
+                indptr, indices = upcoming.result()
+                if b + 1 < self.number_of_blocks():
+                    upcoming = prefetch.submit(self.load_block, b + 1)
+                yield self.bounds[b], self.bounds[b + 1], indptr, indices
+                del indptr, indices
+
+    def adjacency_product(self, x, out):
+        # out = A x, one row block at a time
+        import scipy.sparse
+        n = self.number_of_nodes()
+        for start, end, indptr, indices in self.blocks():
+            if self._ones is None or len(self._ones) < len(indices):
+                self._ones = np.ones(len(indices))
+            block = scipy.sparse.csr_matrix((self._ones[:len(indices)], indices, indptr), shape=(end - start, n))
+            out[start:end] = block.dot(x)
+        return out
+
+    def _node_names(self):
+        if self._names is None:
+            with open(os.path.join(self.directory, "nodes.txt")) as f:
+                self._names = f.read().split("\n")
+        return self._names
+
+    def node_id(self, node):
+        if self._index is None:
+            self._index = {n: i for i, n in enumerate(self._node_names())}
+        return self._index[node]
+
+    def nodes(self):
+        return self._node_names()
+
+    def number_of_nodes(self):
+        return len(self.degrees)
+
+    def number_of_edges(self):
+        return self.numEdges
+
+    def has_node(self, node):
+        try:
+            self.node_id(node)
+            return True
+        except KeyError:
+            return False
+
+    def __contains__(self, node):
+        return self.has_node(node)
+
+    def __len__(self):
+        return self.number_of_nodes()
+
+    def degree(self, node=None):
+        if node is None:
+            return self.degrees
+        return int(self.degrees[self.node_id(node)])
+
+
+def is_built(path, directory, memoryBudget):
+    # True if directory holds a finished build of the current version of path, with blocks small enough for memoryBudget
+    metaPath = os.path.join(directory, "meta.json")
+    if not os.path.isfile(metaPath):
+        return False
+    with open(metaPath) as f:
+        metadata = json.load(f)
+    status = os.stat(path)
+    return (metadata["size"] == status.st_size and metadata["mtime"] == status.st_mtime
+            and metadata["blockEntries"] <= max(1, memoryBudget // BYTES_PER_ENTRY))
+
+
+def load_network(path, memoryBudget=MEMORY_BUDGET, directory=None):
+    """
+    Opens the out-of-core version of a PPI file, building it first if needed.
+
+    @param memoryBudget: bytes the operator blocks may use at any time (the length N vectors come on top)
+    @param directory: where the blocks are stored, by default next to the other cached files
+    """
+    if directory is None:
+        directory = default_directory(path)
+    if not is_built(path, directory, memoryBudget):
+        build_network(path, directory, memoryBudget)
+    return OutOfCoreNetwork(directory)
+
+
+def memory_option(argv):
+    """
+    Pops the --memory MB option (memory budget of the out-of-core engine) from argv.
+    @returns: budget in bytes
+    """
+    from ArgUtils import pop_option
+    return pop_option(argv, "--memory", MEMORY_BUDGET // 2**20, int) * 2**20
+
+
+def load_graph(path, engine, memoryBudget=MEMORY_BUDGET):
+    """
+    Loads a PPI file for an engine: the out-of-core network for "outofcore", the cached CompactGraph otherwise.
+    """
+    if engine == "outofcore":
+        return load_network(path, memoryBudget)
+    import loader
+    from CacheUtils import compute_if_not_cached
+    return compute_if_not_cached(loader.load_compact_graph, path, fileName=path)
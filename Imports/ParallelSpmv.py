@@ -0,0 +1,110 @@
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from ArgUtils import pop_option
+
+# Optional: lets --threads also cap the BLAS threads numpy uses for the dense engine
+try:
+    from threadpoolctl import threadpool_limits
+    threadpoolctlMissing = False
+except ImportError:
+    threadpoolctlMissing = True
+
+BLOCKS_PER_THREAD = 4
+
+_threads = 1
+_pool = None
+
+
+def set_threads(threads):
+    """
+    Sets the number of threads used by sparse propagation (and, if threadpoolctl is installed, by numpy's BLAS).
+    None means one thread per core.
+    """
+    global _threads, _pool
+    if threads is None:
+        threads = os.cpu_count() or 1
+    threads = max(1, int(threads))
+    if threads != _threads and _pool is not None:
+        _pool.shutdown()
+        _pool = None
+    _threads = threads
+    if not threadpoolctlMissing:
+        threadpool_limits(threads)
+
+
+def get_threads():
+    return _threads
+
+
+def threads_option(argv):
+    """
+    Pops the shared --threads N option from argv and applies it. Without the option nothing is changed, so the sparse
+    kernels stay single threaded and numpy keeps its own BLAS threading.
+    """
+    threads = pop_option(argv, "--threads", None, int)
+    if threads is not None:
+        set_threads(threads)
+    return _threads
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=_threads)
+    return _pool
+
+
+def row_blocks(indptr, numBlocks):
+    """
+    Splits the rows of a CSR matrix into numBlocks contiguous ranges holding about the same number of non-zeros.
+
+    @returns: numpy array of numBlocks + 1 row boundaries
+    """
+    numRows = len(indptr) - 1
+    targets = np.linspace(0, indptr[-1], numBlocks + 1)
+    bounds = np.searchsorted(indptr, targets, side="left")
+    bounds[0] = 0
+    bounds[-1] = numRows
+    return np.unique(bounds)
+
+
+class ParallelOperator:
+    """
+    Row blocked CSR matrix whose dot() computes the blocks on the shared thread pool.
+    scipy's sparse kernels release the GIL, so the blocks really run in parallel. Works for vectors and N x k matrices.
+    """
+
+    def __init__(self, matrix, threads=None):
+        if threads is None:
+            threads = _threads
+        self.threads = threads
+        self.shape = matrix.shape
+        self.bounds = row_blocks(matrix.indptr, threads * BLOCKS_PER_THREAD)
+        self.blocks = [matrix[self.bounds[i]:self.bounds[i + 1]] for i in range(len(self.bounds) - 1)]
+
+    def dot(self, x, out=None):
+        if out is None:
+            out = np.empty((self.shape[0],) + np.shape(x)[1:], dtype=np.result_type(self.blocks[0].dtype, x.dtype))
+
+        def work(i):
+            out[self.bounds[i]:self.bounds[i + 1]] = self.blocks[i].dot(x)
+
+        if self.threads == 1:
+            for i in range(len(self.blocks)):
+                work(i)
+        else:
+            list(get_pool().map(work, range(len(self.blocks))))
+        return out
+
+    def dot_into(self, x, out):
+        return self.dot(x, out)
+
+
+def parallel_operator(matrix):
+    """
+    Wraps a sparse matrix for multi-threaded products with the configured number of threads, or returns it unchanged for one thread.
+    """
+    if _threads == 1:
+        return matrix
+    return ParallelOperator(matrix)
@@ -0,0 +1,270 @@
+"""
+Pruned versions of a PPI network, saved as datasets of their own.
+
+STRING links files hold every interaction down to confidence 150, far more than the high confidence interactome. A
+pruning setting is a list of steps, applied in order to the undirected edge list of a CompactGraph and written as a
+dash separated tag, e.g. "conf700-core2":
+    confN       keep edges with STRING confidence >= N
+    coreK       k-core: repeatedly drop the edges of nodes with fewer than K neighbours
+    topkK       keep an edge if it is among the K highest confidence edges of either endpoint
+    spectralP   keep P percent of the edges, sampled with probability proportional to their effective resistance
+                (estimated as 1/d_u + 1/d_v), so bridges and edges of low degree nodes are kept and edges between
+                hubs, which the rest of the network mostly duplicates, are dropped. The highest confidence edge of every
+                node is always kept, so no node is cut off. Kept edges are not reweighted, since the algorithms use
+                the unweighted adjacency matrix.
+
+The pruned network is written next to the original as <name>.<tag>.ppi.txt (same format as the links file), so
+run.py lists it with the other networks and every algorithm can use it. Nodes without edges left are dropped.
+"""
+import os
+import time
+import numpy as np
+import CompactGraph
+
+STEPS = ("conf", "core", "topk", "spectral")
+DEFAULT_SETTINGS = ["conf400", "conf700", "conf900", "conf400-core2", "conf400-topk20", "conf400-spectral50"]
+MALACARDS_PREFIX = "MalaCard"
+FOLDS = 5
+RESTART = 0.4
+SOLVE_TOLERANCE = 10**(-6)
+SOLVE_MAX_ITERATIONS = 500
+
+
+def parse_setting(tag):
+    """
+    @returns: list of (step name, integer value), e.g. "conf700-core2" -> [("conf", 700), ("core", 2)]
+    """
+    steps = []
+    for part in tag.split("-"):
+        name = part.rstrip("0123456789")
+        value = part[len(name):]
+        if name not in STEPS or value == "":
+            raise ValueError("Unknown pruning step '{0}' in '{1}' (expected one of {2} followed by a number)".format(part, tag, ", ".join(STEPS)))
+        steps.append((name, int(value)))
+    return steps
+
+
+def edge_arrays(graph):
+    """
+    Undirected edges of a CompactGraph, each once: (sources, targets, confidence) with source <= target.
+    """
+    rows = np.repeat(np.arange(graph.number_of_nodes(), dtype=np.int64), np.diff(graph.indptr))
+    cols = graph.indices.astype(np.int64)
+    upper = rows <= cols
+    return rows[upper], cols[upper], graph.confidence[upper]
+
+
+def node_degrees(sources, targets, numNodes):
+    return np.bincount(sources, minlength=numNodes) + np.bincount(targets, minlength=numNodes)
+
+
+def confidence_threshold(sources, targets, confidence, numNodes, minimum):
+    # keep mask of the edges with confidence >= minimum
+    return confidence >= minimum
+
+
+def k_core(sources, targets, confidence, numNodes, k):
+    # keep mask of the edges of the k-core, peeling every node below k in each round
+    keep = np.ones(len(sources), dtype=bool)
+    while True:
+        degrees = node_degrees(sources[keep], targets[keep], numNodes)
+        low = degrees < k
+        drop = keep & (low[sources] | low[targets])
+        if not np.any(drop):
+            return keep
+        keep &= ~drop
+
+
+def neighbour_ranks(sources, targets, confidence, numNodes):
+    """
+    Rank (0 = highest confidence) of every edge among the edges of its source and among the edges of its target.
+
+    @returns: (ranks at the source, ranks at the target), ties in edge order
+    """
+    m = len(sources)
+    nodes = np.concatenate([sources, targets])
+    order = np.lexsort((np.arange(2 * m), -np.concatenate([confidence, confidence]).astype(np.int32), nodes))
+    starts = np.zeros(numNodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(nodes, minlength=numNodes), out=starts[1:])
+    ranks = np.empty(2 * m, dtype=np.int64)
+    ranks[order] = np.arange(2 * m) - starts[nodes[order]]
+    return ranks[:m], ranks[m:]
+
+
+def top_k_neighbours(sources, targets, confidence, numNodes, k):
+    # keep mask of the edges among the k best of either endpoint
+    atSource, atTarget = neighbour_ranks(sources, targets, confidence, numNodes)
+    return (atSource < k) | (atTarget < k)
+
+
+def spectral_sparsify(sources, targets, confidence, numNodes, percent, seed=0):
+    # keep mask of percent % of the edges, weighted sampling without replacement (Efraimidis & Spirakis keys)
+    m = len(sources)
+    target = int(round(m * min(percent, 100) / 100))
+    atSource, atTarget = neighbour_ranks(sources, targets, confidence, numNodes)
+    keep = (atSource == 0) | (atTarget == 0)
+    remaining = max(0, target - np.count_nonzero(keep))
+    if remaining == 0:
+        return keep
+    degrees = node_degrees(sources, targets, numNodes).astype(np.float64)
+    resistance = 1 / degrees[sources] + 1 / degrees[targets]
+    keys = np.log(np.random.RandomState(seed).uniform(size=m)) / resistance
+    keys[keep] = -np.inf
+    candidates = np.argpartition(-keys, remaining - 1)[:remaining] if remaining < m else np.arange(m)
+    keep[candidates[np.isfinite(keys[candidates])]] = True
+    return keep
+
+
+PRUNING_STEPS = {
+    "conf": confidence_threshold,
+    "core": k_core,
+    "topk": top_k_neighbours,
+    "spectral": spectral_sparsify,
+}
+
+
+def prune(graph, tag):
+    """
+    Applies a pruning setting to a CompactGraph.
+
+    @returns: CompactGraph of the remaining edges, named after its dataset file (see dataset_path)
+    """
+    sources, targets, confidence = edge_arrays(graph)
+    numNodes = graph.number_of_nodes()
+    for name, value in parse_setting(tag):
+        keep = PRUNING_STEPS[name](sources, targets, confidence, numNodes, value)
+        sources, targets, confidence = sources[keep], targets[keep], confidence[keep]
+        print("{0}{1}: {2} edges left".format(name, value, len(sources)))
+    # renumber the nodes that still have edges, keeping their order
+    used = np.flatnonzero(node_degrees(sources, targets, numNodes))
+    newIds = np.full(numNodes, -1, dtype=np.int64)
+    newIds[used] = np.arange(len(used))
+    names = graph.nodes()
+    return CompactGraph.from_edge_arrays(dataset_path(graph.name, tag), [names[i] for i in used],
+                                         newIds[sources], newIds[targets], confidence)
+
+
+def dataset_path(networkPath, tag):
+    """
+    e.g. Data/9606.protein.links.v11.0.ppi.txt, conf700 -> Data/9606.protein.links.v11.0.conf700.ppi.txt
+    """
+    directory, fileName = os.path.split(networkPath)
+    base = fileName[:-len(".ppi.txt")] if fileName.endswith(".ppi.txt") else os.path.splitext(fileName)[0]
+    return os.path.join(directory, "{0}.{1}.ppi.txt".format(base, tag))
+
+
+def write_links_file(graph, path):
+    """
+    Writes a CompactGraph in the STRING links format read by loader.load_graph / load_compact_graph.
+    Written under a temporary name and renamed, so an interrupted run never leaves a partial dataset.
+    """
+    import tempfile
+    sources, targets, confidence = edge_arrays(graph)
+    names = graph.nodes()
+    handle, temporary = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path) or ".")
+    with os.fdopen(handle, "w") as f:
+        f.write("protein1 protein2 combined_score\n")
+        for s, t, c in zip(sources.tolist(), targets.tolist(), confidence.tolist()):
+            f.write("{0} {1} {2}\n".format(names[s], names[t], c))
+    os.replace(temporary, path)
+
+
+def load_pruned_network(graph, tag):
+    """
+    Pruned network of a setting, from its dataset file if it was made before, pruning and saving it otherwise.
+
+    @returns: (CompactGraph, seconds spent pruning, 0 if it was loaded)
+    """
+    import loader
+    from CacheUtils import compute_if_not_cached
+    path = dataset_path(graph.name, tag)
+    seconds = 0.0
+    if not os.path.isfile(path):
+        startTime = time.time()
+        pruned = prune(graph, tag)
+        seconds = time.time() - startTime
+        write_links_file(pruned, path)
+        print("Saved pruned network to", path)
+    # loaded back from the file, so the node order is the same in every later run
+    return compute_if_not_cached(loader.load_compact_graph, path, fileName=path), seconds
+
+
+def malacards_files(diseaseGeneFiles):
+    # the bundled MalaCards disease gene sets, or every given file if there are none
+    files = [f for f in diseaseGeneFiles if os.path.basename(f).startswith(MALACARDS_PREFIX)]
+    return files if files else diseaseGeneFiles
+
+
+def propagate(operators, seeds):
+    # sparse random walk with restart of every column of seeds, components without seeds skipped
+    import Solvers
+    rows = operators.seeded_rows(seeds)
+    if rows is not None and len(rows) == 0:
+        return np.zeros(np.shape(seeds))
+    start = operators.restrict(seeds, rows)
+    scores, iterations = Solvers.solve(operators.parallel("normalized", rows), 1 - RESTART, RESTART * start, start,
+                                       SOLVE_TOLERANCE, SOLVE_MAX_ITERATIONS, "anderson")
+    return operators.expand(scores, rows)
+
+
+def evaluate(graph, reference, diseaseGeneFiles, folds=FOLDS):
+    """
+    Edge count, propagation time and held out AUROC of one network.
+
+    Folds are drawn on the reference (unpruned) network and scores are compared over its nodes, nodes missing from
+    graph scoring zero, so a pruning setting that loses disease genes is penalized for it.
+
+    @param graph: CompactGraph to evaluate
+    @param reference: the CompactGraph it was pruned from (or graph itself)
+    @returns: dict with nodes, edges, milliseconds per query (one full disease gene set) and mean AUROC
+    """
+    import loader
+    import Evaluation
+    import Operators
+    operators = Operators.build_operators(graph)
+    index = {node: i for i, node in enumerate(graph.nodes())}
+    positions = np.array([index.get(node, -1) for node in reference.nodes()])
+    present = positions >= 0
+    queryTimes = []
+    aurocs = []
+    for path in diseaseGeneFiles:
+        genes = np.flatnonzero(loader.load_start_vector(path, reference))
+        if len(genes) < 2:
+            continue
+        splits = Evaluation.k_fold_splits(len(genes), min(folds, len(genes)))
+        training = Evaluation.training_mask(genes, splits, reference.number_of_nodes())
+        seeds = np.zeros((graph.number_of_nodes(), len(splits) + 1))
+        seeds[positions[present], :len(splits)] = training[present]
+        seeds[positions[np.intersect1d(genes, np.flatnonzero(present))], len(splits)] = 1
+        seeds = Evaluation.normalize_columns(seeds)
+        startTime = time.time()
+        propagate(operators, seeds[:, -1])
+        queryTimes.append(time.time() - startTime)
+        scores = np.zeros((reference.number_of_nodes(), len(splits)))
+        scores[present] = propagate(operators, seeds[:, :len(splits)])[positions[present]]
+        for f, split in enumerate(splits):
+            heldout = np.zeros(reference.number_of_nodes(), dtype=bool)
+            heldout[genes[split]] = True
+            aurocs.append(Evaluation.auroc(scores[:, f], heldout, ~training[:, f]))
+    return {"nodes": graph.number_of_nodes(), "edges": graph.number_of_edges(),
+            "ms": 1000 * float(np.mean(queryTimes)) if queryTimes else float("nan"),
+            "auroc": float(np.nanmean(aurocs)) if aurocs else float("nan")}
+
+
+def pruning_report(graph, tags, diseaseGeneFiles):
+    """
+    Prunes (or loads) the network for every setting and evaluates it next to the full network.
+
+    @returns: list of dicts, the first for the full network, each with the setting, its dataset path and pruning time
+              added to the fields of evaluate()
+    """
+    report = []
+    row = evaluate(graph, graph, diseaseGeneFiles)
+    row.update({"setting": "full", "path": graph.name, "seconds": 0.0})
+    report.append(row)
+    for tag in tags:
+        pruned, seconds = load_pruned_network(graph, tag)
+        row = evaluate(pruned, graph, diseaseGeneFiles)
+        row.update({"setting": tag, "path": pruned.name, "seconds": seconds})
+        report.append(row)
+    return report
@@ -0,0 +1,264 @@
+"""
+Result-level cache of algorithm queries, in front of random_walk, page_rank and diffusion_kernel (and their command
+line runs).
+
+A query is keyed by
+    - the content hash of the network (node names and edges, not its file name)
+    - the canonical form of its seed and prior vectors (indexes and values of the non zero entries, so the dtype and
+      memory layout of the vectors do not matter)
+    - the algorithm and all parameters that change the scores (engine, method, solver, top k, ...)
+
+There are two tiers:
+    memory  an LRU dict of the last MEMORY_ENTRIES queries of this process, holding the scores and their formatted output
+            (the score arrays are read only and output() returns a copy, so callers cannot change later hits)
+    disk    one .npz file per query in the cache folder (see CacheUtils) holding the scores and their descending order,
+            so the formatted output is rebuilt without propagating or sorting. The least recently used files are
+            removed once there are more than DISK_ENTRIES.
+
+Hits and misses are counted per process and added to a stats file in the disk tier, so report() gives the hit rate of
+this run and of every run so far (see Scripts/query-cache.py).
+"""
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+import numpy as np
+
+MEMORY_ENTRIES = 32
+DISK_ENTRIES = 256
+DEFAULT_DIRECTORY = os.path.join(tempfile.gettempdir(), "DiseaseGeneNetworkAnalysisCache", "queries")
+STATS_FILE = "stats.json"
+
+
+def network_digest(graph):
+    """
+    Content hash of a PPI network, remembered on the graph object.
+    CompactGraph is hashed from its arrays, OutOfCoreNetwork from the adjacency of every row block (streamed, one block
+    at a time), networkx graphs from their sparse adjacency matrix.
+    """
+    digest = getattr(graph, "_contentDigest", None)
+    if digest is not None:
+        return digest
+    h = hashlib.sha1()
+    for node in graph.nodes():
+        h.update(node.encode())
+        h.update(b"\n")
+    if hasattr(graph, "indptr"):
+        arrays = [graph.indptr, graph.indices, graph.confidence]
+    elif hasattr(graph, "blocks"):
+        arrays = [graph.bounds]
+        for start, end, indptr, indices in graph.blocks():
+            h.update(np.ascontiguousarray(indptr).tobytes())
+            h.update(np.ascontiguousarray(indices).tobytes())
+    else:
+        import GraphUtils
+        adjacency = GraphUtils.sparse_adjacency_matrix(graph).tocsr()
+        arrays = [adjacency.indptr, adjacency.indices, adjacency.data]
+    for array in arrays:
+        h.update(np.ascontiguousarray(array).tobytes())
+    digest = h.hexdigest()[:16]
+    graph._contentDigest = digest
+    return digest
+
+
+def vector_digest(vector):
+    """
+    Hash of the canonical form of a seed or prior vector (or N x k matrix): its shape and non zero entries as float64.
+    """
+    vector = np.asarray(vector, dtype=np.float64)
+    nonzero = np.flatnonzero(vector)
+    h = hashlib.sha1(str(vector.shape).encode())
+    h.update(nonzero.astype(np.int64).tobytes())
+    h.update(np.ascontiguousarray(vector.ravel()[nonzero]).tobytes())
+    return h.hexdigest()[:16]
+
+
+def descending_order(scores):
+    # same order as GraphUtils.format_output: highest score first, ties in node order
+    return np.argsort(-np.asarray(scores), kind="stable").astype(np.int32)
+
+
+def formatted_output(graph, scores, order, table=None):
+    """
+    GraphUtils.format_output from precomputed scores and descending order.
+    """
+    import StringNameConverter as snc
+    if table is None:
+        table = snc.load_lookup_table()
+    nodes = graph.nodes()
+    return [[nodes[i], snc.string_to_name(table, nodes[i]), scores[i]] for i in order]
+
+
+class QueryCache:
+    """
+    Two tier (memory LRU + disk) cache of score vectors, e.g.
+        cache = QueryCache()
+        scores = cache.scores("rwr", graph, [startVector], {"r": 0.4}, lambda: random_walk_scores(graph, startVector, 0.4))
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, memoryEntries=MEMORY_ENTRIES, diskEntries=DISK_ENTRIES):
+        self.directory = directory
+        self.memoryEntries = memoryEntries
+        self.diskEntries = diskEntries
+        self.enabled = True
+        self.memory = OrderedDict()
+        self.counts = {"memory": 0, "disk": 0, "miss": 0}
+
+    def key(self, algorithm, graph, vectors, params):
+        description = {"algorithm": algorithm, "network": network_digest(graph),
+                       "vectors": [vector_digest(v) for v in vectors], "params": params}
+        return hashlib.sha1(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def _remember(self, key, entry):
+        # every hit hands out these arrays, so an in place edit by one caller must not change later hits
+        entry["scores"].setflags(write=False)
+        entry["order"].setflags(write=False)
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memoryEntries:
+            self.memory.popitem(last=False)
+
+    def lookup(self, key):
+        """
+        @returns: memory tier entry (dict with "scores" and "order") of a query, or None on a miss
+        """
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.counts["memory"] += 1
+            return self.memory[key]
+        path = self._path(key)
+        if os.path.isfile(path):
+            try:
+                with np.load(path) as data:
+                    entry = {"scores": data["scores"], "order": data["order"]}
+            except (OSError, ValueError, KeyError):  # broken file, e.g. from an interrupted write
+                os.remove(path)
+            else:
+                os.utime(path)
+                self.counts["disk"] += 1
+                self._remember(key, entry)
+                return entry
+        self.counts["miss"] += 1
+        return None
+
+    def store(self, key, scores):
+        scores = np.asarray(scores, dtype=np.float64)
+        entry = {"scores": scores, "order": descending_order(scores)}
+        self._remember(key, entry)
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        # written under a temporary name and renamed, so readers never see a partial file
+        temporary = self._path(key) + ".tmp.npz"
+        np.savez(temporary, scores=scores, order=entry["order"])
+        os.replace(temporary, self._path(key))
+        self._evict()
+        return entry
+
+    def _evict(self):
+        files = [os.path.join(self.directory, f) for f in os.listdir(self.directory) if f.endswith(".npz") and not f.endswith(".tmp.npz")]
+        if len(files) <= self.diskEntries:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.diskEntries]:
+            os.remove(path)
+
+    def entry(self, algorithm, graph, vectors, params, compute):
+        # returns (key, entry), with key None when the cache is disabled
+        if not self.enabled:
+            return None, {"scores": compute(), "order": None}
+        key = self.key(algorithm, graph, vectors, params)
+        entry = self.lookup(key)
+        if entry is None:
+            entry = self.store(key, compute())
+        return key, entry
+
+    def scores(self, algorithm, graph, vectors, params, compute):
+        """
+        Score vector of a query, from the cache or from compute().
+
+        @param algorithm: algorithm name, e.g. "rwr"
+        @param vectors: list of the seed and prior vectors of the query
+        @param params: json serializable dict of every parameter that changes the scores
+        @param compute: function without arguments that computes the scores on a miss
+        """
+        return self.entry(algorithm, graph, vectors, params, compute)[1]["scores"]
+
+    def output(self, algorithm, graph, vectors, params, compute):
+        """
+        Formatted output (see GraphUtils.format_output) of a query; repeated queries skip the propagation and the sort.
+        """
+        key, entry = self.entry(algorithm, graph, vectors, params, compute)
+        if key is None:
+            import GraphUtils
+            return GraphUtils.format_output(graph, entry["scores"])
+        if "output" not in entry:
+            entry["output"] = formatted_output(graph, entry["scores"], entry["order"])
+        return [list(row) for row in entry["output"]]
+
+    def hit_rate(self, counts=None):
+        counts = self.counts if counts is None else counts
+        total = sum(counts.values())
+        return (counts["memory"] + counts["disk"]) / total if total else 0.0
+
+    def total_counts(self):
+        # counts of every earlier run, from the stats file, plus this run
+        path = os.path.join(self.directory, STATS_FILE)
+        totals = {"memory": 0, "disk": 0, "miss": 0}
+        if os.path.isfile(path):
+            with open(path, "r") as f:
+                totals.update(json.load(f))
+        return totals
+
+    def save_stats(self):
+        """
+        Adds the counts of this process to the stats file and resets them.
+        """
+        if sum(self.counts.values()) == 0:
+            return
+        totals = self.total_counts()
+        for name, count in self.counts.items():
+            totals[name] += count
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        # same temporary file and rename as the score files, so concurrent runs never leave a truncated file
+        path = os.path.join(self.directory, STATS_FILE)
+        temporary = "{0}.{1}.tmp".format(path, os.getpid())
+        with open(temporary, "w") as f:
+            json.dump(totals, f)
+        os.replace(temporary, path)
+        self.counts = {"memory": 0, "disk": 0, "miss": 0}
+
+    def report(self):
+        """
+        Prints the hit rates of this run and of all runs, and saves the counts of this run.
+        """
+        if sum(self.counts.values()) == 0:
+            return
+        print("Query cache: {0} memory hits, {1} disk hits, {2} misses, hit rate {3:.0%}".format(
+            self.counts["memory"], self.counts["disk"], self.counts["miss"], self.hit_rate()))
+        self.save_stats()
+        totals = self.total_counts()
+        print("Query cache, all runs: {0} queries, hit rate {1:.0%}".format(sum(totals.values()), self.hit_rate(totals)))
+
+    def clear(self):
+        self.memory.clear()
+        if os.path.isdir(self.directory):
+            for f in os.listdir(self.directory):
+                os.remove(os.path.join(self.directory, f))
+
+
+DEFAULT_CACHE = QueryCache()
+
+
+def cache_option(argv):
+    """
+    Pops the shared --no-cache flag from argv; with it, queries are always computed and nothing is cached.
+    """
+    if "--no-cache" in argv:
+        argv.remove("--no-cache")
+        DEFAULT_CACHE.enabled = False
+    return DEFAULT_CACHE
@@ -0,0 +1,218 @@
+import csv
+import hashlib
+import json
+import os
+import time
+import numpy as np
+import StringNameConverter as snc
+
+DEFAULT_STORE_PATH = "Results/store"
+INDEX_FILE = "index.jsonl"
+
+
+def node_table_digest(nodes):
+    """
+    Short content hash of a node order, used to share one node table between every run on the same network.
+    """
+    h = hashlib.sha1()
+    for node in nodes:
+        h.update(node.encode())
+        h.update(b"\n")
+    return h.hexdigest()[:16]
+
+
+def ranks_from_scores(scores):
+    """
+    Converts a score vector into 1-based ranks (1 = highest score). Ties keep node order.
+
+    @param scores: numpy array, one score per node
+    @returns: numpy int32 array, rank of every node
+    """
+    order = np.argsort(-np.asarray(scores), kind="stable")
+    ranks = np.empty(len(order), dtype=np.int32)
+    ranks[order] = np.arange(1, len(order) + 1, dtype=np.int32)
+    return ranks
+
+
+def _prepare_store(storePath):
+    if not os.path.isdir(storePath):
+        os.makedirs(storePath)
+
+
+def _new_run_id(metadata):
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    h = hashlib.sha1(json.dumps(metadata, sort_keys=True).encode() + str(time.time()).encode())
+    return "{0}-{1}".format(stamp, h.hexdigest()[:8])
+
+
+def _save_node_table(nodes, storePath):
+    digest = node_table_digest(nodes)
+    filePath = os.path.join(storePath, "nodes-" + digest + ".npy")
+    if not os.path.isfile(filePath):
+        np.save(filePath, np.array(nodes, dtype="S"))
+    return digest
+
+
+def _append_index(storePath, metadata):
+    with open(os.path.join(storePath, INDEX_FILE), "a") as index:
+        index.write(json.dumps(metadata, sort_keys=True) + "\n")
+
+
+def save_ranking(nodes, scores, metadata, storePath=DEFAULT_STORE_PATH):
+    """
+    Saves the scores of one algorithm run as a compressed columnar record.
+
+    @param nodes: list of node names, in the same order as scores
+    @param scores: numpy array, raw output vector of an algorithm
+    @param metadata: dict, json serializable description of the run (algorithm, network, disease genes, parameters)
+    @param storePath: directory holding the store
+    @returns: string, id of the saved run
+    """
+    _prepare_store(storePath)
+    metadata = dict(metadata)
+    metadata["kind"] = "ranking"
+    metadata["nodes"] = _save_node_table(nodes, storePath)
+    metadata["created"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    metadata["run"] = _new_run_id(metadata)
+    np.savez_compressed(os.path.join(storePath, metadata["run"] + ".npz"),
+                        scores=np.asarray(scores, dtype=np.float64),
+                        ranks=ranks_from_scores(scores),
+                        metadata=json.dumps(metadata))
+    _append_index(storePath, metadata)
+    return metadata["run"]
+
+
+def save_table(columns, metadata, storePath=DEFAULT_STORE_PATH):
+    """
+    Saves a small result table (for example leave-one-out results) as named columns.
+
+    @param columns: dict mapping column name to a list or numpy array, all of the same length
+    @param metadata: dict, json serializable description of the run
+    @param storePath: directory holding the store
+    @returns: string, id of the saved run
+    """
+    _prepare_store(storePath)
+    metadata = dict(metadata)
+    metadata.setdefault("kind", "table")
+    metadata["columns"] = list(columns.keys())
+    metadata["created"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    metadata["run"] = _new_run_id(metadata)
+    arrays = {}
+    for name, values in columns.items():
+        values = np.asarray(values)
+        if values.dtype.kind == "U":
+            values = values.astype("S")
+        arrays["col_" + name] = values
+    np.savez_compressed(os.path.join(storePath, metadata["run"] + ".npz"),
+                        metadata=json.dumps(metadata), **arrays)
+    _append_index(storePath, metadata)
+    return metadata["run"]
+
+
+def list_runs(storePath=DEFAULT_STORE_PATH, **filters):
+    """
+    Returns the metadata of every stored run, oldest first, optionally filtered on metadata fields.
+    e.g. list_runs(algorithm="rwr", kind="ranking")
+    """
+    indexPath = os.path.join(storePath, INDEX_FILE)
+    if not os.path.isfile(indexPath):
+        return []
+    runs = []
+    with open(indexPath, "r") as index:
+        for line in index:
+            if not line.strip():
+                continue
+            metadata = json.loads(line)
+            if all(metadata.get(key) == value for key, value in filters.items()):
+                runs.append(metadata)
+    return runs
+
+
+_node_tables = {}
+
+
+def load_nodes(digest, storePath=DEFAULT_STORE_PATH):
+    """
+    Returns (list of node names, dict of name -> index) for a stored node table. Tables are kept in memory after first use.
+    """
+    key = (os.path.abspath(storePath), digest)
+    if key not in _node_tables:
+        raw = np.load(os.path.join(storePath, "nodes-" + digest + ".npy"))
+        nodes = [n.decode() for n in raw]
+        _node_tables[key] = (nodes, {n: i for i, n in enumerate(nodes)})
+    return _node_tables[key]
+
+
+def load_run(runId, storePath=DEFAULT_STORE_PATH):
+    """
+    Loads a stored run.
+
+    @returns: dict with "metadata" and either "nodes", "scores", "ranks" (rankings) or "columns" (tables)
+    """
+    with np.load(os.path.join(storePath, runId + ".npz")) as data:
+        metadata = json.loads(str(data["metadata"]))
+        if metadata["kind"] == "ranking":
+            nodes, _ = load_nodes(metadata["nodes"], storePath)
+            return {"metadata": metadata, "nodes": nodes, "scores": data["scores"], "ranks": data["ranks"]}
+        columns = {}
+        for name in metadata["columns"]:
+            values = data["col_" + name]
+            if values.dtype.kind == "S":
+                values = np.char.decode(values)
+            columns[name] = values
+        return {"metadata": metadata, "columns": columns}
+
+
+def gene_ranks(gene, storePath=DEFAULT_STORE_PATH, **filters):
+    """
+    Looks up one gene in every stored ranking, without formatting or sorting any of them.
+
+    @param gene: STRING identifier (e.g. 9606.ENSP00000269305) or display name (e.g. TP53)
+    @returns: list of (metadata, rank, score) tuples; rank is None if the gene is not in that run's network
+    """
+    filters["kind"] = "ranking"
+    stringId = None  # STRING identifier of a display name, resolved once (name_to_string scans the whole table)
+    result = []
+    for metadata in list_runs(storePath, **filters):
+        _, index = load_nodes(metadata["nodes"], storePath)
+        i = index.get(gene)
+        if i is None:
+            if stringId is None:
+                stringId = snc.name_to_string(snc.load_lookup_table(), gene)
+            i = index.get(stringId)
+        if i is None:
+            result.append((metadata, None, None))
+            continue
+        with np.load(os.path.join(storePath, metadata["run"] + ".npz")) as data:
+            result.append((metadata, int(data["ranks"][i]), float(data["scores"][i])))
+    return result
+
+
+def write_csv(results, outputFile):
+    """
+    Writes formatted algorithm output (see GraphUtils.format_output) as the quoted csv our scripts have always produced.
+    """
+    with open(outputFile, "w", newline='') as of:
+        outputWriter = csv.writer(of, quoting=csv.QUOTE_ALL)
+        outputWriter.writerow(["Gene", "Ranking"])
+        for row in results:
+            outputWriter.writerow(row)
+
+
+def export_csv(runId, outputFile, storePath=DEFAULT_STORE_PATH):
+    """
+    Exports a stored run to text. Rankings are written in the same csv format as algorithm output,
+    tables are written as tab separated columns in their stored order.
+    """
+    run = load_run(runId, storePath)
+    if run["metadata"]["kind"] == "ranking":
+        table = snc.load_lookup_table()
+        order = np.argsort(run["ranks"])
+        results = [[run["nodes"][i], snc.string_to_name(table, run["nodes"][i]), run["scores"][i]] for i in order]
+        write_csv(results, outputFile)
+        return
+    columns = run["columns"]
+    names = run["metadata"]["columns"]
+    with open(outputFile, "w") as output:
+        for i in range(len(columns[names[0]])):
+            output.write("\t".join(str(columns[name][i]) for name in names) + "\n")
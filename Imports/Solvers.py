@@ -0,0 +1,238 @@
+"""
+Solvers for the linear fixed point x = damping * M x + offset shared by random walk with restart
+(damping = 1 - R, offset = R * start vector) and PageRank (damping = 1 - beta, offset = beta * prior bias).
+
+Every solver:
+    - works on a vector or an N x k matrix (one column per start vector, all solved together)
+    - starts from x0, so a previous solution (e.g. for a neighbouring parameter value) can be used as a warm start
+    - stops like the original loops: once the squared euclidean distance between two successive iterates is below tol
+      in every column, or after maxIterations (None = no limit); the accelerated solvers use the error bound of their
+      extrapolated iterates instead, so all of them stop at about the same accuracy (see Iteration.extrapolated_error)
+    - works in preallocated buffers instead of allocating new vectors every iteration
+    - returns (solution, number of iterations)
+    - optionally stops earlier through a stop(y, residual) check, e.g. a TopKCertificate
+
+    fixed      plain fixed point iteration, the original algorithm
+    aitken     fixed point iteration with a vector Aitken delta-squared extrapolation every fourth step
+    anderson   Anderson acceleration, mixing the last m iterates (per column)
+"""
+import numpy as np
+
+ANDERSON_DEPTH = 5
+AITKEN_PERIOD = 4
+# top-k mode: tolerance and iteration cap used instead of the usual ones, so the run ends on the certificate
+# (or once the iteration has converged to rounding error, e.g. when two top scores are exactly tied)
+TOPK_TOLERANCE = 1e-30
+TOPK_MAX_ITERATIONS = 1000
+
+
+def matvec_into(matrix, x, out):
+    # out = matrix x, without allocating for numpy arrays and operators with a dot_into (ParallelSpmv, OutOfCore)
+    if type(matrix) is np.ndarray:
+        if out.flags.c_contiguous:
+            np.dot(matrix, x, out=out)
+        else:
+            # np.dot only writes into C contiguous buffers
+            out[...] = np.dot(matrix, x)
+    elif hasattr(matrix, "dot_into"):
+        matrix.dot_into(x, out)
+    else:
+        out[...] = matrix.dot(x)
+    return out
+
+
+class Iteration:
+    """
+    Buffers of one fixed point problem. step() computes y = damping * M x + offset in place and returns the convergence measure.
+    """
+
+    def __init__(self, matrix, damping, offset, x0):
+        self.matrix = matrix
+        self.damping = damping
+        self.offset = np.asarray(offset, dtype=np.float64)
+        # C order, so dense products write straight into the buffers (seed matrices are often Fortran ordered)
+        self.x = np.array(x0, dtype=np.float64, order='C')
+        self.y = np.empty_like(self.x)
+        self.residual = np.empty_like(self.x)
+
+    def step(self):
+        matvec_into(self.matrix, self.x, self.y)
+        self.y *= self.damping
+        self.y += self.offset
+        np.subtract(self.y, self.x, out=self.residual)
+        return np.max(np.sum(np.square(self.residual), axis=0))
+
+    def extrapolated_error(self):
+        """
+        Convergence measure of the accelerated solvers, on the scale of tol. The step of a plain iterate shrinks
+        geometrically, so the fixed point loop ends well below its bound damping / (1 - damping) |y - x|. An extrapolated
+        x has no such tail, only |x* - x| <= |y - x| / (1 - damping), so the accelerated solvers stop once that bound is
+        below sqrt(tol). Against converged solutions this matches or beats the error of the fixed point loop.
+        """
+        return np.max(np.sum(np.square(self.residual), axis=0) / np.square(1 - self.damping))
+
+
+def not_done(diff, tol, iterations, maxIterations):
+    return diff > tol and (maxIterations is None or iterations < maxIterations)
+
+
+class TopKCertificate:
+    """
+    Stopping check that is true once the identity and order of the top k scores of every column can no longer change.
+
+    For x = d M x + offset with ||M||_2 <= 1 (true for the symmetric normalized adjacency matrix) the map is a contraction
+    with factor d, so for any iterate x and y = g(x)
+        ||x* - y||_inf <= ||x* - y||_2 <= d / (1 - d) ||y - x||_2
+    Every entry of y is within that bound of its limit, so once the gaps between the k + 1 highest entries are all larger
+    than twice the bound, the top k set and its order are certified. With ordered=False only the gap between
+    entries k and k + 1 (the identity of the set) has to be certified.
+    """
+
+    def __init__(self, k, damping, ordered=True):
+        self.k = k
+        self.factor = damping / (1 - damping)
+        self.ordered = ordered
+
+    def __call__(self, y, residual):
+        if y.shape[0] <= self.k:
+            return False
+        bound = self.factor * np.sqrt(np.sum(np.square(residual), axis=0))
+        top = np.partition(-y, self.k, axis=0)[:self.k + 1]
+        top = -np.sort(top, axis=0)
+        gaps = top[:-1] - top[1:]
+        if not self.ordered:
+            gaps = gaps[-1:]
+        return bool(np.all(gaps > 2 * bound))
+
+
+def fixed_point(matrix, damping, offset, x0, tol=1e-6, maxIterations=None, stop=None):
+    it = Iteration(matrix, damping, offset, x0)
+    diff = float('inf')
+    iterations = 0
+    while not_done(diff, tol, iterations, maxIterations):
+        diff = it.step()
+        if stop is not None and stop(it.y, it.residual):
+            diff = 0
+        it.x, it.y = it.y, it.x
+        iterations += 1
+    return it.x, iterations
+
+
+def aitken(matrix, damping, offset, x0, tol=1e-6, maxIterations=None, stop=None, period=AITKEN_PERIOD):
+    """
+    Fixed point iteration with a vector Aitken delta-squared step every period-th iterate. From the differences
+    d1 = x1 - x0 and d2 = x2 - x1 of the iterates period/2 steps apart, the convergence ratio of every column is
+    estimated as l = <d2, d1> / <d1, d1>, and the iterate jumps to the limit of that geometric sequence,
+    x2 + l / (1 - l) d2. Comparing iterates two steps apart keeps the ratio positive when the slowest mode
+    alternates in sign (eigenvalue near -1, e.g. bipartite parts of the network).
+    Columns with a ratio outside (0, 1) are left alone.
+    """
+    it = Iteration(matrix, damping, offset, x0)
+    half = period // 2
+    anchor = np.copy(it.x)
+    middle = np.empty_like(it.x)
+    d1 = np.empty_like(it.x)
+    d2 = np.empty_like(it.x)
+    diff = float('inf')
+    iterations = 0
+    while not_done(diff, tol, iterations, maxIterations):
+        it.step()
+        diff = it.extrapolated_error()
+        if stop is not None and stop(it.y, it.residual):
+            diff = 0
+        it.x, it.y = it.y, it.x
+        iterations += 1
+        if iterations % period == half:
+            np.copyto(middle, it.x)
+        elif iterations % period == 0:
+            if not_done(diff, tol, iterations, maxIterations):
+                np.subtract(middle, anchor, out=d1)
+                np.subtract(it.x, middle, out=d2)
+                d1d1 = np.sum(np.square(d1), axis=0)
+                ratio = np.sum(d2 * d1, axis=0) / np.where(d1d1 > 0, d1d1, 1)
+                ratio = np.where((ratio > 0) & (ratio < 1), ratio, 0)
+                d2 *= ratio / (1 - ratio)
+                it.x += d2
+            np.copyto(anchor, it.x)
+    return it.x, iterations
+
+
+def anderson(matrix, damping, offset, x0, tol=1e-6, maxIterations=None, stop=None, depth=ANDERSON_DEPTH):
+    """
+    Anderson acceleration (type II) of g(x) = damping * M x + offset: the next iterate is the combination of the last
+    depth + 1 values of g that minimises the combined residual g(x) - x, solved separately for every column.
+    """
+    it = Iteration(matrix, damping, offset, x0)
+    matrixInput = it.x.ndim == 1
+    if matrixInput:
+        it.x = it.x[:, np.newaxis]
+        it.y = it.y[:, np.newaxis]
+        it.residual = it.residual[:, np.newaxis]
+        it.offset = it.offset.reshape(-1, 1)
+    n, k = it.x.shape
+    # ring buffers of the differences of g and of the residuals between successive iterates
+    deltaG = np.zeros((depth, n, k))
+    deltaF = np.zeros((depth, n, k))
+    previousG = np.empty((n, k))
+    previousF = np.empty((n, k))
+    diff = float('inf')
+    iterations = 0
+    while not_done(diff, tol, iterations, maxIterations):
+        it.step()
+        diff = it.extrapolated_error()
+        if stop is not None and stop(it.y, it.residual):
+            diff = 0
+        iterations += 1
+        if iterations > 1:
+            slot = (iterations - 2) % depth
+            np.subtract(it.y, previousG, out=deltaG[slot])
+            np.subtract(it.residual, previousF, out=deltaF[slot])
+        np.copyto(previousG, it.y)
+        np.copyto(previousF, it.residual)
+        used = min(iterations - 1, depth)
+        if used == 0 or not not_done(diff, tol, iterations, maxIterations):
+            it.x, it.y = it.y, it.x
+            continue
+        dF = deltaF[:used]
+        # per column least squares: minimise |f - dF gamma| via the (regularised) normal equations
+        gram = np.einsum("inc,jnc->cij", dF, dF)
+        rhs = np.einsum("inc,nc->ci", dF, it.residual)
+        scale = np.trace(gram, axis1=1, axis2=2)[:, np.newaxis, np.newaxis]
+        gram += 1e-10 * scale * np.eye(used) + 1e-300 * np.eye(used)
+        gamma = np.linalg.solve(gram, rhs[:, :, np.newaxis])[:, :, 0]
+        np.copyto(it.x, it.y)
+        it.x -= np.einsum("inc,ci->nc", deltaG[:used], gamma)
+    if matrixInput:
+        return it.x[:, 0], iterations
+    return it.x, iterations
+
+
+SOLVERS = {
+    "fixed": fixed_point,
+    "aitken": aitken,
+    "anderson": anderson,
+}
+
+
+def solve(matrix, damping, offset, x0, tol=1e-6, maxIterations=None, solver="fixed", topK=None):
+    """
+    Solves x = damping * matrix x + offset with the named solver (see SOLVERS).
+
+    @param matrix: numpy array, scipy sparse matrix or ParallelSpmv operator
+    @param damping: float, or numpy array with one damping factor per column (e.g. random walk and PageRank columns solved together)
+    @param x0: start vector (or N x k matrix), e.g. a previous solution as warm start
+    @param topK: if given, run until the top topK entries of every column and their order are certified
+                 (see TopKCertificate) instead of until tol; the other entries are only approximate then.
+                 The usual tolerance is too loose to fix the order of the top entries, so this may take more
+                 iterations than tol, but far fewer than converging every entry.
+
+    @returns: (solution, number of iterations)
+    """
+    stop = None
+    if topK is not None:
+        stop = TopKCertificate(topK, damping)
+        tol = TOPK_TOLERANCE
+        maxIterations = TOPK_MAX_ITERATIONS if maxIterations is None else max(maxIterations, TOPK_MAX_ITERATIONS)
+    result, iterations = SOLVERS[solver](matrix, damping, offset, x0, tol, maxIterations, stop)
+    print("Solver", solver, "finished after", iterations, "iterations")
+    return result, iterations
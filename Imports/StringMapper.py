@@ -0,0 +1,203 @@
+"""
+Maps gene / protein names to STRING identifiers.
+
+Names are resolved in three steps, and only the leftovers of one step go to the next:
+    1. the local lookup table (Data/protein-name-lookup-table.tsv), case insensitive
+    2. the alias cache, a tsv file of every name the remote API was asked about before (unresolved names included)
+    3. the STRING API (or any server speaking the same get_string_ids protocol), in parallel chunks over one
+       pooled session that retries failed requests. New answers are appended to the alias cache.
+
+If the remote API cannot be reached the names it would have resolved are reported as unresolved instead of failing.
+"""
+import csv
+import os
+from concurrent.futures import ThreadPoolExecutor
+from StringNameConverter import LOOKUP_TABLE_PATH
+
+DEFAULT_API_URL = "https://string-db.org/api"
+ALIAS_CACHE_PATH = "Data/string-alias-cache.tsv"
+OUTPUT_FORMAT = "tsv-no-header"
+METHOD = "get_string_ids"
+SPECIES = 9606
+CHUNK_SIZE = 500
+THREADS = 4
+RETRIES = 3
+TIMEOUT = 30
+CALLER_IDENTITY = "DiseaseGeneNetworkAnalysis"
+
+# marks a name the remote API could not resolve, so it is not asked again
+UNRESOLVED = ""
+
+
+def load_name_index(lookupTablePath=LOOKUP_TABLE_PATH):
+    """
+    Index of the local lookup table: upper case display name -> STRING id. STRING ids also map to themselves.
+    """
+    index = {}
+    with open(lookupTablePath, newline='') as f:
+        reader = csv.reader(f, delimiter='\t')
+        next(reader)
+        for row in reader:
+            index.setdefault(row[1].upper(), row[2])
+            index[row[2].upper()] = row[2]
+    return index
+
+
+def load_alias_cache(cachePath=ALIAS_CACHE_PATH):
+    """
+    @returns: dict, name -> STRING id (UNRESOLVED if the remote API did not know it)
+    """
+    cache = {}
+    if not os.path.isfile(cachePath):
+        return cache
+    with open(cachePath, newline='') as f:
+        for row in csv.reader(f, delimiter='\t'):
+            if len(row) == 2:
+                cache[row[0]] = row[1]
+    return cache
+
+
+def append_alias_cache(mapping, cachePath=ALIAS_CACHE_PATH):
+    directory = os.path.dirname(cachePath)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(cachePath, "a", newline='') as f:
+        writer = csv.writer(f, delimiter='\t')
+        for name, stringId in mapping.items():
+            writer.writerow([name, stringId])
+
+
+def create_session(retries=RETRIES, poolSize=THREADS):
+    """
+    requests session with a connection pool of poolSize connections, retrying connection errors and
+    429/5xx answers with exponential backoff.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=None)
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=poolSize, pool_maxsize=poolSize)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def parse_response(text):
+    """
+    Parses a get_string_ids tsv answer (with echo_query) into a dict, query name -> STRING id.
+    """
+    mapping = {}
+    for line in text.strip().split("\n"):
+        fields = line.split("\t")
+        if len(fields) > 2:
+            mapping.setdefault(fields[0], fields[2])
+    return mapping
+
+
+class StringMapper:
+    """
+    Resolves names to STRING identifiers (see the module docstring).
+
+    @param apiUrl: base url of the API, e.g. "https://string-db.org/api" or a local stand-in server
+    @param offline: if True the remote API is never called
+    """
+
+    def __init__(self, apiUrl=DEFAULT_API_URL, species=SPECIES, lookupTablePath=LOOKUP_TABLE_PATH,
+                 cachePath=ALIAS_CACHE_PATH, chunkSize=CHUNK_SIZE, threads=THREADS, retries=RETRIES,
+                 timeout=TIMEOUT, offline=False):
+        self.apiUrl = apiUrl.rstrip("/")
+        self.species = species
+        self.cachePath = cachePath
+        self.chunkSize = chunkSize
+        self.threads = threads
+        self.retries = retries
+        self.timeout = timeout
+        self.offline = offline
+        self.index = load_name_index(lookupTablePath)
+        self.aliases = load_alias_cache(cachePath)
+        self.session = None
+
+    def lookup_local(self, name):
+        stringId = self.index.get(name.upper())
+        if stringId is None:
+            stringId = self.aliases.get(name)
+        return stringId
+
+    def query_chunk(self, names):
+        params = {
+            "identifiers": "\r".join(names),
+            "species": self.species,
+            "limit": 1,  # only one (best) identifier per input protein
+            "echo_query": 1,
+            "caller_identity": CALLER_IDENTITY
+        }
+        response = self.session.post(self.apiUrl + "/" + OUTPUT_FORMAT + "/" + METHOD, data=params, timeout=self.timeout)
+        response.raise_for_status()
+        return parse_response(response.text)
+
+    def query_remote(self, names):
+        """
+        Asks the remote API about names, chunkSize names per request and up to threads requests at a time.
+        Answers (including names without a match) are added to the alias cache; chunks that fail are left out.
+
+        @returns: dict, name -> STRING id for the names that were resolved
+        """
+        import requests
+        if self.session is None:
+            self.session = create_session(self.retries, self.threads)
+        chunks = [names[i:i + self.chunkSize] for i in range(0, len(names), self.chunkSize)]
+
+        def query(chunk):
+            try:
+                return chunk, self.query_chunk(chunk)
+            except requests.exceptions.RequestException as e:
+                print("STRING request for", len(chunk), "names failed:", e)
+                return chunk, None
+
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            answers = list(pool.map(query, chunks))
+
+        resolved = {}
+        newAliases = {}
+        for chunk, mapping in answers:
+            if mapping is None:
+                continue
+            for name in chunk:
+                newAliases[name] = mapping.get(name, UNRESOLVED)
+            resolved.update({name: stringId for name, stringId in mapping.items() if name in newAliases})
+        if newAliases:
+            self.aliases.update(newAliases)
+            append_alias_cache(newAliases, self.cachePath)
+        return resolved
+
+    def map_names(self, names):
+        """
+        @param names: list of gene / protein names
+        @returns: dict, name -> STRING id, or None if the name could not be resolved
+        """
+        result = {}
+        remaining = []
+        numLocal = 0
+        for name in names:
+            if name in result:
+                continue
+            stringId = self.lookup_local(name)
+            if stringId is None:
+                remaining.append(name)
+                result[name] = None
+            elif stringId == UNRESOLVED:
+                result[name] = None
+            else:
+                numLocal += 1
+                result[name] = stringId
+
+        numRemote = 0
+        if remaining and not self.offline:
+            print("Resolving", len(remaining), "names with", self.apiUrl)
+            for name, stringId in self.query_remote(remaining).items():
+                result[name] = stringId
+                numRemote += 1
+        numUnresolved = sum(1 for stringId in result.values() if stringId is None)
+        print("names:", len(result), "resolved locally:", numLocal, "remotely:", numRemote, "unresolved:", numUnresolved)
+        return result
@@ -15,7 +15,7 @@ def load_lookup_table():
 def name_to_string(table, n):
     try:
         return list(table.keys())[list(table.values()).index(n)]
-    except KeyError:
+    except (KeyError, ValueError):
         return n
 
 
@@ -0,0 +1,167 @@
+"""
+Scores of a few target proteins (e.g. candidate genes from a GWAS hit list) without propagating over the whole network.
+
+Random walk with restart and PageRank both solve x = a W x + c v (a = 1 - r, c = r, v = start vector for the random walk;
+a = 1 - beta, c = beta, v = prior bias for PageRank) with the symmetric W = D^-1/2 A D^-1/2. With P = D^-1 A,
+W = D^1/2 P D^-1/2, so the score of a target t is
+    x_t = c d_t^-1/2 sum_u g_u d_u^1/2 v_u,    with g = (I - a P)^-1 e_t
+and g, the contribution of every protein to t, is found with a backward push from t (Andersen et al.): starting from
+the residual e_t, the residual of every protein above a threshold is moved to g and spread to its neighbours w as
+a A_uw r_u / d_w. Pushes only touch the neighbourhood of t that contributes more than the threshold, so the cost grows
+with the number of targets instead of the size of the network. All proteins above the threshold are pushed together
+in one vectorized round.
+
+Because (I - a P)^-1 has row sums 1 / (1 - a), every entry of g is within threshold / (1 - a) of its limit once no
+residual is above the threshold; the threshold of every target is picked so its score is within tol of the exact score.
+The default tol is the accuracy of a full run, whose stop rule leaves an error of about 1e-6 in every score.
+
+On a well connected network a push can still spread over the whole component, so the work of all pushes (adjacency
+entries read) is capped at the cost of one full propagation. Once the cap is reached the targets are scored from one
+full propagation instead, so scoring targets never costs much more than a full run.
+"""
+import numpy as np
+
+TOLERANCE = 10**(-6)  # absolute error of every target score, about that of a full run
+FULL_RUN_THRESHOLD = 10**(-6)  # stop rule of the full propagation fallback, as in RandomWalk.random_walk_scores
+DENSE_ROUND_FRACTION = 8  # push rounds reading more than N / 8 adjacency entries update the whole residual at once
+
+
+def network_arrays(graph):
+    # CSR adjacency matrix and degrees, from the shared operators (graph.nodes() order)
+    import Operators
+    operators = Operators.load_operators(graph)
+    return operators.adjacency, operators.degrees
+
+
+def full_propagation_cost(adjacency, damping):
+    # adjacency entries read by a full run: one product per iteration, until the step shrinks (by damping per iteration)
+    # below the square root of its squared norm threshold
+    iterations = int(np.ceil(np.log(np.sqrt(FULL_RUN_THRESHOLD)) / np.log(damping)))
+    return adjacency.nnz * max(iterations, 1)
+
+
+def spread_matrix(adjacency, degrees, damping):
+    # damping A D^-1: entry (u, w) is the share of the residual of u that a push moves to its neighbour w
+    import scipy.sparse
+    inverse = np.zeros(len(degrees))
+    inverse[degrees > 0] = 1 / degrees[degrees > 0]
+    return scipy.sparse.csr_matrix(damping * adjacency.dot(scipy.sparse.diags(inverse)))
+
+
+def backward_push(spread, target, threshold, maxWork=None):
+    """
+    Contributions g = (I - damping P)^-1 e_target, up to threshold / (1 - damping) in every entry.
+
+    @param spread: damping A D^-1, see spread_matrix()
+    @param maxWork: optional limit on the adjacency entries read; the push gives up once it is exceeded
+    @returns: (numpy array g, or None if maxWork was exceeded, number of pushes, adjacency entries read)
+    """
+    n = spread.shape[0]
+    estimate = np.zeros(n)
+    residual = np.zeros(n)
+    residual[target] = 1.0
+    pushes = 0
+    work = 0
+    slot = np.empty(n, dtype=np.int64)
+    active = np.array([target])
+    while len(active) > 0:
+        mass = residual[active]
+        estimate[active] += mass
+        residual[active] = 0
+        # r_w += damping * A_uw r_u / d_w for every neighbour w of an active u
+        rows = spread[active]
+        pushes += len(active)
+        work += rows.nnz
+        if maxWork is not None and work > maxWork:
+            return None, pushes, work
+        if rows.nnz > n // DENSE_ROUND_FRACTION:
+            # a round that reaches much of the network is cheaper as one sparse product over all proteins
+            residual += rows.T.dot(mass)
+            active = np.flatnonzero(residual > threshold)
+            continue
+        # otherwise touch only the neighbours; only they can have crossed the threshold
+        touched = rows.indices
+        np.add.at(residual, touched, rows.data * np.repeat(mass, np.diff(rows.indptr)))
+        # distinct proteins above the threshold, without sorting: every protein keeps the position of its last occurrence
+        candidates = touched[residual[touched] > threshold]
+        positions = np.arange(len(candidates))
+        slot[candidates] = positions
+        active = candidates[slot[candidates] == positions]
+    return estimate, pushes, work
+
+
+def propagated_scores(graph, vector, targets, damping, weight):
+    """
+    Entries targets of the solution of x = damping W x + weight * vector, from one full propagation.
+    """
+    import Operators
+    import Solvers
+    operators = Operators.load_operators(graph)
+    # started from vector, like the random walk, so the scores equal those of a full run
+    scores, iterations = Solvers.solve(operators.normalized, damping, weight * vector, vector, FULL_RUN_THRESHOLD)
+    return scores[targets]
+
+
+def target_scores(graph, vector, targets, damping, weight, tol=TOLERANCE):
+    """
+    Entries targets of the solution of x = damping W x + weight * vector, by backward push from every target, or from one
+    full propagation once the pushes cost more than that.
+
+    @param vector: start vector (random walk) or prior bias (PageRank), in graph.nodes() order
+    @param targets: list of node indexes
+    @returns: numpy array, one score per target
+    """
+    adjacency, degrees = network_arrays(graph)
+    vector = np.asarray(vector, dtype=np.float64)
+    weighted = np.sqrt(degrees) * vector
+    total = np.sum(np.abs(weighted))
+    scores = np.zeros(len(targets))
+    if total == 0:
+        return scores
+    spread = spread_matrix(adjacency, degrees, damping)
+    budget = full_propagation_cost(adjacency, damping)
+    totalPushes = 0
+    totalWork = 0
+    for i, t in enumerate(targets):
+        # error of x_t <= weight d_t^-1/2 * threshold / (1 - damping) * total
+        threshold = tol * (1 - damping) * np.sqrt(degrees[t]) / (weight * total)
+        contributions, pushes, work = backward_push(spread, t, threshold, budget - totalWork)
+        totalPushes += pushes
+        totalWork += work
+        if contributions is None:
+            print("Pushes for", i + 1, "of", len(targets), "targets cost more than a full propagation, propagating instead")
+            return propagated_scores(graph, vector, targets, damping, weight)
+        scores[i] = weight / np.sqrt(degrees[t]) * np.dot(contributions, weighted)
+    print("Scored", len(targets), "targets with", totalPushes, "pushes")
+    return scores
+
+
+def random_walk_targets(graph, startVector, targets, r=0.4, tol=TOLERANCE):
+    """
+    Random walk with restart scores of the targets only (see RandomWalk.random_walk_scores).
+    """
+    return target_scores(graph, startVector, targets, 1 - r, r, tol)
+
+
+def page_rank_targets(graph, priorBias, targets, beta, tol=TOLERANCE):
+    """
+    PageRank scores of the targets only (see PageRank.rank_genes). The start vector does not change the fixed point.
+    """
+    return target_scores(graph, priorBias, targets, 1 - beta, beta, tol)
+
+
+def load_targets(path, graph):
+    """
+    Reads a candidate gene file (one protein per line, like a disease gene file).
+
+    @returns: (list of target names in the network, numpy array of their node indexes)
+    """
+    import loader
+    index = {node: i for i, node in enumerate(graph.nodes())}
+    names = []
+    for gene in loader.load_disease_genes(path):
+        if gene in index:
+            names.append(gene)
+        elif gene:
+            print("Skipping target", gene, "- it is not in the PPI network")
+    return names, np.array([index[name] for name in names], dtype=np.int64)
@@ -0,0 +1,229 @@
+"""
+Work queue in a shared directory, so one validation campaign can run on any number of processes and hosts without a
+message broker. Every worker only needs to see the directory (local disk, or NFS v3+ for several hosts).
+
+Layout of a queue directory:
+    job.json            description shared by every unit (e.g. network, split)
+    units/<id>.json     one file per work unit
+    claims/<id>         created with O_CREAT | O_EXCL by the worker that runs the unit (so exactly one worker gets it),
+                        holding its host, pid and start time
+    results/<id>.json   result of a finished unit, written under a temporary name and renamed
+
+A worker touches its claim every lease / 4 seconds while it runs the unit. A claim that was not touched for a whole
+lease, without a result, belongs to a worker that died: it is renamed away and the unit is claimed again. Clocks of
+the hosts must agree to well within the lease. In the rare race where two workers break the same stale claim, a unit
+runs twice, and both runs write the same result.
+"""
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+
+DEFAULT_LEASE = 600  # seconds without heartbeat before a claim is considered dead
+
+
+def write_json(path, data):
+    # atomic write: readers on any host see the whole file or nothing
+    temporary = "{0}.{1}.tmp".format(path, uuid.uuid4().hex)
+    with open(temporary, "w") as f:
+        json.dump(data, f, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def read_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+class Heartbeat:
+    """
+    Touches a claim file from a background thread until stopped.
+    """
+
+    def __init__(self, path, interval):
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                os.utime(self.path)
+            except OSError:
+                return
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stopped.set()
+        self.thread.join()
+
+
+class WorkQueue:
+    """
+    Shared directory work queue, e.g.
+        queue = WorkQueue("/shared/lymphoma-loo")
+        queue.submit({"network": ...}, {"000001": {...}, ...})       # once
+        queue.work(run_unit)                                         # on every worker
+        results = queue.results()                                    # when queue.status()["pending"] == 0
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.unitsDirectory = os.path.join(directory, "units")
+        self.claimsDirectory = os.path.join(directory, "claims")
+        self.resultsDirectory = os.path.join(directory, "results")
+
+    def _unit_path(self, unitId):
+        return os.path.join(self.unitsDirectory, unitId + ".json")
+
+    def _claim_path(self, unitId):
+        return os.path.join(self.claimsDirectory, unitId)
+
+    def _result_path(self, unitId):
+        return os.path.join(self.resultsDirectory, unitId + ".json")
+
+    def submit(self, job, units):
+        """
+        Creates the queue, or adds units to an existing queue of the same job. Units that exist already are kept.
+
+        @param job: json serializable dict shared by all units
+        @param units: dict of unit id (sortable string, used as file name) -> json serializable unit description
+        @returns: number of units added
+        """
+        for directory in (self.unitsDirectory, self.claimsDirectory, self.resultsDirectory):
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+        jobPath = os.path.join(self.directory, "job.json")
+        if os.path.isfile(jobPath):
+            if read_json(jobPath) != json.loads(json.dumps(job)):
+                raise ValueError("Queue {0} holds a different job: {1}".format(self.directory, read_json(jobPath)))
+        else:
+            write_json(jobPath, job)
+        added = 0
+        for unitId, unit in units.items():
+            if not os.path.isfile(self._unit_path(unitId)):
+                write_json(self._unit_path(unitId), unit)
+                added += 1
+        return added
+
+    def job(self):
+        return read_json(os.path.join(self.directory, "job.json"))
+
+    def unit_ids(self):
+        return sorted(f[:-len(".json")] for f in os.listdir(self.unitsDirectory) if f.endswith(".json"))
+
+    def unit(self, unitId):
+        return read_json(self._unit_path(unitId))
+
+    def is_done(self, unitId):
+        return os.path.isfile(self._result_path(unitId))
+
+    def _claim_is_stale(self, unitId, lease):
+        try:
+            return time.time() - os.path.getmtime(self._claim_path(unitId)) > lease
+        except FileNotFoundError:
+            return False
+
+    def claim(self, unitId, lease=DEFAULT_LEASE):
+        """
+        Tries to take a unit. A dead claim (older than lease) is broken first.
+
+        @returns: True if this process now owns the unit
+        """
+        if self.is_done(unitId):
+            return False
+        path = self._claim_path(unitId)
+        if self._claim_is_stale(unitId, lease):
+            try:
+                os.rename(path, "{0}.stale.{1}".format(path, uuid.uuid4().hex))
+                print("Breaking stale claim of unit", unitId)
+            except FileNotFoundError:
+                pass  # another worker broke it first
+        try:
+            handle = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(handle, "w") as f:
+            json.dump({"host": socket.gethostname(), "pid": os.getpid(), "time": time.strftime("%Y-%m-%dT%H:%M:%S")}, f)
+        if self.is_done(unitId):  # finished by the previous owner between the checks
+            self.release(unitId)
+            return False
+        return True
+
+    def release(self, unitId):
+        # gives a claimed unit back, e.g. after an error, so another worker can run it
+        try:
+            os.remove(self._claim_path(unitId))
+        except FileNotFoundError:
+            pass
+
+    def complete(self, unitId, result):
+        write_json(self._result_path(unitId), result)
+        self.release(unitId)
+
+    def next_unit(self, lease=DEFAULT_LEASE, skip=()):
+        """
+        Claims the first unit that is neither finished nor claimed by a live worker.
+
+        @returns: unit id, or None if there is nothing left to claim
+        """
+        for unitId in self.unit_ids():
+            if unitId not in skip and self.claim(unitId, lease):
+                return unitId
+        return None
+
+    def work(self, run_unit, lease=DEFAULT_LEASE, maxUnits=None):
+        """
+        Runs units until none is left to claim (or maxUnits are done).
+
+        @param run_unit: function (job, unit) -> json serializable result
+        @returns: number of units this worker finished
+        """
+        job = self.job()
+        failed = set()
+        done = 0
+        while maxUnits is None or done < maxUnits:
+            unitId = self.next_unit(lease, failed)
+            if unitId is None:
+                break
+            print("Running unit", unitId, "on", socket.gethostname(), "pid", os.getpid())
+            try:
+                with Heartbeat(self._claim_path(unitId), lease / 4):
+                    result = run_unit(job, self.unit(unitId))
+            except Exception as e:
+                # another worker may succeed (e.g. with more memory); this one does not try the unit again
+                print("Unit", unitId, "failed:", repr(e))
+                failed.add(unitId)
+                self.release(unitId)
+                continue
+            self.complete(unitId, result)
+            done += 1
+        return done
+
+    def status(self, lease=DEFAULT_LEASE):
+        """
+        @returns: dict with the number of units that are done, running (live claim), stale (dead claim) and pending
+        """
+        counts = {"done": 0, "running": 0, "stale": 0, "pending": 0}
+        for unitId in self.unit_ids():
+            if self.is_done(unitId):
+                counts["done"] += 1
+            elif os.path.isfile(self._claim_path(unitId)):
+                counts["stale" if self._claim_is_stale(unitId, lease) else "running"] += 1
+            else:
+                counts["pending"] += 1
+        return counts
+
+    def results(self):
+        """
+        @returns: dict of unit id -> result, for every finished unit
+        """
+        return {unitId: read_json(self._result_path(unitId)) for unitId in self.unit_ids() if self.is_done(unitId)}
@@ -1,11 +1,13 @@
-import networkx as nx
 import numpy as np
+from array import array
+import CompactGraph
 
 
 def load_graph(path):
     """
     Loads data from TSV file pointed to by path into a networkx graph
     """
+    import networkx as nx
     graph = nx.Graph(name=path)
     print(graph.name)
     with open(path, 'r') as input_file:
@@ -16,6 +18,29 @@ def load_graph(path):
     return graph
 
 
+def load_compact_graph(path):
+    """
+    Loads data from TSV file pointed to by path into a CompactGraph (int node ids, CSR adjacency).
+    Same nodes, node order and edges as load_graph, at a fraction of the memory and pickle size.
+    """
+    print(path)
+    ids = {}
+    sources = array('i')
+    targets = array('i')
+    confidence = array('h')
+    with open(path, 'r') as input_file:
+        input_file.readline()
+        for line in input_file:
+            data = line.strip().split(" ")
+            source = ids.setdefault(data[0], len(ids))
+            target = ids.setdefault(data[1], len(ids))
+            sources.append(source)
+            targets.append(target)
+            confidence.append(int(data[2]))
+    return CompactGraph.from_edge_arrays(path, list(ids), np.frombuffer(sources, dtype=np.int32),
+                                         np.frombuffer(targets, dtype=np.int32), np.frombuffer(confidence, dtype=np.int16))
+
+
 def load_disease_genes(path):
     """
     Loads disease genes from TSV file and returns a python list of all names
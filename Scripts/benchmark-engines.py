@@ -0,0 +1,197 @@
+import sys
+sys.path.insert(1, '../Algorithms/')
+sys.path.insert(1, 'Algorithms/')
+sys.path.insert(1, '../Imports/')
+sys.path.insert(1, 'Imports/')
+import gc
+import time
+import tracemalloc
+import numpy as np
+import RandomWalk as rwr
+import PageRank as pr
+import DiffusionKernel as dk
+import loader
+import DiseaseSets
+import Evaluation
+import OutOfCore
+from LowRank import top_overlap
+from ArgUtils import pop_option
+from CacheUtils import compute_if_not_cached
+
+USAGE = """Usage: python3 benchmark-engines.py path-to-ppi-network [path-to-ppi-network ...]
+    Optional arguments: --algorithm rwr|pr|dk|all, --r R, --beta BETA (PageRank), --dk-beta BETA,
+                        --folds K, --top K, --output file.tsv
+
+Runs every engine of every algorithm on the same seed sets: the training genes of K folds (default 5) of every disease
+gene file in Data/, one column each, propagated together. Every engine is compared with the reference the other
+engines must match (dense random walk and PageRank, eigh diffusion kernel) and the table gives, per network and
+engine:
+    seconds     wall time of one run (after a warm up run that builds the cached operators)
+    peak MB     peak of the numpy / python memory allocated during a run (tracemalloc; BLAS buffers are not counted)
+    L1, Linf    mean over the seed sets of the L1 and largest absolute difference from the reference scores
+    tau         mean Kendall tau of the ranking against the reference ranking
+    top         mean fraction of the reference top K (default 150) non seed proteins that the engine also ranks top K
+    AUROC       mean AUROC of the held out genes of every fold among the non training proteins
+PageRank uses every seed set as its own prior bias."""
+
+TOP = 150
+FOLDS = 5
+RESTART = 0.4
+PR_BETA = 0.4
+DK_BETA = 1.0
+
+
+def rwr_engines(r, top):
+    return [
+        ("dense", "compact", lambda graph, seeds: rwr.random_walk_scores(graph, seeds, r)),
+        ("sparse", "compact", lambda graph, seeds: rwr.random_walk_scores(graph, seeds, r, engine="sparse")),
+        ("sparse aitken", "compact", lambda graph, seeds: rwr.random_walk_scores(graph, seeds, r, engine="sparse", solver="aitken")),
+        ("sparse anderson", "compact", lambda graph, seeds: rwr.random_walk_scores(graph, seeds, r, engine="sparse", solver="anderson")),
+        ("sparse top-k", "compact", lambda graph, seeds: rwr.random_walk_scores(graph, seeds, r, engine="sparse", topK=top)),
+        ("lowrank", "compact", lambda graph, seeds: rwr.random_walk_scores(graph, seeds, r, engine="lowrank")),
+        ("outofcore", "outofcore", lambda graph, seeds: rwr.random_walk_scores(graph, seeds, r, engine="outofcore")),
+    ]
+
+
+def pr_engines(beta, top):
+    return [
+        ("dense", "compact", lambda graph, seeds: pr.rank_genes(graph, seeds, seeds, beta)),
+        ("sparse", "compact", lambda graph, seeds: pr.rank_genes(graph, seeds, seeds, beta, engine="sparse")),
+        ("sparse aitken", "compact", lambda graph, seeds: pr.rank_genes(graph, seeds, seeds, beta, engine="sparse", solver="aitken")),
+        ("sparse anderson", "compact", lambda graph, seeds: pr.rank_genes(graph, seeds, seeds, beta, engine="sparse", solver="anderson")),
+        ("sparse top-k", "compact", lambda graph, seeds: pr.rank_genes(graph, seeds, seeds, beta, engine="sparse", topK=top)),
+        ("outofcore", "outofcore", lambda graph, seeds: pr.rank_genes(graph, seeds, seeds, beta, engine="outofcore")),
+    ]
+
+
+def dk_engines(beta):
+    return [
+        ("eigh", "compact", lambda graph, seeds: dk.diffusion_kernel_scores(graph, seeds, beta)),
+        ("chebyshev", "compact", lambda graph, seeds: dk.diffusion_kernel_scores(graph, seeds, beta, method="chebyshev")),
+        ("outofcore", "outofcore", lambda graph, seeds: dk.diffusion_kernel_scores(graph, seeds, beta, method="chebyshev")),
+    ]
+
+
+def fold_seeds(graph, diseaseGeneFiles, folds):
+    """
+    @returns: (N x C boolean training mask, list with the held out node indexes of every column)
+    """
+    masks = []
+    heldout = []
+    for path in diseaseGeneFiles:
+        genes = np.flatnonzero(loader.load_start_vector(path, graph))
+        if len(genes) < 2:
+            continue
+        splits = Evaluation.k_fold_splits(len(genes), min(folds, len(genes)))
+        masks.append(Evaluation.training_mask(genes, splits, graph.number_of_nodes()))
+        heldout.extend(genes[split] for split in splits)
+    if not masks:
+        print("No disease gene file in Data/ has two or more genes in {0}; check that the disease gene files use the "
+              "protein identifiers of the network".format(graph.name))
+        sys.exit(1)
+    return np.hstack(masks), heldout
+
+
+def measure(run):
+    """
+    @returns: (scores, seconds, peak bytes) of run(), after one untimed warm up run
+    """
+    run()
+    gc.collect()
+    startTime = time.perf_counter()
+    scores = run()
+    seconds = time.perf_counter() - startTime
+    del scores
+    gc.collect()
+    tracemalloc.start()
+    scores = run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return np.asarray(scores), seconds, peak
+
+
+def compare(scores, reference, training, heldout, top):
+    """
+    Accuracy of an engine's N x C score matrix against the reference, averaged over the columns.
+    """
+    from scipy.stats import kendalltau
+    difference = np.abs(scores - reference)
+    taus, overlaps, aurocs = [], [], []
+    for c in range(scores.shape[1]):
+        candidates = ~training[:, c]
+        taus.append(kendalltau(scores[:, c], reference[:, c])[0])
+        overlaps.append(top_overlap(scores[:, c], reference[:, c], candidates, top))
+        positives = np.zeros(len(candidates), dtype=bool)
+        positives[heldout[c]] = True
+        aurocs.append(Evaluation.auroc(scores[:, c], positives, candidates))
+    return {"l1": float(np.mean(np.sum(difference, axis=0))), "linf": float(np.max(difference)),
+            "tau": float(np.nanmean(taus)), "top": float(np.mean(overlaps)), "auroc": float(np.nanmean(aurocs))}
+
+
+def benchmark(path, algorithms, diseaseGeneFiles, folds, top):
+    """
+    @returns: list of dicts, one per algorithm and engine, the reference engine first for every algorithm
+    """
+    graphs = {"compact": compute_if_not_cached(loader.load_compact_graph, path, fileName=path)}
+    training, heldout = fold_seeds(graphs["compact"], diseaseGeneFiles, folds)
+    seeds = Evaluation.normalize_columns(training)
+    rows = []
+    for algorithm, engines in algorithms:
+        reference = None
+        for engine, kind, run in engines:
+            if kind not in graphs:
+                graphs[kind] = OutOfCore.load_network(path)
+            print("\n----- {0} {1} on {2} ({3} seed sets) -----".format(algorithm, engine, path, seeds.shape[1]))
+            scores, seconds, peak = measure(lambda: run(graphs[kind], seeds))
+            if reference is None:
+                reference = scores
+            row = {"network": path, "algorithm": algorithm, "engine": engine, "seconds": seconds, "peak": peak / 2**20}
+            row.update(compare(scores, reference, training, heldout, top))
+            rows.append(row)
+    return rows
+
+
+COLUMNS = ["network", "algorithm", "engine", "seconds", "peak", "l1", "linf", "tau", "top", "auroc"]
+HEADER = ["network", "algorithm", "engine", "seconds", "peak MB", "L1", "Linf", "tau", "top", "AUROC"]
+
+
+def format_row(row):
+    return [row["network"], row["algorithm"], row["engine"], "{0:.3f}".format(row["seconds"]), "{0:.1f}".format(row["peak"]),
+            "{0:.2e}".format(row["l1"]), "{0:.2e}".format(row["linf"]), "{0:.4f}".format(row["tau"]),
+            "{0:.3f}".format(row["top"]), "{0:.4f}".format(row["auroc"])]
+
+
+def main():
+    algorithm = pop_option(sys.argv, "--algorithm", "all")
+    r = pop_option(sys.argv, "--r", RESTART, float)
+    beta = pop_option(sys.argv, "--beta", PR_BETA, float)
+    dkBeta = pop_option(sys.argv, "--dk-beta", DK_BETA, float)
+    folds = pop_option(sys.argv, "--folds", FOLDS, int)
+    top = pop_option(sys.argv, "--top", TOP, int)
+    outputFile = pop_option(sys.argv, "--output")
+    if len(sys.argv) < 2:
+        print(USAGE)
+        sys.exit()
+
+    algorithms = [("rwr", rwr_engines(r, top)), ("pr", pr_engines(beta, top)), ("dk", dk_engines(dkBeta))]
+    if algorithm != "all":
+        algorithms = [(name, engines) for name, engines in algorithms if name == algorithm]
+    diseaseGeneFiles = DiseaseSets.find_data_files("diseasegenes")
+    rows = []
+    for path in sys.argv[1:]:
+        rows.extend(benchmark(path, algorithms, diseaseGeneFiles, folds, top))
+
+    table = [HEADER] + [format_row(row) for row in rows]
+    widths = [max(len(line[i]) for line in table) for i in range(len(HEADER))]
+    print()
+    for line in table:
+        print("  ".join(value.ljust(width) for value, width in zip(line, widths)))
+    if outputFile is not None:
+        with open(outputFile, "w") as f:
+            for line in table:
+                f.write("\t".join(line) + "\n")
+        print("Saved table to", outputFile)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+import sys
+sys.path.insert(1, '../Imports/')
+sys.path.insert(1, 'Imports/')
+import pickle
+import time
+import tracemalloc
+import loader
+
+USAGE = "Usage: python3 benchmark-graph-memory.py path-to-ppi-network"
+
+
+def measure(load, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    graph = load(path)
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    pickled = len(pickle.dumps(graph, protocol=pickle.HIGHEST_PROTOCOL))
+    return graph, elapsed, size, pickled
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(USAGE)
+        sys.exit()
+    print("graph\t\tload (s)\tmemory (MB)\tpickle (MB)")
+    for name, load in [("networkx", loader.load_graph), ("compact", loader.load_compact_graph)]:
+        graph, elapsed, size, pickled = measure(load, sys.argv[1])
+        print("{0}\t{1:.2f}\t\t{2:.1f}\t\t{3:.1f}".format(name, elapsed, size/1e6, pickled/1e6))
+        del graph
+
+
+if __name__ == '__main__':
+    main()
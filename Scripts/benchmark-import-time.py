@@ -0,0 +1,37 @@
+import subprocess
+import sys
+import time
+
+# Cold start of a plain (non plotting) run: a fresh interpreter importing each entry module.
+# Reports wall time and which heavy libraries ended up imported.
+MODULES = ["RandomWalk", "PageRank", "DiffusionKernel", "leaveOneOut", "diseasePanel", "areaUnderROC"]
+HEAVY = ["numpy", "scipy", "networkx", "matplotlib"]
+
+SNIPPET = """
+import sys, time
+start = time.perf_counter()
+for path in ['Algorithms/', 'Imports/', 'Validation/']:
+    sys.path.insert(1, path)
+import {0}
+elapsed = time.perf_counter() - start
+print(elapsed, ','.join(m for m in {1} if m in sys.modules))
+"""
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    print("module\t\t\timport (ms)\tprocess (ms)\theavy modules loaded")
+    for module in MODULES:
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, "-c", SNIPPET.format(module, HEAVY)],
+                                    stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout.split()
+            wall = time.perf_counter() - start
+            if best is None or wall < best[1]:
+                best = (float(output[0]), wall, output[1] if len(output) > 1 else "")
+        print("{0:<20}\t{1:.0f}\t\t{2:.0f}\t\t{3}".format(module, best[0]*1000, best[1]*1000, best[2]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import sys
+sys.path.insert(1, '../Imports/')
+sys.path.insert(1, 'Imports/')
+import os
+import time
+import numpy as np
+import loader
+import Operators
+import ParallelSpmv
+from ArgUtils import pop_option
+from CacheUtils import compute_if_not_cached
+
+USAGE = "Usage: python3 benchmark-matvec.py path-to-ppi-network [repeats] [columns] [--threads max-threads] [--order ordering]"
+
+
+def bandwidth(matrix):
+    coo = matrix.tocoo()
+    return int(np.max(np.abs(coo.row - coo.col)))
+
+
+def time_matvec(matrix, x, repeats):
+    matrix.dot(x)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        matrix.dot(x)
+    return (time.perf_counter() - start) / repeats
+
+
+def thread_counts(maxThreads):
+    # 1, 2, 4, ... up to maxThreads (always included)
+    counts = [1]
+    while counts[-1]*2 < maxThreads:
+        counts.append(counts[-1]*2)
+    if maxThreads > 1:
+        counts.append(maxThreads)
+    return counts
+
+
+def scaling_curve(operators, x, X, repeats, maxThreads):
+    """
+    Prints mat-vec and mat-mat time of the row blocked kernel for 1, 2, 4, ... threads.
+    """
+    columns = X.shape[1]
+    print("\nthreads\tmat-vec (ms)\tspeedup\tmat-mat {0} cols (ms)\tspeedup".format(columns))
+    baseline = None
+    for threads in thread_counts(maxThreads):
+        ParallelSpmv.set_threads(threads)
+        matrix = ParallelSpmv.ParallelOperator(operators.normalized, threads)
+        matvec = time_matvec(matrix, x, repeats)
+        matmat = time_matvec(matrix, X, max(1, repeats // columns))
+        if baseline is None:
+            baseline = (matvec, matmat)
+        print("{0}\t{1:.3f}\t\t{2:.2f}x\t{3:.3f}\t\t\t{4:.2f}x".format(
+            threads, matvec*1000, baseline[0]/matvec, matmat*1000, baseline[1]/matmat))
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(USAGE)
+        sys.exit()
+    maxThreads = pop_option(sys.argv, "--threads", os.cpu_count() or 1, int)
+    scalingOrder = pop_option(sys.argv, "--order")
+    pathToPPINetworkFile = sys.argv[1]
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    columns = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    ppiGraph = compute_if_not_cached(loader.load_compact_graph, pathToPPINetworkFile, fileName=pathToPPINetworkFile)
+    print("nodes:", ppiGraph.number_of_nodes(), "edges:", ppiGraph.number_of_edges())
+    x = np.random.RandomState(0).rand(ppiGraph.number_of_nodes())
+    X = np.random.RandomState(1).rand(ppiGraph.number_of_nodes(), columns)
+
+    print("\nordering\tbuild (s)\tbandwidth\tmat-vec (ms)\tspeedup\tmat-mat {0} cols (ms)\tspeedup".format(columns))
+    baseline = None
+    for ordering in [None, "rcm", "degree", "community"]:
+        start = time.perf_counter()
+        operators = Operators.build_operators(ppiGraph, ordering)
+        build = time.perf_counter() - start
+        matvec = time_matvec(operators.normalized, operators.permute(x), repeats)
+        matmat = time_matvec(operators.normalized, operators.permute(X), max(1, repeats // columns))
+        if baseline is None:
+            baseline = (matvec, matmat)
+        print("{0}\t\t{1:.2f}\t\t{2}\t\t{3:.3f}\t\t{4:.2f}x\t{5:.3f}\t\t\t{6:.2f}x".format(
+            ordering, build, bandwidth(operators.normalized), matvec*1000, baseline[0]/matvec, matmat*1000, baseline[1]/matmat))
+
+    print("\nthread scaling, ordering:", scalingOrder, "cores:", os.cpu_count())
+    operators = Operators.build_operators(ppiGraph, scalingOrder)
+    scaling_curve(operators, operators.permute(x), operators.permute(X), repeats, maxThreads)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import sys
+sys.path.insert(1, '../Imports/')
+sys.path.insert(1, 'Imports/')
+import time
+import numpy as np
+import loader
+import Operators
+import Solvers
+import Evaluation
+from CacheUtils import compute_if_not_cached
+
+USAGE = "Usage: python3 benchmark-solvers.py path-to-ppi-network path-to-disease-genes [restart-probability]"
+MAX_ITERATIONS = 10000
+TOLERANCE = 10**(-6)
+
+
+def run(solver, matrix, restart, start, x0):
+    begin = time.perf_counter()
+    result, iterations = Solvers.SOLVERS[solver](matrix, 1 - restart, restart * start, x0, TOLERANCE, MAX_ITERATIONS)
+    return result, iterations, time.perf_counter() - begin
+
+
+def exact_solution(matrix, restart, start):
+    # reference solution, iterated far below the tolerance
+    return Solvers.fixed_point(matrix, 1 - restart, restart * start, start, 1e-30, MAX_ITERATIONS)[0]
+
+
+def errors(result, exact):
+    # L1 error (largest over the columns) and largest absolute error against the converged solution
+    difference = np.abs(result - exact)
+    return "{0:.2e}\t{1:.2e}".format(np.max(np.sum(difference, axis=0)), np.max(difference))
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(USAGE)
+        sys.exit()
+    pathToPPINetworkFile = sys.argv[1]
+    pathToDiseaseGeneFile = sys.argv[2]
+    restart = float(sys.argv[3]) if len(sys.argv) > 3 else 0.4
+
+    ppiGraph = compute_if_not_cached(loader.load_compact_graph, pathToPPINetworkFile, fileName=pathToPPINetworkFile)
+    matrix = Operators.build_operators(ppiGraph).normalized
+    start = loader.load_start_vector(pathToDiseaseGeneFile, ppiGraph)
+    exact = exact_solution(matrix, restart, start)
+
+    print("\nrestart probability", restart, "- iterations to tolerance", TOLERANCE)
+    print("solver\t\titerations\ttime (ms)\tL1 error\tmax error")
+    for solver in Solvers.SOLVERS:
+        result, iterations, elapsed = run(solver, matrix, restart, start, start)
+        print("{0}\t{1}\t\t{2:.2f}\t\t{3}".format(solver.ljust(8), iterations, elapsed*1000, errors(result, exact)))
+
+    # warm start along a parameter sweep: every value starts from the solution of the previous one
+    sweep = np.round(np.arange(0.5, 0.05, -0.05), 2)
+    exacts = {r: exact_solution(matrix, r, start) for r in sweep}
+    print("\nparameter sweep", [float(r) for r in sweep], "- total iterations, largest errors of the warm runs")
+    print("solver\t\tcold\t\twarm\t\tL1 error\tmax error")
+    for solver in Solvers.SOLVERS:
+        cold = warm = 0
+        previous = start
+        l1 = largest = 0
+        for r in sweep:
+            cold += run(solver, matrix, r, start, start)[1]
+            previous, iterations, _ = run(solver, matrix, r, start, previous)
+            warm += iterations
+            difference = np.abs(previous - exacts[r])
+            l1 = max(l1, np.sum(difference))
+            largest = max(largest, np.max(difference))
+        print("{0}\t{1}\t\t{2}\t\t{3:.2e}\t{4:.2e}".format(solver.ljust(8), cold, warm, l1, largest))
+
+    # warm start for leave one out: every fold starts from the solution with all disease genes
+    genes = np.flatnonzero(start)
+    mask = Evaluation.training_mask(genes, Evaluation.leave_one_out_folds(len(genes)), len(start))
+    folds = Evaluation.normalize_columns(mask)
+    allGenes = np.repeat(exact[:, np.newaxis], len(genes), axis=1)
+    exactFolds = exact_solution(matrix, restart, folds)
+    print("\nleave one out,", len(genes), "folds solved together - iterations, errors of the warm run")
+    print("solver\t\tcold\t\twarm\t\tL1 error\tmax error")
+    for solver in Solvers.SOLVERS:
+        cold = run(solver, matrix, restart, folds, folds)[1]
+        result, warm, _ = run(solver, matrix, restart, folds, allGenes)
+        print("{0}\t{1}\t\t{2}\t\t{3}".format(solver.ljust(8), cold, warm, errors(result, exactFolds)))
+
+
+if __name__ == '__main__':
+    main()
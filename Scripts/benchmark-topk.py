@@ -0,0 +1,64 @@
+import sys
+sys.path.insert(1, '../Imports/')
+sys.path.insert(1, 'Imports/')
+import numpy as np
+import loader
+import Operators
+import Solvers
+import DiseaseSets
+from CacheUtils import compute_if_not_cached
+
+USAGE = "Usage: python3 benchmark-topk.py path-to-ppi-network [k] [restart-probability] [beta]"
+MAX_ITERATIONS = 500
+TOLERANCE = 10**(-6)
+CONVERGED_TOLERANCE = 10**(-24)
+
+
+def top(scores, k):
+    return list(np.argsort(-scores, kind="stable")[:k])
+
+
+def compare(matrix, damping, offset, start, k):
+    """
+    Runs the usual loop (tolerance 1e-6), the loop until every score has converged, and the top-k mode.
+
+    @returns: (iterations of the usual loop, True if its top k is the converged one,
+               iterations until converged, iterations until the top k is certified)
+    """
+    usual, usualIterations = Solvers.fixed_point(matrix, damping, offset, start, TOLERANCE, MAX_ITERATIONS)
+    exact, exactIterations = Solvers.fixed_point(matrix, damping, offset, start, CONVERGED_TOLERANCE, Solvers.TOPK_MAX_ITERATIONS)
+    stop = Solvers.TopKCertificate(k, damping)
+    early, earlyIterations = Solvers.fixed_point(matrix, damping, offset, start, Solvers.TOPK_TOLERANCE,
+                                                 Solvers.TOPK_MAX_ITERATIONS, stop)
+    if top(early, k) != top(exact, k):
+        print("warning: certified top", k, "differs from the converged one")
+    return usualIterations, top(usual, k) == top(exact, k), exactIterations, earlyIterations
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(USAGE)
+        sys.exit()
+    pathToPPINetworkFile = sys.argv[1]
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 150
+    restart = float(sys.argv[3]) if len(sys.argv) > 3 else 0.4
+    beta = float(sys.argv[4]) if len(sys.argv) > 4 else 0.4
+
+    ppiGraph = compute_if_not_cached(loader.load_compact_graph, pathToPPINetworkFile, fileName=pathToPPINetworkFile)
+    matrix = Operators.build_operators(ppiGraph).normalized
+    diseaseGeneFiles = DiseaseSets.find_data_files("diseasegenes")
+    priors = DiseaseSets.load_prior_matrix(diseaseGeneFiles, ppiGraph)
+
+    print("top", k, "- iterations of the usual loop, until every score has converged, and until the top", k, "is certified")
+    print("disease genes\t\t\talgorithm\tusual\tusual top-k correct\tconverged\tcertified\tsaved")
+    for j, path in enumerate(diseaseGeneFiles):
+        start = loader.load_start_vector(path, ppiGraph)
+        runs = [("rwr", compare(matrix, 1 - restart, restart * start, start, k)),
+                ("pr", compare(matrix, 1 - beta, beta * priors[:, j], start, k))]
+        for algorithm, (usual, correct, converged, certified) in runs:
+            print("{0}\t{1}\t\t{2}\t{3}\t\t\t{4}\t\t{5}\t\t{6}".format(
+                DiseaseSets.disease_name(path).ljust(24), algorithm, usual, correct, converged, certified, converged - certified))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,71 +1,61 @@
-# Code based on (shamelessly taken and then modified) from
-# https://string-db.org/cgi/help.pl?subpage=api%23mapping-identifiers
-##########################################################
-# For a given list of proteins the script resolves them
-# (if possible) to the best matching STRING identifier
-# and prints out the mapping on screen in the TSV format
-###########################################################
+# Resolves a file of gene names (one per line) to STRING identifiers and writes the identifiers to a file,
+# one per line, in the order of the input. Names are looked up in the local lookup table and alias cache first;
+# only the rest is sent to the STRING API (see Imports/StringMapper.py).
+#
+# Usage: python3 gene-names-to-STRING-format.py gene-file [output-file]
+#   Optional arguments: --api-url url      STRING API (or a local stand-in server), default https://string-db.org/api
+#                       --offline          never call the API
+#                       --threads N        parallel requests
+#                       --chunk-size N     names per request
+# Based on https://string-db.org/cgi/help.pl?subpage=api%23mapping-identifiers
 
-import random
-import requests
 import sys
+sys.path.insert(1, '../Imports/')
+sys.path.insert(1, 'Imports/')
+import StringMapper
+from ArgUtils import pop_option
+
+OUTPUT_FILE = "protein_file.txt"
 
-STRING_API_URL = "http://string-db.org/api"
-OUTPUT_FORMAT = "tsv-no-header"
-METHOD = "get_string_ids"
 
 # File with common gene names
 def read_genes(infile):
     genes = []
     with open(infile) as infile:
         for line in infile:
-            # Don't read \n
-            genes.append(line[:-1])
+            gene = line.strip()
+            if gene:
+                genes.append(gene)
     print("num genes: ", len(genes))
     return genes
 
-# contruct params dictionary
-def gene_names_to_STRING(genes):
-    params = {
-        "identifiers": "\r".join(genes),  # your protein list
-        "species": 9606,  # species NCBI identifier
-        "limit": 1,  # only one (best) identifier per input protein
-        "echo_query": 1,  # see your input identifiers in the output
-        "caller_identity": "www.awesome_app.org"  # your app name
-    }
-
-    # contruct method URL
-    request_url = STRING_API_URL + "/" + OUTPUT_FORMAT + "/" + METHOD
-
-    # Call STRING
-    try:
-        response = requests.post(request_url, params=params)
-    except requests.exceptions.RequestException as e:
-        print(e)
-        sys.exit()
-    return response
-
 
-def output_response(response):
-    # Read and parse the results
+def output_mapping(genes, mapping, outputFile=OUTPUT_FILE):
     count_response = 0
-    protein_file = open("protein_file.txt", "a")
-    for line in response.text.strip().split("\n"):
-        fields = line.split("\t")
-        # print(fields)
-        input_identifier_, string_identifier = fields[0], fields[2]
-        #print("Input:", input_identifier, "STRING:", string_identifier, sep="\t")
-        print(string_identifier)
-        protein_file.write(string_identifier)
-        protein_file.write("\n")
-        count_response += 1
-    print("num proteins outputted:", count_response)
-    protein_file.close()
+    with open(outputFile, "w") as protein_file:
+        for gene in genes:
+            string_identifier = mapping[gene]
+            if string_identifier is None:
+                print("No STRING identifier found for", gene)
+                continue
+            protein_file.write(string_identifier)
+            protein_file.write("\n")
+            count_response += 1
+    print("num proteins outputted:", count_response, "to", outputFile)
 
 
 if __name__ == '__main__':
-    if len(sys.argv) == 2:
-        infile = sys.argv[1]
+    apiUrl = pop_option(sys.argv, "--api-url", StringMapper.DEFAULT_API_URL)
+    threads = pop_option(sys.argv, "--threads", StringMapper.THREADS, int)
+    chunkSize = pop_option(sys.argv, "--chunk-size", StringMapper.CHUNK_SIZE, int)
+    offline = "--offline" in sys.argv
+    if offline:
+        sys.argv.remove("--offline")
+    if len(sys.argv) < 2:
+        print("Usage: python3 gene-names-to-STRING-format.py gene-file [output-file] [--api-url url] [--offline] [--threads N] [--chunk-size N]")
+        sys.exit()
+    infile = sys.argv[1]
+    outputFile = sys.argv[2] if len(sys.argv) > 2 else OUTPUT_FILE
     genes = read_genes(infile)
-    response = gene_names_to_STRING(genes)
-    output_response(response)
+    mapper = StringMapper.StringMapper(apiUrl, threads=threads, chunkSize=chunkSize, offline=offline)
+    output_mapping(genes, mapper.map_names(genes), outputFile)
@@ -0,0 +1,39 @@
+import sys
+sys.path.insert(1, '../Imports/')
+sys.path.insert(1, 'Imports/')
+import Journal
+import Evaluation
+import numpy as np
+
+USAGE = """Usage:
+    python3 journal-status.py journal-file [ranks]
+
+Summarizes the completed folds of a (possibly still running) leave one out journal, per algorithm, disease gene file
+and parameter. With ranks, also prints the rank of every held out gene."""
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(USAGE)
+        sys.exit()
+    records = Journal.read_records(sys.argv[1])
+    if not records:
+        print("No completed folds in", sys.argv[1])
+        return
+    print("Job:", records[0]["network"], "split", records[0]["split"], "top k", records[0]["topK"])
+
+    groups = {}
+    for record in records:
+        groups.setdefault((record["algorithm"], record["diseaseGenes"], record["param"]), []).append(record)
+    for (algorithm, diseaseGenes, param), group in groups.items():
+        ranks = np.array([rank for record in group for rank in record["ranks"]], dtype=np.int64)
+        print(algorithm, diseaseGenes, param, len(group), "folds", "last at " + group[-1]["time"], sep="\t")
+        print("\t", Evaluation.rank_summary(ranks))
+        if len(sys.argv) > 2 and sys.argv[2] == "ranks":
+            for record in group:
+                for gene, rank in zip(record["genes"], record["ranks"]):
+                    print("\t", gene, rank, sep="\t")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import sys
+sys.path.insert(1, '../Imports/')
+sys.path.insert(1, 'Imports/')
+import NetworkProfile
+from ArgUtils import pop_option
+
+USAGE = """Usage: python3 profile-network.py path-to-ppi-network [--plot figure.png] [--refresh]
+
+Profiles a links file in one streaming pass (see Imports/NetworkProfile.py): degree distribution, confidence
+histogram, connected component sizes and the largest laplacian eigenvalue with its bounds. The profile is saved in the
+cache folder, where the Chebyshev diffusion kernel takes its spectral bound from; --refresh profiles the file again.
+--plot saves the degree distribution and the confidence histogram as an image."""
+
+TOP_COMPONENT_SIZES = 10
+
+
+def plot_profile(profile, path):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    figure, (degreeAxes, confidenceAxes) = plt.subplots(1, 2, figsize=(12, 5))
+    degrees, counts = zip(*profile["degreeHistogram"])
+    degreeAxes.loglog(degrees, counts, ".")
+    degreeAxes.set_xlabel("degree")
+    degreeAxes.set_ylabel("proteins")
+    degreeAxes.set_title("Degree distribution")
+    bins = profile["confidenceBins"]
+    confidenceAxes.bar(bins[:-1], profile["confidenceHistogram"], width=bins[1] - bins[0], align="edge")
+    confidenceAxes.set_xlabel("STRING confidence")
+    confidenceAxes.set_ylabel("interactions")
+    confidenceAxes.set_title("Confidence histogram")
+    figure.suptitle(profile["source"])
+    figure.savefig(path)
+    plt.close(figure)
+
+
+def main():
+    plotFile = pop_option(sys.argv, "--plot")
+    refresh = "--refresh" in sys.argv
+    if refresh:
+        sys.argv.remove("--refresh")
+    if len(sys.argv) != 2:
+        print(USAGE)
+        sys.exit()
+    profile = NetworkProfile.load_profile(sys.argv[1], refresh)
+
+    print("Network:", profile["source"])
+    print("Proteins:", profile["nodes"], "\tinteractions:", profile["edges"], "({0} lines, {1} self loops)".format(
+        profile["lines"], profile["selfLoops"]))
+    degree = profile["degree"]
+    print("Degree: min {0}, median {1}, mean {2:.1f}, max {3}".format(degree["min"], degree["median"], degree["mean"], degree["max"]))
+    print("Degree histogram (degree: proteins):", ", ".join("{0}: {1}".format(d, c) for d, c in profile["degreeHistogram"]))
+    print("Confidence histogram:")
+    bins = profile["confidenceBins"]
+    for low, high, count in zip(bins[:-1], bins[1:], profile["confidenceHistogram"]):
+        if count > 0:
+            print("\t{0}-{1}\t{2}".format(low, high - 1, count))
+    print("Connected components:", profile["components"], "\tlargest:", profile["largestComponent"])
+    print("Component sizes (size: components):", ", ".join("{0}: {1}".format(s, c) for s, c in profile["componentSizes"][:TOP_COMPONENT_SIZES]))
+    estimate = profile["laplacianEstimate"]
+    print("Largest laplacian eigenvalue: {0} (Anderson & Morley bound {1}, Gershgorin bound {2})".format(
+        "not converged" if estimate is None else "{0:.4f}".format(estimate), profile["andersonMorleyBound"], profile["gershgorinBound"]))
+    print("Spectral bound used by the Chebyshev diffusion kernel: {0:.4f}".format(profile["spectralBound"]))
+    print("Profile saved to", NetworkProfile.profile_path(sys.argv[1]))
+    if plotFile is not None:
+        plot_profile(profile, plotFile)
+        print("Saved plot to", plotFile)
+
+
+if __name__ == '__main__':
+    main()
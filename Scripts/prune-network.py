@@ -0,0 +1,43 @@
+import sys
+sys.path.insert(1, '../Imports/')
+sys.path.insert(1, 'Imports/')
+import loader
+import DiseaseSets
+import Pruning
+from CacheUtils import compute_if_not_cached
+
+USAGE = """Usage: python3 prune-network.py path-to-ppi-network [settings ...]
+
+Prunes the network for every setting (default: {0}) and saves each pruned network as a dataset of its own,
+<network>.<setting>.ppi.txt, next to the original. A setting is a dash separated list of steps applied in order:
+confN (confidence >= N), coreK (k-core), topkK (K best neighbours per node) and spectralP (keep P percent of the
+edges by effective resistance sampling), e.g. conf400-core2. Networks made before are loaded instead of pruned again.
+
+Prints, for the full network and every setting, the node and edge count, the pruning time, the time of one random
+walk query and the mean held out AUROC ({1}-fold) on the MalaCards disease gene sets in Data/.""".format(
+    " ".join(Pruning.DEFAULT_SETTINGS), Pruning.FOLDS)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(USAGE)
+        sys.exit()
+    pathToPPINetworkFile = sys.argv[1]
+    settings = sys.argv[2:] if len(sys.argv) > 2 else Pruning.DEFAULT_SETTINGS
+    for tag in settings:
+        Pruning.parse_setting(tag)
+
+    graph = compute_if_not_cached(loader.load_compact_graph, pathToPPINetworkFile, fileName=pathToPPINetworkFile)
+    diseaseGeneFiles = Pruning.malacards_files(DiseaseSets.find_data_files("diseasegenes"))
+    report = Pruning.pruning_report(graph, settings, diseaseGeneFiles)
+
+    full = report[0]
+    print("\nsetting\t\t\tnodes\tedges\t\tedge %\tprune s\tquery ms\tAUROC")
+    for row in report:
+        print("{0}\t{1}\t{2}\t{3:.1f}\t{4:.2f}\t{5:.2f}\t\t{6:.4f}".format(
+            row["setting"].ljust(20), row["nodes"], str(row["edges"]).ljust(10), 100 * row["edges"] / full["edges"],
+            row["seconds"], row["ms"], row["auroc"]))
+
+
+if __name__ == '__main__':
+    main()
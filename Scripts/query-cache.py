@@ -0,0 +1,39 @@
+import sys
+sys.path.insert(1, '../Imports/')
+sys.path.insert(1, 'Imports/')
+import os
+import QueryCache
+
+USAGE = """Usage:
+    python3 query-cache.py stats
+    python3 query-cache.py clear
+
+stats prints the hit rate of the algorithm query cache over all runs, clear removes every cached query."""
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(USAGE)
+        sys.exit()
+    cache = QueryCache.DEFAULT_CACHE
+    command = sys.argv[1]
+    if command == "stats":
+        totals = cache.total_counts()
+        entries = 0
+        size = 0
+        if os.path.isdir(cache.directory):
+            files = [os.path.join(cache.directory, f) for f in os.listdir(cache.directory) if f.endswith(".npz")]
+            entries = len(files)
+            size = sum(os.path.getsize(f) for f in files)
+        print("Cached queries:", entries, "({0:.1f} MB) in".format(size / 2**20), cache.directory)
+        print("Memory hits:", totals["memory"], "disk hits:", totals["disk"], "misses:", totals["miss"])
+        print("Hit rate: {0:.0%}".format(cache.hit_rate(totals)))
+    elif command == "clear":
+        cache.clear()
+        print("Cleared", cache.directory)
+    else:
+        print(USAGE)
+
+
+if __name__ == '__main__':
+    main()
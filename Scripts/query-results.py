@@ -0,0 +1,41 @@
+import sys
+sys.path.insert(1, '../Imports/')
+sys.path.insert(1, 'Imports/')
+import ResultsStore
+
+USAGE = """Usage:
+    python3 query-results.py list [field=value ...]
+    python3 query-results.py rank gene [field=value ...]
+    python3 query-results.py export run-id output-file
+
+fields are run metadata such as algorithm=rwr or diseaseGenes=Data/lymphoma-proteins.diseasegenes.tsv"""
+
+
+def parse_filters(args):
+    filters = {}
+    for arg in args:
+        key, value = arg.split("=", 1)
+        filters[key] = value
+    return filters
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(USAGE)
+        sys.exit()
+    command = sys.argv[1]
+    if command == "list":
+        for metadata in ResultsStore.list_runs(**parse_filters(sys.argv[2:])):
+            print(metadata["run"], metadata["kind"], metadata.get("algorithm"), metadata.get("diseaseGenes"), metadata.get("params"), sep="\t")
+    elif command == "rank" and len(sys.argv) >= 3:
+        for metadata, rank, score in ResultsStore.gene_ranks(sys.argv[2], **parse_filters(sys.argv[3:])):
+            print(metadata["run"], metadata.get("algorithm"), metadata.get("diseaseGenes"), metadata.get("params"), rank, score, sep="\t")
+    elif command == "export" and len(sys.argv) == 4:
+        ResultsStore.export_csv(sys.argv[2], sys.argv[3])
+        print("Saved run", sys.argv[2], "to", sys.argv[3])
+    else:
+        print(USAGE)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+import sys
+import os
+sys.path.insert(1, '../Imports/')
+sys.path.insert(1, 'Imports/')
+import Figures
+
+USAGE = """Usage: python3 render-figures.py spec-file-or-directory [...] [--figure-workers N]
+
+Draws saved figure specs (the .json files written next to every validation figure, see Imports/Figures.py) to their
+PNG files again, in parallel and without a display. Directories are searched recursively for specs."""
+
+
+def find_specs(paths):
+    specs = []
+    for path in paths:
+        if os.path.isdir(path):
+            files = [os.path.join(root, f) for root, _, names in os.walk(path) for f in sorted(names) if f.endswith(".json")]
+        else:
+            files = [path]
+        for f in files:
+            try:
+                spec = Figures.load_spec(f)
+            except ValueError:
+                continue
+            # other json files (e.g. the results store index) are skipped
+            if isinstance(spec, dict) and spec.get("kind") in Figures.DRAW and "path" in spec:
+                specs.append(spec)
+    return specs
+
+
+def main():
+    workers = Figures.workers_option(sys.argv)
+    if len(sys.argv) < 2:
+        print(USAGE)
+        sys.exit()
+    specs = find_specs(sys.argv[1:])
+    for path in Figures.render_all(specs, workers):
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
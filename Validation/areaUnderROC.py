@@ -13,44 +13,45 @@ import PageRank as pr
 import loader
 import time
 import numpy as np
-import matplotlib.pyplot as plt
+import Figures
 from CacheUtils import compute_if_not_cached
 
+COLORS = {"rwr": "blue", "pr": "red", "dk": "green"}
+
+
 def roc_curve(result_vec, ground_truth_vec, name):
-    TPR = []
-    FPR = []
-    for threshhold in range(len(result_vec)):
-        tp = fp = fn = tn = 0
-        for i in range(len(result_vec)):
-            item = result_vec[i][0]
-      #      print('item', item)
-            if i <= threshhold and item in ground_truth_vec:
-                tp += 1
-            elif i <= threshhold and item not in ground_truth_vec:
-                fp += 1
-            elif item in ground_truth_vec:
-                fn += 1
-            else:
-                tn += 1
-
-        TPR.append(tp/(tp + fn))
-        FPR.append(fp/(fp + tn))
-    area = np.trapz(TPR, FPR)
-    area = str(round(area, 6))
-    file_path = "Results/" + name + '.png'
-    c = 'blue'
-    label = "rwr: " + area
-    if 'pr' in name:
-        c = 'red'
-        label = "pr: " + area
-    elif 'dk' in name:
-        c = 'green'
-        label = "dk: " + area
-    curve, = plt.plot(FPR, TPR, color=c,label=label)
-    plt.show()
-    return curve
+    """
+    ROC curve of a ranked output (see GraphUtils.format_output), one point per threshold: the proteins ranked at or
+    above it count as predicted.
+
+    @param name: algorithm-disease, e.g. rwr-lymphoma, which picks the color and label of the curve
+    @returns: curve dict of a Figures.py "curves" spec, with the area under the curve in its label
+    """
+    ground_truth = set(ground_truth_vec)
+    hits = np.array([item[0] in ground_truth for item in result_vec])
+    tp = np.cumsum(hits)
+    fp = np.arange(1, len(hits) + 1) - tp
+    TPR = tp / max(tp[-1], 1)
+    FPR = fp / max(fp[-1], 1)
+    # trapezoid rule (np.trapz is gone from recent numpy)
+    area = str(round(float(np.sum(np.diff(FPR) * (TPR[1:] + TPR[:-1]) / 2)), 6))
+    algorithm = "pr" if 'pr' in name else "dk" if 'dk' in name else "rwr"
+    return {"x": FPR.tolist(), "y": TPR.tolist(), "color": COLORS[algorithm], "label": algorithm + ": " + area}
+
 
 def main():
+    # Optional argument: --figure-workers N, processes drawing the figures (0 draws them in this process)
+    workers = Figures.workers_option(sys.argv)
+    with Figures.FigureRenderer(workers) as renderer:
+        roc_curves(renderer)
+    print("Plots have been saved as png files in the Results folder.")
+
+
+def roc_curves(renderer):
+    """
+    Computes the ROC curves of every algorithm for every disease, and hands one figure per disease to the renderer
+    (see Figures.py), which draws them while the next disease is computed.
+    """
     print("Starting AUROC..")
     #Get file path choices
     pathToPPINetworkFile = sys.argv[1]
@@ -58,13 +59,13 @@ def main():
 
     # Get output vectors from each algorithm
 
-    PPI_Network = compute_if_not_cached(loader.load_graph, pathToPPINetworkFile, fileName=pathToPPINetworkFile)
+    PPI_Network = compute_if_not_cached(loader.load_compact_graph, pathToPPINetworkFile, fileName=pathToPPINetworkFile)
     ground_truth_files = ['Data/MalaCard-protein-Endometriosis.diseasegenes.tsv', 'Data/MalaCard-protein-ischaemic-stroke.diseasegenes.tsv','Data/MalaCard-protein-lymphoma.diseasegenes.tsv']
     file_paths = ['Data/endometriosis-proteins.diseasegenes.tsv','Data/lymphoma-proteins.diseasegenes.tsv', 'Data/ischaemic-proteins.diseasegenes.tsv']
     prior_paths = ['Data/endometriosis-proteins.priors.tsv','Data/lymphoma-proteins.priors.tsv', 'Data/ischaemic-proteins.priors.tsv']
     names = ['endometriosis', 'lymphoma', 'ischaemic']
 
-    for i in range(1,3):
+    for i in range(len(names)):
         # building ground truth
         ground_truth_vec = []
         with open(ground_truth_files[i], 'r') as input_file:
@@ -104,31 +105,12 @@ def main():
         #building roc curves
 
         start_time = time.time()
-        name = "rwr-" + names[i]
-        rwr_curve = roc_curve(output_RWR, ground_truth_vec, name)
-        end_time = time.time()
-        print("time for roc curve, rwr:", end_time -start_time)
-
-        start_time = time.time()
-        name = "pr-" + names[i]
-        pr_curve = roc_curve(output_PR, ground_truth_vec, name)
-        end_time = time.time()
-        print("time for roc curve, pr:", end_time - start_time)
-        start_time = time.time()
-
-        start_time = time.time()
-        name = "dk-" + names[i]
-        dk_curve = roc_curve(output_DK, ground_truth_vec, name)
+        curves = [roc_curve(output, ground_truth_vec, algorithm + "-" + names[i])
+                  for algorithm, output in (("rwr", output_RWR), ("pr", output_PR), ("dk", output_DK))]
         end_time = time.time()
-        print("time for roc curve, dk:", end_time - start_time)
-        file_path = 'Results/' + names[i] + 'roc_curve.png'
-        plt.ylabel('TPR')
-        plt.xlabel('FPR')
-        plt.title(names[i])
-        plt.legend(loc='lower right')
-        plt.savefig(file_path) #moved from roc_curve
-        plt.clf() #moved from roc_curve
-        print("Plots have been saved as png files in the Results folder.")
+        print("time for roc curves:", end_time - start_time)
+        renderer.submit({"kind": "curves", "path": 'Results/' + names[i] + 'roc_curve.png', "title": names[i],
+                         "xlabel": "FPR", "ylabel": "TPR", "curves": curves})
 
 
 if __name__ == '__main__':
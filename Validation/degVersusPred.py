@@ -1,45 +1,74 @@
-import matplotlib.pyplot as plt
-import numpy as np
-import random
+import sys
+import os
+sys.path.insert(1, '../Imports/')
+sys.path.insert(1, 'Imports/')
+import ResultsStore
+import Figures
 
 
-def unpack_output(file):
+def unpack_output(run):
+	'''
+	Splits the degrees of held out genes into found / not found.
+	run is either a leave one out run id from the results store, or an old style leave_one_out tsv file.
+	'''
 	predicted_in = []
 	predicted_out = []
-	with open(file, 'r') as input_file:
-		for line in input_file.readlines():
-			line = line.strip('\n').split('\t')
-			if int(int(line[2])) == -1:
-				predicted_out.append(int(line[1]))
-			else:
-				predicted_in.append(int(line[1]))
+	if os.path.isfile(run):
+		with open(run, 'r') as input_file:
+			for line in input_file.readlines():
+				line = line.strip('\n').split('\t')
+				if int(int(line[2])) == -1:
+					predicted_out.append(int(line[1]))
+				else:
+					predicted_in.append(int(line[1]))
+		return predicted_in, predicted_out
+	columns = ResultsStore.load_run(run)["columns"]
+	predicted_in = [int(d) for d in columns["degree"][columns["found"] != -1]]
+	predicted_out = [int(d) for d in columns["degree"][columns["found"] == -1]]
 	return predicted_in, predicted_out
 
-def boxplot_jitter(pred_in, pred_out):
-	fig1, ax = plt.subplots()
-	ax.boxplot([pred_in, pred_out])
-	rand_x_in = []
-	for i in range(len(pred_in)):
-		rand_x_in.append(random.uniform(0.95, 1.05))
-	ax.scatter(rand_x_in, pred_in, marker = ".", alpha = 0.7)
-	rand_x_out = []
-	for i in range(len(pred_out)):
-		rand_x_out.append(random.uniform(1.95, 2.05))
-	ax.scatter(rand_x_out, pred_out, marker = ".", alpha = 0.7)
-	plt.ylabel("Degree")
-	plt.xticks([1, 2], ("In", "Out"))
-	plt.show()
+def boxplot_jitter(pred_in, pred_out, path):
+	'''
+	Figure spec (see Figures.py) of the degrees of found / not found genes, as box plots with every gene as a point.
+	'''
+	return {"kind": "boxplot", "path": path, "ylabel": "Degree", "labels": ["In", "Out"], "groups": [pred_in, pred_out]}
 
-def violin_plot(pred_in, pred_out):
-	fig1, ax = plt.subplots()
-	ax.violinplot([pred_in, pred_out])
-	plt.ylabel("Degree")
-	plt.xticks([1, 2], ("In", "Out"))
-	plt.show()
+def violin_plot(pred_in, pred_out, path):
+	'''
+	Figure spec (see Figures.py) of the degree distributions of found / not found genes.
+	'''
+	return {"kind": "violin", "path": path, "ylabel": "Degree", "labels": ["In", "Out"], "groups": [pred_in, pred_out]}
+
+def figure_path(run, kind):
+	name = os.path.splitext(os.path.basename(run))[0]
+	return os.path.join("Results", "degree-{0}-{1}.png".format(name, kind))
 
 def main():
-	pred_in, pred_out = unpack_output("Validation/leave_one_out_lymphoma-proteins_pr.tsv")
-	#boxplot_jitter(pred_in, pred_out)
-	violin_plot(pred_in, pred_out)
+	'''
+	Usage: python3 Validation/degVersusPred.py [run ...] [--boxplot] [--figure-workers N]
+	Draws the degrees of the found and not found held out genes of leave one out runs (results store run ids or old
+	style tsv files; by default the latest PageRank run on lymphoma) as violin plots, or box plots with --boxplot,
+	to Results/degree-<run>-<kind>.png. The figures are drawn in parallel, without a display.
+	'''
+	workers = Figures.workers_option(sys.argv)
+	kind = "violin"
+	if "--boxplot" in sys.argv:
+		sys.argv.remove("--boxplot")
+		kind = "boxplot"
+	runs = sys.argv[1:]
+	if not runs:
+		stored = ResultsStore.list_runs(kind="leave_one_out", algorithm="pr", diseaseGenes="Data/lymphoma-proteins.diseasegenes.tsv")
+		if not stored:
+			print("No PageRank leave one out run on lymphoma in the results store. Run Validation/leaveOneOut.py with "
+				"Algorithms/PageRank.py and Data/lymphoma-proteins.diseasegenes.tsv first, or pass run ids or tsv files.")
+			sys.exit(1)
+		runs = [stored[-1]["run"]]
+	plot = boxplot_jitter if kind == "boxplot" else violin_plot
+	with Figures.FigureRenderer(workers) as renderer:
+		for run in runs:
+			pred_in, pred_out = unpack_output(run)
+			renderer.submit(plot(pred_in, pred_out, figure_path(run, kind)))
+	print("Plots have been saved as png files in the Results folder.")
 
-main()
+if __name__ == '__main__':
+	main()
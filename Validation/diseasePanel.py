@@ -0,0 +1,125 @@
+'''
+Cross-disease batch mode.
+
+Finds every disease gene file (and priors file) in Data/, stacks them into one seed matrix
+and runs each algorithm once over all of them as a multi-column propagation.
+Writes a ranked csv per algorithm and disease, and one combined AUROC table.
+
+Usage: python3 Validation/diseasePanel.py path-to-ppi-network [output-directory] [--rwr R] [--pr BETA] [--dk BETA]
+'''
+
+import sys
+import os
+sys.path.insert(1, 'Algorithms/')
+sys.path.insert(1, 'Imports/')
+sys.path.insert(1, '../Algorithms/')
+sys.path.insert(1, '../Imports/')
+import RandomWalk as rwr
+import DiffusionKernel as dk
+import PageRank as pr
+import loader
+import time
+import DiseaseSets
+import Evaluation
+import ResultsStore
+import StringNameConverter as snc
+from GraphUtils import format_output
+from ArgUtils import pop_option
+from CacheUtils import compute_if_not_cached
+
+DEFAULT_OUTPUT_PATH = "Results/panel"
+
+
+def run_panel(PPI_Network, diseaseGeneFiles, priorsFiles, params):
+    """
+    Runs all three algorithms on every disease gene file at once.
+
+    @param PPI_Network: networkx graph or CompactGraph of the PPI network
+    @param diseaseGeneFiles: list of disease gene file paths, one seed column each
+    @param priorsFiles: list of priors file paths, matched to disease gene files by name
+    @param params: dict with the parameter for "rwr", "pr" and "dk"
+
+    @returns: (seed matrix, dict of algorithm name -> N x k score matrix)
+    """
+    seeds = DiseaseSets.load_seed_matrix(diseaseGeneFiles, PPI_Network)
+    priors = DiseaseSets.load_prior_matrix(diseaseGeneFiles, PPI_Network, priorsFiles)
+    return seeds, propagate(PPI_Network, seeds, priors, params)
+
+
+def propagate(PPI_Network, seeds, priors, params, engine="dense"):
+    """
+    Runs all three algorithms on the columns of a seed matrix.
+
+    @param seeds, priors: N x k seed and PageRank prior bias matrices, in PPI_Network.nodes() order
+    @param engine: random walk and PageRank engine, "dense" or "sparse"
+
+    @returns: dict of algorithm name -> N x k score matrix
+    """
+    scores = {}
+    start_time = time.time()
+    scores["rwr"] = rwr.random_walk_scores(PPI_Network, seeds, params["rwr"], engine=engine)
+    print("time for rwr:", time.time() - start_time)
+
+    start_time = time.time()
+    scores["pr"] = pr.rank_genes(PPI_Network, seeds, priors, params["pr"], engine=engine)
+    print("time for pr:", time.time() - start_time)
+
+    start_time = time.time()
+    scores["dk"] = dk.diffusion_kernel_scores(PPI_Network, seeds, params["dk"])
+    print("time for dk:", time.time() - start_time)
+    return scores
+
+
+def write_evaluation_table(path, names, seeds, scores):
+    """
+    Writes the cross-disease AUROC of every algorithm to a tab separated file.
+    Each row scores the non-seed proteins ranked from one disease gene file against the genes of another file.
+    """
+    with open(path, "w") as output:
+        output.write("algorithm\tseeds\tground truth\tAUROC\n")
+        for algorithm, matrix in scores.items():
+            table = Evaluation.cross_auroc_table(matrix, seeds)
+            for i in range(len(names)):
+                for j in range(len(names)):
+                    if i != j:
+                        output.write("{0}\t{1}\t{2}\t{3:.6f}\n".format(algorithm, names[i], names[j], table[i, j]))
+
+
+def main():
+    print("Starting disease panel..")
+    # r of the random walk, beta of PageRank and beta of the diffusion kernel mean different things, so each has its option
+    params = {"rwr": pop_option(sys.argv, "--rwr", 0.4, float), "pr": pop_option(sys.argv, "--pr", pr.BETA, float),
+              "dk": pop_option(sys.argv, "--dk", 1.0, float)}
+    pathToPPINetworkFile = sys.argv[1]
+    outputPath = DEFAULT_OUTPUT_PATH
+    if len(sys.argv) > 2:
+        outputPath = sys.argv[2]
+    if not os.path.isdir(outputPath):
+        os.makedirs(outputPath)
+
+    PPI_Network = compute_if_not_cached(loader.load_compact_graph, pathToPPINetworkFile, fileName=pathToPPINetworkFile)
+    diseaseGeneFiles = DiseaseSets.find_data_files("diseasegenes")
+    priorsFiles = DiseaseSets.find_data_files("priors")
+    names = [DiseaseSets.disease_name(f) for f in diseaseGeneFiles]
+    print("disease gene files:", diseaseGeneFiles)
+    print("priors files:", priorsFiles)
+
+    seeds, scores = run_panel(PPI_Network, diseaseGeneFiles, priorsFiles, params)
+
+    nodes = list(PPI_Network.nodes())
+    table = snc.load_lookup_table()
+    for algorithm, matrix in scores.items():
+        for j, path in enumerate(diseaseGeneFiles):
+            metadata = {"algorithm": algorithm, "network": pathToPPINetworkFile, "diseaseGenes": path,
+                        "params": {"param": params[algorithm]}, "panel": True}
+            ResultsStore.save_ranking(nodes, matrix[:, j], metadata)
+            ResultsStore.write_csv(format_output(PPI_Network, matrix[:, j], table),
+                                   os.path.join(outputPath, algorithm + "-" + names[j] + ".csv"))
+
+    evaluationFile = os.path.join(outputPath, "evaluation.tsv")
+    write_evaluation_table(evaluationFile, names, seeds, scores)
+    print("Ranked outputs and", evaluationFile, "have been saved in", outputPath)
+
+
+if __name__ == '__main__':
+    main()
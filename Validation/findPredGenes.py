@@ -3,15 +3,23 @@ sys.path.insert(1, '../Imports/')
 # Insert relative paths for calls from run.py
 sys.path.insert(1, 'Imports/')
 import StringNameConverter as snc
+import ResultsStore
+import numpy as np
+import os
 
 def find_pred_genes(outputFile, diseaseProteins):
+    # outputFile is either a run id in the results store or an algorithm output csv
     outputProts= []
     diseaseProts= []
-    with open(outputFile, 'r') as input_file:
-        for line in input_file:
-            line = line.strip().split(',')
-            outputProts.append(line[0].replace('"', ''))
-        input_file.close()
+    if os.path.isfile(outputFile):
+        with open(outputFile, 'r') as input_file:
+            for line in input_file:
+                line = line.strip().split(',')
+                outputProts.append(line[0].replace('"', ''))
+            input_file.close()
+    else:
+        run = ResultsStore.load_run(outputFile)
+        outputProts = [run["nodes"][i] for i in np.argsort(run["ranks"])]
 
     with open(diseaseProteins, 'r') as input_file2:
         for line in input_file2.readlines():
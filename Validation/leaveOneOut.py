@@ -1,12 +1,17 @@
 """
 This program assumes the following:
-Each algorithm can be called with only two parameters:
-    - a networkx graph containing the full PPI network
-    - a list of the names of known disease genes
+Each algorithm can produce raw scores for several start vectors at once:
+    - a networkx graph or CompactGraph containing the full PPI network
+    - an N x F matrix with one start vector (training disease genes) per column
 
-Each algorithm produces results in a 2 dimensional array where each item is a tuple containing a gene name and it's ranking/probability,
- and the list is in order of probability, high to low, so that the index is equivalent to the ranking:
-    - [[geneName, probability], [geneName, probability], [geneName, probability], [geneName, probability]]
+The rank of a held out gene is computed directly from its column of the score matrix, by counting the proteins that score higher,
+ so no output is ever sorted or formatted. Supported splits of the disease genes:
+    - loo          leave one out (the default)
+    - kfold:K      K random folds
+    - random:P:R   R repeated random splits, each holding out a fraction P of the genes
+
+Completed folds are checkpointed to a journal (output-file.journal, or --journal path, see Imports/Journal.py), so an
+interrupted run resumes where it stopped when it is started again with the same arguments. Delete the journal to start over.
 
 """
 import sys
@@ -18,93 +23,202 @@ import RandomWalk as rwr
 import DiffusionKernel as dk
 import PageRank as pr
 from CacheUtils import compute_if_not_cached
-from loader import load_graph, load_start_vector
+from loader import load_compact_graph, load_disease_genes, load_start_vector
+import Evaluation
+import ResultsStore
+import Journal
+import QueryCache
+from ArgUtils import pop_option
 import time
 import numpy as np
 
+RANK_THRESHHOLD = 150
+
+
+def algorithm_name(function):
+    if function == pr.page_rank:
+        return "pr"
+    elif function == dk.diffusion_kernel:
+        return "dk"
+    elif function == rwr.random_walk:
+        return "rwr"
 
 
+ALGORITHM_FUNCTIONS = {"rwr": rwr.random_walk, "pr": pr.page_rank, "dk": dk.diffusion_kernel}
 
-def leave_one_out(function, diseaseGeneFilePath, PPI_Network, param):
-    print("Starting leaveOneOut function")
+USAGE = """Usage:
+    python3 Validation/leaveOneOut.py algorithm path-to-ppi-network path-to-disease-genes param output-file [split]
+        algorithm: Algorithms/RandomWalk.py, Algorithms/PageRank.py, Algorithms/DiffusionKernel.py or All
+        split: loo (default), kfold:K or random:P:R
+        Optional arguments: --top-k K, --journal path"""
 
-    # building list of disease genes
-    diseaseGeneFile = open(diseaseGeneFilePath, 'r')
-    allDiseaseGenes = diseaseGeneFile.read().splitlines()
-    diseaseGeneFile.close()
-   # print(allDiseaseGenes)
-    numDiseaseGenes = len(allDiseaseGenes)
-    rankThreshhold = 150
-
-    numGenesNotFound = 0
-
-    degree_list = [] #remove after graph is made (kate)
-    in_out_list = [] #remove after graph is made (kate)
-
-    graph_nodes = list(PPI_Network.nodes())
-    startVector = load_start_vector(diseaseGeneFilePath, PPI_Network)
-    startVector = (numDiseaseGenes/(numDiseaseGenes - 1)) * startVector
-    # skipping
-    for index, skipGene in enumerate(allDiseaseGenes):
-
-        # find the skip gene in the start vector, make it zero
-        index = graph_nodes.index(skipGene)
-        node_degree = PPI_Network.degree(skipGene) #remove after graph is made (kate)
-        degree_list.append(node_degree) #remove after graph is made (kate)
-        newStartVector = startVector.copy()
-        newStartVector[index] = 0
-     #   startVector[index] = 0 
-        priors_vector = np.zeros(PPI_Network.number_of_nodes())
-        if function == pr.page_rank:
-            priors_file_path = find_priors_file(diseaseGeneFilePath)
-            priors_vector = pr.load_priors(priors_file_path, PPI_Network)
-            priors_vector[index] = 0
-
-        #run algorithm using modified disease gene file
-        startTime = time.time()
-        output= []
-        if function == pr.page_rank:
-            output = function(PPI_Network, newStartVector, priors_vector, param)
-        else:
-            print("sum of start vector:", np.sum(startVector))
-            output = function(PPI_Network, newStartVector, param)
-        endTime = time.time()
-        print("finished algorithm. Time elapsed:", endTime - startTime)
-
-        #find the predicted probability of the omitted gene and add it to the current sum
-        startTime = time.time()
-        foundGene = False
-        for i in range(rankThreshhold):
-            if output[i][0] == skipGene:
-                foundGene = True
-                print("Found the gene: ", skipGene, "at rank: ", i)
-                in_out_list.append(1) #remove after graph is made (kate)
-                break
-        if not foundGene:
-            numGenesNotFound +=1
-            in_out_list.append(-1) #remove after graph is made (kate)
-
-        endTime = time.time()
-    
-    # write the results of leave one out to a file
-    disease_name = diseaseGeneFilePath.split(".")[0]
-    output_name = "leave_one_out_1" + disease_name[5:]
+
+def algorithm_functions(algorithm):
+    """
+    Algorithms of an algorithm argument: the path of an algorithm script, or All for all three.
+    """
+    if algorithm == "Algorithms/DiffusionKernel.py":
+        return [dk.diffusion_kernel]
+    elif algorithm == "Algorithms/PageRank.py":
+        return [pr.page_rank]
+    elif algorithm == "Algorithms/RandomWalk.py":
+        return [rwr.random_walk]
+    elif algorithm == "All":
+        print("Starting leave one out for all three algorithms")
+        return [rwr.random_walk, pr.page_rank, dk.diffusion_kernel]
+    return []
+
+
+def fold_score_function(function, diseaseGeneFilePath, PPI_Network, param, topK=None):
+    """
+    Returns a function that maps an N x F boolean training mask to the N x F scores of the given algorithm.
+    With topK, random walk and PageRank iterate until the top topK proteins of every fold are certified.
+    """
     if function == pr.page_rank:
-        output_name = output_name + "_pr.tsv"
+        priors_vector = pr.load_priors(find_priors_file(diseaseGeneFilePath), PPI_Network)
+        diseaseGenes = load_start_vector(diseaseGeneFilePath, PPI_Network) != 0
+
+        def score_folds(mask):
+            start = Evaluation.normalize_columns(mask)
+            # only the held out genes of every fold lose their prior, other proteins in the priors file keep theirs
+            heldout = diseaseGenes[:, np.newaxis] & ~mask
+            priors = Evaluation.normalize_columns(np.where(heldout, 0, priors_vector[:, np.newaxis]))
+            return pr.rank_genes(PPI_Network, start, priors, param, topK=topK)
     elif function == dk.diffusion_kernel:
-        output_name = output_name + "_dk.tsv"
-    elif function == rwr.random_walk:
-        output_name = output_name + "_rwr.tsv"
-    with open(output_name, "w") as output:
-        for i in range(len(allDiseaseGenes)):
-            output_string = allDiseaseGenes[i] + "\t" +str(degree_list[i]) + "\t" +str(in_out_list[i]) + "\n"
-            output.write(output_string)
-    
-    print("------------------------\nFinished running algorithm with all disease genes left out\nCalculating mean squared difference")
+        def score_folds(mask):
+            return dk.diffusion_kernel_scores(PPI_Network, Evaluation.normalize_columns(mask), param)
+    else:
+        def score_folds(mask):
+            return rwr.random_walk_scores(PPI_Network, Evaluation.normalize_columns(mask), param, topK=topK)
+    return score_folds
+
+
+def make_folds(split, numGenes):
+    """
+    Parses a split description (loo, kfold:K or random:P:R) into a list of folds.
+    """
+    parts = split.split(":")
+    if parts[0] == "kfold":
+        return Evaluation.k_fold_splits(numGenes, int(parts[1]))
+    if parts[0] == "random":
+        return Evaluation.random_splits(numGenes, float(parts[1]), int(parts[2]))
+    return Evaluation.leave_one_out_folds(numGenes)
+
+
+def journaled_cross_validation(journal, function, diseaseGeneFilePath, param, score_folds, allDiseaseGenes, geneIndexes, folds,
+                               numNodes, excludeTraining=False):
+    """
+    Runs only the folds that are not in the journal yet, Journal.BATCH_SIZE folds at a time, and appends every finished
+    batch to the journal.
+
+    @returns: list of rank arrays, one per fold (from the journal or from this run)
+    """
+    algorithm = algorithm_name(function)
+    foldGenes = [[allDiseaseGenes[i] for i in fold] for fold in folds]
+    ranks = [journal.lookup(algorithm, diseaseGeneFilePath, param, f, foldGenes[f], excludeTraining) for f in range(len(folds))]
+    pending = [f for f in range(len(folds)) if ranks[f] is None]
+    if len(pending) < len(folds):
+        print(len(folds) - len(pending), "of", len(folds), "folds already completed, skipping them")
+
+    def checkpoint(positions, batchRanks):
+        done = [pending[p] for p in positions]
+        journal.append(algorithm, diseaseGeneFilePath, param, done, [foldGenes[f] for f in done], batchRanks, excludeTraining)
+        for f, foldRanks in zip(done, batchRanks):
+            ranks[f] = foldRanks
+        print("checkpoint:", len(folds) - sum(r is None for r in ranks), "of", len(folds), "folds completed")
+
+    Evaluation.cross_validate(score_folds, geneIndexes, [folds[f] for f in pending], numNodes, Journal.BATCH_SIZE,
+                              excludeTraining, checkpoint)
+    return [np.asarray(foldRanks, dtype=np.int64) for foldRanks in ranks]
+
+
+def disease_gene_indexes(diseaseGeneFilePath, PPI_Network):
+    """
+    @returns: (list of the disease genes that are in the network, numpy array of their node indexes)
+    """
+    node_index = {node: i for i, node in enumerate(PPI_Network.nodes())}
+    allDiseaseGenes = []
+    for gene in load_disease_genes(diseaseGeneFilePath):
+        if gene in node_index:
+            allDiseaseGenes.append(gene)
+        else:
+            print("Skipping", gene, "- it is not in the PPI network")
+    return allDiseaseGenes, np.array([node_index[gene] for gene in allDiseaseGenes])
+
+
+def cross_validation(function, diseaseGeneFilePath, PPI_Network, param, split="loo", excludeTraining=False, topK=None,
+                     journal=None):
+    """
+    Holds out disease genes according to split, and ranks every held out gene with the remaining genes as start vector.
+    All folds are propagated together as one multi-column run, or in checkpointed batches if a Journal is given.
+    With topK the ranks up to topK are exact and larger ranks are approximate (see fold_score_function).
+
+    @returns: (list of disease genes in the network, list of folds, list of rank arrays, one per fold)
+    """
+    print("Starting cross validation:", split)
+
+    allDiseaseGenes, geneIndexes = disease_gene_indexes(diseaseGeneFilePath, PPI_Network)
+    folds = make_folds(split, len(allDiseaseGenes))
+
+    startTime = time.time()
+    score_folds = fold_score_function(function, diseaseGeneFilePath, PPI_Network, param, topK)
+    if journal is None:
+        ranks = Evaluation.cross_validate(score_folds, geneIndexes, folds, PPI_Network.number_of_nodes(),
+                                          excludeTraining=excludeTraining)
+    else:
+        ranks = journaled_cross_validation(journal, function, diseaseGeneFilePath, param, score_folds, allDiseaseGenes,
+                                           geneIndexes, folds, PPI_Network.number_of_nodes(), excludeTraining)
+    print("finished algorithm. Time elapsed:", time.time() - startTime)
+    return allDiseaseGenes, folds, ranks
+
+
+def leave_one_out_summary(function, diseaseGeneFilePath, PPI_Network, param, split="loo", topK=None, journal=None):
+    """
+    Runs leave one out (or another split), saves the held out ranks to the results store.
+    topK = RANK_THRESHHOLD makes the found / not found decision exact, without converging every score.
+
+    @returns: (fraction of held out genes ranked within RANK_THRESHHOLD, rank distribution summary)
+    """
+    print("Starting leaveOneOut function")
+    allDiseaseGenes, folds, ranks = cross_validation(function, diseaseGeneFilePath, PPI_Network, param, split, topK=topK,
+                                                     journal=journal)
+    return save_summary(algorithm_name(function), diseaseGeneFilePath, PPI_Network, param, split, topK, allDiseaseGenes,
+                        folds, ranks)
+
+
+def save_summary(algorithm, diseaseGeneFilePath, PPI_Network, param, split, topK, allDiseaseGenes, folds, ranks):
+    """
+    Saves the held out ranks of a finished cross validation to the results store and prints them.
+
+    @returns: (fraction of held out genes ranked within RANK_THRESHHOLD, rank distribution summary)
+    """
+    rankThreshhold = RANK_THRESHHOLD
+    heldOutGenes = [allDiseaseGenes[i] for fold in folds for i in fold]
+    ranks = np.concatenate(ranks)
+    degree_list = [PPI_Network.degree(gene) for gene in heldOutGenes]
+    in_out_list = np.where(ranks <= rankThreshhold, 1, -1)
+    for gene, rank in zip(heldOutGenes, ranks):
+        print("Held out gene: ", gene, "at rank: ", rank)
+
+    # save the results of leave one out to the results store
+    summary = Evaluation.rank_summary(ranks)
+    metadata = {"kind": "leave_one_out", "algorithm": algorithm, "network": PPI_Network.name,
+                "diseaseGenes": diseaseGeneFilePath, "split": split, "summary": summary,
+                "params": {"param": param, "rankThreshhold": rankThreshhold, "topK": topK}}
+    columns = {"gene": heldOutGenes, "degree": degree_list, "found": in_out_list, "rank": ranks}
+    runId = ResultsStore.save_table(columns, metadata)
+    print("Saved leave one out results as run", runId, "in", ResultsStore.DEFAULT_STORE_PATH)
+
+    numGenesNotFound = np.count_nonzero(in_out_list == -1)
+    print("------------------------\nFinished running algorithm with all disease genes left out")
     print("Num genes not found for this run of leave one out: ", numGenesNotFound)
-    #Find average of all squared differences
-    percentCorrectlyRankedGenes = 1 - numGenesNotFound/numDiseaseGenes
-    return percentCorrectlyRankedGenes
+    print("Rank distribution:", summary)
+    percentCorrectlyRankedGenes = 1 - numGenesNotFound/len(ranks)
+    return percentCorrectlyRankedGenes, summary
+
+
+def leave_one_out(function, diseaseGeneFilePath, PPI_Network, param, split="loo", topK=None, journal=None):
+    return leave_one_out_summary(function, diseaseGeneFilePath, PPI_Network, param, split, topK, journal)[0]
 
 
 
@@ -122,41 +236,62 @@ def find_priors_file(diseaseGeneFilePath):
     sys.exit(0)
 
 
-def main():
+def write_result(of, algorithm, pathToPPINetworkFile, pathToDiseaseGeneFile, split, result, summary, param=None):
+    of.write("Leave-one-out Validation Results:\n\nAlgorithm:\t\t{0}\nPPI Graph:\t\t{1}\nDisease Genes:\t\t{2}\nSplit:\t\t{3}\n".format(algorithm, pathToPPINetworkFile, pathToDiseaseGeneFile, split))
+    if param is not None:
+        of.write("Parameter:\t\t{0}\n".format(param))
+    of.write("Percentage Correctly Found Genes:\t\t{0}%\n".format(result*100))
+    of.write("Rank distribution:\n")
+    for key, value in summary.items():
+        of.write("\t{0}:\t\t{1}\n".format(key, value))
+    of.write("\n")
+
+
+def write_results(outputFile, results, pathToPPINetworkFile, pathToDiseaseGeneFile, split):
+    with open(outputFile, "w") as of:
+        for function, (result, summary) in results:
+            write_result(of, algorithm_name(function), pathToPPINetworkFile, pathToDiseaseGeneFile, split, result, summary)
+
 
+def main():
+    # Optional arguments: --top-k K, propagate until the ranks up to K are certified
+    #                     --journal path, checkpoint file of completed folds (default output-file.journal)
+    topK = pop_option(sys.argv, "--top-k", None, int)
+    journalPath = pop_option(sys.argv, "--journal")
+    if len(sys.argv) < 6:
+        print(USAGE)
+        sys.exit()
     algorithm = sys.argv[1]
+    functions = algorithm_functions(algorithm)
+    if not functions:
+        print("Unknown algorithm:", algorithm)
+        print(USAGE)
+        sys.exit(1)
     pathToPPINetworkFile = sys.argv[2]
     pathToDiseaseGeneFile = sys.argv[3]
     param = float(sys.argv[4])
     outputFile = sys.argv[5]
+    split = "loo"
+    if len(sys.argv) > 6:
+        split = sys.argv[6]
 
     print("loading data from files..")
-    ppiGraph = compute_if_not_cached(load_graph, pathToPPINetworkFile, fileName=pathToPPINetworkFile)
-    run_all = False
-    if algorithm == "Algorithms/DiffusionKernel.py":
-        function = dk.diffusion_kernel
-    elif algorithm == "Algorithms/PageRank.py":
-        function = pr.page_rank
-    elif algorithm == "Algorithms/RandomWalk.py":
-        function = rwr.random_walk
-    elif algorithm == "All":
-        run_all = True
-    else:
-        function = None
-    
-    if run_all:
-        print("Starting leave one out for all three algorithms")
-        leave_one_out(rwr.random_walk, pathToDiseaseGeneFile, ppiGraph, param)
-        leave_one_out(pr.page_rank, pathToDiseaseGeneFile, ppiGraph, param)
-        leave_one_out(dk.diffusion_kernel, pathToDiseaseGeneFile, ppiGraph, param)
-        print("Finished leave one out for all three algorithms")
-    else:
-        result = leave_one_out(function, pathToDiseaseGeneFile, ppiGraph, param)
+    ppiGraph = compute_if_not_cached(load_compact_graph, pathToPPINetworkFile, fileName=pathToPPINetworkFile)
 
+    if journalPath is None:
+        journalPath = Journal.journal_path(outputFile)
+    journal = Journal.Journal(journalPath, pathToPPINetworkFile, split, topK, QueryCache.network_digest(ppiGraph))
 
-    print("Saving results to:", outputFile)
-    with open(outputFile, "w") as of:
-        of.write("Leave-one-out Validation Results:\n\nAlgorithm:\t\t{0}\nPPI Graph:\t\t{1}\nDisease Genes:\t\t{2}\nPercentage Correctly Found Genes:\t\t{3}%\n\n".format(algorithm, pathToPPINetworkFile, pathToDiseaseGeneFile, result*100))
+    # the output file is rewritten after every algorithm, so finished algorithms are kept if a later one is interrupted
+    results = []
+    try:
+        for function in functions:
+            results.append((function, leave_one_out_summary(function, pathToDiseaseGeneFile, ppiGraph, param, split, topK, journal)))
+            print("Saving results to:", outputFile)
+            write_results(outputFile, results, pathToPPINetworkFile, pathToDiseaseGeneFile, split)
+    except KeyboardInterrupt:
+        print("\nInterrupted. Completed folds are saved in", journalPath, "- run the same command again to resume.")
+        sys.exit(130)
 
 
 if __name__ == '__main__':
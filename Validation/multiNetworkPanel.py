@@ -0,0 +1,171 @@
+'''
+Cross-disease panel over several PPI networks at once, e.g. STRING versions or confidence cut-offs.
+
+The networks are aligned on the union of their proteins (see Imports/MultiNetwork.py), so every disease gene and
+priors file in Data/ is read once into one seed matrix that is propagated through every network by all three
+algorithms, and the scores of all networks are ranked together. Writes
+    evaluation.tsv                          cross-disease AUROC of every algorithm on every network
+    rank-changes.tsv                        per algorithm, disease and network: how many of the top K proteins of the
+                                            first network stay in the top K, and their median absolute rank change
+    <algorithm>-<disease>-rank-changes.tsv  rank of every protein that is top K in any network, in every network,
+                                            and its rank change against the first network ("-" if a network lacks it)
+
+Usage: python3 Validation/multiNetworkPanel.py path-to-ppi-network path-to-ppi-network [...]
+    Optional arguments: --output directory (default Results/multi-network-panel), --engine dense|sparse,
+                        --top K (default 150), --rwr R, --pr BETA, --dk BETA
+'''
+
+import sys
+import os
+sys.path.insert(1, 'Algorithms/')
+sys.path.insert(1, 'Imports/')
+sys.path.insert(1, '../Algorithms/')
+sys.path.insert(1, '../Imports/')
+import numpy as np
+import PageRank as pr
+import loader
+import diseasePanel
+import DiseaseSets
+import Evaluation
+import MultiNetwork
+import Operators
+import ResultsStore
+import StringNameConverter as snc
+from ArgUtils import pop_option
+from CacheUtils import compute_if_not_cached
+
+DEFAULT_OUTPUT_PATH = "Results/multi-network-panel"
+TOP = 150
+
+
+def load_networks(paths, engine="dense"):
+    """
+    Loads every network (and, for the sparse engine, its operators) before any propagation, and aligns them.
+
+    @returns: MultiNetwork.AlignedNetworks
+    """
+    graphs = []
+    for path in paths:
+        graph = compute_if_not_cached(loader.load_compact_graph, path, fileName=path)
+        if engine == "sparse":
+            Operators.load_operators(graph)
+        graphs.append(graph)
+    networks = MultiNetwork.AlignedNetworks(graphs)
+    print("Aligned", len(graphs), "networks on", networks.number_of_nodes(), "proteins")
+    return networks
+
+
+def run_networks(networks, diseaseGeneFiles, priorsFiles, params, engine="dense"):
+    """
+    Runs all three algorithms on every disease gene file and every network.
+
+    @returns: (aligned N x k seed matrix, dict of algorithm name -> networks x N x k aligned score array)
+    """
+    seeds = DiseaseSets.load_seed_matrix(diseaseGeneFiles, networks)
+    priors = DiseaseSets.load_prior_matrix(diseaseGeneFiles, networks, priorsFiles)
+    scores = {}
+    for i, graph in enumerate(networks.graphs):
+        print("\n----- network", graph.name, "-----")
+        # seed weights only depend on the disease gene file, but priors sum to 1 over the proteins of each network
+        networkScores = diseasePanel.propagate(graph, networks.gather(i, seeds),
+                                               Evaluation.normalize_columns(networks.gather(i, priors)), params, engine)
+        for algorithm, matrix in networkScores.items():
+            if algorithm not in scores:
+                scores[algorithm] = np.empty((networks.number_of_networks(),) + seeds.shape)
+            scores[algorithm][i] = networks.scatter(i, matrix)
+    return seeds, scores
+
+
+def write_evaluation_table(path, networks, labels, names, seeds, scores):
+    with open(path, "w") as output:
+        output.write("algorithm\tnetwork\tseeds\tground truth\tAUROC\n")
+        for algorithm, aligned in scores.items():
+            for i in range(networks.number_of_networks()):
+                table = Evaluation.cross_auroc_table(networks.gather(i, aligned[i]), networks.gather(i, seeds))
+                for a in range(len(names)):
+                    for b in range(len(names)):
+                        if a != b:
+                            output.write("{0}\t{1}\t{2}\t{3}\t{4:.6f}\n".format(algorithm, labels[i], names[a], names[b],
+                                                                                 table[a, b]))
+
+
+def write_rank_change_table(path, networks, labels, ranks, changes, top, table):
+    """
+    Writes the ranks of one algorithm and disease (networks x N arrays) for the proteins in the top K of any network.
+    """
+    nodes = networks.nodes()
+    with open(path, "w") as output:
+        output.write("\t".join(["protein", "name"] + ["rank " + label for label in labels] +
+                               ["change " + label for label in labels[1:]]) + "\n")
+        for row in MultiNetwork.top_rows(ranks, top):
+            fields = [nodes[row], snc.string_to_name(table, nodes[row])]
+            fields += [str(rank) if rank else "-" for rank in ranks[:, row]]
+            fields += ["{0:+d}".format(change) if ranks[i, row] and ranks[0, row] else "-"
+                       for i, change in enumerate(changes[1:, row], start=1)]
+            output.write("\t".join(fields) + "\n")
+
+
+def rank_change_summary(ranks, changes, top):
+    """
+    @returns: list of (number of the first network's top K proteins that are top K, median absolute rank change of
+              those proteins, number of them missing), one per network
+    """
+    referenceTop = np.flatnonzero((ranks[0] > 0) & (ranks[0] <= top))
+    summary = []
+    for i in range(len(ranks)):
+        present = ranks[i, referenceTop] > 0
+        kept = np.count_nonzero(present & (ranks[i, referenceTop] <= top))
+        median = float(np.median(np.abs(changes[i, referenceTop[present]]))) if np.any(present) else float('nan')
+        summary.append((kept, median, len(referenceTop) - np.count_nonzero(present)))
+    return summary
+
+
+def main():
+    print("Starting multi-network disease panel..")
+    outputPath = pop_option(sys.argv, "--output", DEFAULT_OUTPUT_PATH)
+    engine = pop_option(sys.argv, "--engine", "dense")
+    top = pop_option(sys.argv, "--top", TOP, int)
+    params = {"rwr": pop_option(sys.argv, "--rwr", 0.4, float), "pr": pop_option(sys.argv, "--pr", pr.BETA, float),
+              "dk": pop_option(sys.argv, "--dk", 1.0, float)}
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit()
+    paths = sys.argv[1:]
+    if not os.path.isdir(outputPath):
+        os.makedirs(outputPath)
+
+    networks = load_networks(paths, engine)
+    labels = [MultiNetwork.network_label(path) for path in paths]
+    diseaseGeneFiles = DiseaseSets.find_data_files("diseasegenes")
+    priorsFiles = DiseaseSets.find_data_files("priors")
+    names = [DiseaseSets.disease_name(f) for f in diseaseGeneFiles]
+    print("disease gene files:", diseaseGeneFiles)
+    print("priors files:", priorsFiles)
+
+    seeds, scores = run_networks(networks, diseaseGeneFiles, priorsFiles, params, engine)
+
+    table = snc.load_lookup_table()
+    with open(os.path.join(outputPath, "rank-changes.tsv"), "w") as summaryFile:
+        summaryFile.write("algorithm\tdisease\tnetwork\ttop {0} kept\tmedian rank change\tmissing\n".format(top))
+        for algorithm, aligned in scores.items():
+            # one sort ranks every network and disease
+            ranks = MultiNetwork.aligned_ranks(aligned)
+            changes = MultiNetwork.rank_changes(ranks)
+            for j, path in enumerate(diseaseGeneFiles):
+                write_rank_change_table(os.path.join(outputPath, algorithm + "-" + names[j] + "-rank-changes.tsv"),
+                                        networks, labels, ranks[:, :, j], changes[:, :, j], top, table)
+                for i, (kept, median, missing) in enumerate(rank_change_summary(ranks[:, :, j], changes[:, :, j], top)):
+                    summaryFile.write("{0}\t{1}\t{2}\t{3}\t{4}\t{5}\n".format(algorithm, names[j], labels[i], kept, median,
+                                                                              missing))
+                for i, graph in enumerate(networks.graphs):
+                    metadata = {"algorithm": algorithm, "network": paths[i], "diseaseGenes": path,
+                                "params": {"param": params[algorithm]}, "panel": True, "networks": paths}
+                    ResultsStore.save_ranking(list(graph.nodes()), networks.gather(i, aligned[i, :, j]), metadata)
+
+    evaluationFile = os.path.join(outputPath, "evaluation.tsv")
+    write_evaluation_table(evaluationFile, networks, labels, names, seeds, scores)
+    print("Rank changes and", evaluationFile, "have been saved in", outputPath)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Degree corrected scores.
+
+Runs an algorithm on a disease gene set and on many random seed sets with the same degree distribution
+(see Imports/NullModel.py), and writes a z-score and an empirical p-value for every protein.
+
+Usage: python3 Validation/nullModel.py algorithm path-to-ppi-network path-to-disease-genes param output-file [samples]
+    algorithm: Algorithms/RandomWalk.py, Algorithms/PageRank.py or Algorithms/DiffusionKernel.py
+    Optional arguments: --batch N (random seed sets per multi-column run), --bin-size N (minimum degree bin size),
+                        --seed N, --engine dense|sparse, --solver fixed|aitken|anderson, --method eigh|chebyshev,
+                        --threads N
+
+PageRank uses the seed set itself as prior bias, for the real and for the random seed sets.
+"""
+import sys
+sys.path.insert(1, '../Algorithms/')
+sys.path.insert(1, 'Algorithms/')
+sys.path.insert(1, '../Imports/')
+sys.path.insert(1, 'Imports/')
+import RandomWalk as rwr
+import DiffusionKernel as dk
+import PageRank as pr
+import loader
+import time
+import numpy as np
+import NullModel
+import ParallelSpmv
+import ResultsStore
+import StringNameConverter as snc
+from ArgUtils import pop_option
+from CacheUtils import compute_if_not_cached
+
+ALGORITHMS = {
+    "Algorithms/RandomWalk.py": "rwr",
+    "Algorithms/PageRank.py": "pr",
+    "Algorithms/DiffusionKernel.py": "dk",
+}
+
+
+def score_function(algorithm, PPI_Network, param, engine="dense", solver="fixed", method="eigh"):
+    """
+    Returns a function that maps an N x b start matrix to the N x b scores of the given algorithm ("rwr", "pr" or "dk").
+    """
+    if algorithm == "pr":
+        return lambda start: pr.rank_genes(PPI_Network, start, start, param, engine, solver=solver)
+    elif algorithm == "dk":
+        return lambda start: dk.diffusion_kernel_scores(PPI_Network, start, param, method)
+    return lambda start: rwr.random_walk_scores(PPI_Network, start, param, engine, solver=solver)
+
+
+def write_scores(outputFile, nodes, stats):
+    """
+    Writes one line per protein, sorted by z-score: STRING id, display name, score, null mean, null std, z-score, p-value.
+    """
+    table = snc.load_lookup_table()
+    zscores = stats.zscores()
+    pvalues = stats.pvalues()
+    std = stats.std()
+    with open(outputFile, "w") as output:
+        output.write("protein\tname\tscore\tnull mean\tnull std\tz-score\tp-value\n")
+        for i in np.argsort(-zscores, kind="stable"):
+            output.write("{0}\t{1}\t{2:.6g}\t{3:.6g}\t{4:.6g}\t{5:.4f}\t{6:.6g}\n".format(
+                nodes[i], snc.string_to_name(table, nodes[i]), stats.observed[i], stats.mean[i], std[i], zscores[i], pvalues[i]))
+
+
+def main():
+    ParallelSpmv.threads_option(sys.argv)
+    batchSize = pop_option(sys.argv, "--batch", NullModel.BATCH_SIZE, int)
+    minBinSize = pop_option(sys.argv, "--bin-size", NullModel.MIN_BIN_SIZE, int)
+    seed = pop_option(sys.argv, "--seed", 0, int)
+    engine = pop_option(sys.argv, "--engine", "dense")
+    solver = pop_option(sys.argv, "--solver", "fixed")
+    method = pop_option(sys.argv, "--method", "eigh")
+    if len(sys.argv) < 6 or sys.argv[1] not in ALGORITHMS:
+        print(__doc__)
+        sys.exit()
+    algorithm = ALGORITHMS[sys.argv[1]]
+    pathToPPINetworkFile = sys.argv[2]
+    pathToDiseaseGeneFile = sys.argv[3]
+    param = float(sys.argv[4])
+    outputFile = sys.argv[5]
+    numSamples = int(sys.argv[6]) if len(sys.argv) > 6 else NullModel.NUM_SAMPLES
+
+    print("loading data from files..")
+    PPI_Network = compute_if_not_cached(loader.load_compact_graph, pathToPPINetworkFile, fileName=pathToPPINetworkFile)
+    seedVector = loader.load_start_vector(pathToDiseaseGeneFile, PPI_Network)
+    degrees = np.array([PPI_Network.degree(node) for node in PPI_Network.nodes()])
+
+    startTime = time.time()
+    stats = NullModel.null_model(score_function(algorithm, PPI_Network, param, engine, solver, method), seedVector, degrees,
+                                 numSamples, batchSize, minBinSize, seed)
+    print("finished null model. Time elapsed:", time.time() - startTime)
+
+    nodes = list(PPI_Network.nodes())
+    metadata = {"kind": "null_model", "algorithm": algorithm, "network": pathToPPINetworkFile,
+                "diseaseGenes": pathToDiseaseGeneFile,
+                "params": {"param": param, "samples": numSamples, "binSize": minBinSize, "seed": seed}}
+    columns = {"protein": nodes, "score": stats.observed, "mean": stats.mean, "std": stats.std(),
+               "zscore": stats.zscores(), "pvalue": stats.pvalues()}
+    runId = ResultsStore.save_table(columns, metadata)
+    print("Saved null model as run", runId, "in", ResultsStore.DEFAULT_STORE_PATH)
+
+    write_scores(outputFile, nodes, stats)
+    print("Saving results to:", outputFile)
+
+
+if __name__ == '__main__':
+    main()
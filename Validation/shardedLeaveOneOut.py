@@ -0,0 +1,181 @@
+"""
+Leave one out (or k-fold / random split) validation sharded over many worker processes and hosts.
+
+A campaign (algorithms x disease gene files x parameters) is cut into work units of one algorithm, disease gene file,
+parameter and batch of folds, written to a queue directory (see Imports/WorkQueue.py). Workers anywhere that can see
+the directory claim units with atomic lock files, run them, and write their held out ranks next to them; merge then
+builds the same summaries and results store entries as leaveOneOut.py. No broker is needed, and a unit whose worker
+died is picked up again by another worker once its lease runs out.
+
+Usage:
+    python3 Validation/shardedLeaveOneOut.py submit queue-dir algorithm path-to-ppi-network params split disease-gene-files ...
+        algorithm: Algorithms/RandomWalk.py, Algorithms/PageRank.py, Algorithms/DiffusionKernel.py or All
+        params: comma separated, e.g. 0.2,0.4,0.6
+        split: loo, kfold:K or random:P:R
+        Optional arguments: --top-k K, --fold-batch N (folds per unit, default 50)
+    python3 Validation/shardedLeaveOneOut.py work queue-dir [--workers N] [--lease S] [--max-units N]
+        runs N local worker processes (default 1) until no unit is left; start it on every host
+    python3 Validation/shardedLeaveOneOut.py status queue-dir [--lease S]
+    python3 Validation/shardedLeaveOneOut.py merge queue-dir output-file
+
+Paths are stored as given, so run every command from the repository root with the same relative paths on all hosts
+(or use absolute paths on the shared file system).
+"""
+import sys
+import multiprocessing
+sys.path.insert(1, '../Imports/')
+sys.path.insert(1, 'Imports/')
+import numpy as np
+import leaveOneOut
+import Evaluation
+import Journal
+import WorkQueue
+from ArgUtils import pop_option
+from CacheUtils import compute_if_not_cached
+from loader import load_compact_graph
+
+_graphs = {}
+
+
+def load_network(path):
+    # one graph per worker process, from the pickle cache
+    if path not in _graphs:
+        _graphs[path] = compute_if_not_cached(load_compact_graph, path, fileName=path)
+    return _graphs[path]
+
+
+def make_units(PPI_Network, functions, diseaseGeneFiles, params, split, foldBatch):
+    """
+    @returns: dict of unit id -> unit, one unit per algorithm, disease gene file, parameter and batch of foldBatch folds
+    """
+    units = {}
+    for diseaseGeneFilePath in diseaseGeneFiles:
+        allDiseaseGenes, geneIndexes = leaveOneOut.disease_gene_indexes(diseaseGeneFilePath, PPI_Network)
+        folds = leaveOneOut.make_folds(split, len(allDiseaseGenes))
+        for function in functions:
+            for param in params:
+                for start in range(0, len(folds), foldBatch):
+                    batch = list(range(start, min(start + foldBatch, len(folds))))
+                    unitId = "{0:06d}".format(len(units))
+                    units[unitId] = {"algorithm": leaveOneOut.algorithm_name(function), "diseaseGenes": diseaseGeneFilePath,
+                                     "param": param, "folds": batch,
+                                     "genes": [[allDiseaseGenes[i] for i in folds[f]] for f in batch]}
+    return units
+
+
+def run_unit(job, unit):
+    """
+    Ranks the held out genes of the folds of one unit.
+
+    @returns: {"ranks": list with the ranks of the held out genes of every fold}
+    """
+    PPI_Network = load_network(job["network"])
+    allDiseaseGenes, geneIndexes = leaveOneOut.disease_gene_indexes(unit["diseaseGenes"], PPI_Network)
+    folds = leaveOneOut.make_folds(job["split"], len(allDiseaseGenes))
+    batch = [folds[f] for f in unit["folds"]]
+    if [[allDiseaseGenes[i] for i in fold] for fold in batch] != unit["genes"]:
+        raise ValueError("The folds of {0} on this host differ from the submitted ones; check that every host uses the same "
+                         "network and disease gene files".format(unit["diseaseGenes"]))
+    function = leaveOneOut.ALGORITHM_FUNCTIONS[unit["algorithm"]]
+    score_folds = leaveOneOut.fold_score_function(function, unit["diseaseGenes"], PPI_Network, unit["param"], job["topK"])
+    ranks = Evaluation.cross_validate(score_folds, geneIndexes, batch, PPI_Network.number_of_nodes())
+    return {"ranks": [[int(rank) for rank in foldRanks] for foldRanks in ranks]}
+
+
+def worker(queueDirectory, lease, maxUnits):
+    done = WorkQueue.WorkQueue(queueDirectory).work(run_unit, lease, maxUnits)
+    print("Worker finished", done, "units")
+
+
+def submit(queueDirectory):
+    topK = pop_option(sys.argv, "--top-k", None, int)
+    foldBatch = pop_option(sys.argv, "--fold-batch", Journal.BATCH_SIZE, int)
+    if len(sys.argv) < 8:
+        print(__doc__)
+        sys.exit()
+    functions = leaveOneOut.algorithm_functions(sys.argv[3])
+    if not functions:
+        print("Unknown algorithm:", sys.argv[3])
+        print(__doc__)
+        sys.exit(1)
+    pathToPPINetworkFile = sys.argv[4]
+    params = [float(p) for p in sys.argv[5].split(",")]
+    split = sys.argv[6]
+    diseaseGeneFiles = sys.argv[7:]
+
+    PPI_Network = load_network(pathToPPINetworkFile)
+    units = make_units(PPI_Network, functions, diseaseGeneFiles, params, split, foldBatch)
+    job = {"kind": "leave_one_out", "network": pathToPPINetworkFile, "split": split, "topK": topK}
+    added = WorkQueue.WorkQueue(queueDirectory).submit(job, units)
+    print("Submitted", added, "of", len(units), "units to", queueDirectory)
+
+
+def work(queueDirectory):
+    numWorkers = pop_option(sys.argv, "--workers", 1, int)
+    lease = pop_option(sys.argv, "--lease", WorkQueue.DEFAULT_LEASE, float)
+    maxUnits = pop_option(sys.argv, "--max-units", None, int)
+    if numWorkers == 1:
+        worker(queueDirectory, lease, maxUnits)
+        return
+    processes = [multiprocessing.Process(target=worker, args=(queueDirectory, lease, maxUnits)) for _ in range(numWorkers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def status(queueDirectory):
+    lease = pop_option(sys.argv, "--lease", WorkQueue.DEFAULT_LEASE, float)
+    queue = WorkQueue.WorkQueue(queueDirectory)
+    job = queue.job()
+    print("Job:", job["network"], "split", job["split"], "top k", job["topK"])
+    counts = queue.status(lease)
+    print("{0} units: {1} done, {2} running, {3} stale, {4} pending".format(
+        sum(counts.values()), counts["done"], counts["running"], counts["stale"], counts["pending"]))
+
+
+def merge(queueDirectory):
+    if len(sys.argv) < 4:
+        print(__doc__)
+        sys.exit()
+    outputFile = sys.argv[3]
+    queue = WorkQueue.WorkQueue(queueDirectory)
+    job = queue.job()
+    results = queue.results()
+    unitIds = queue.unit_ids()
+    if len(results) < len(unitIds):
+        print(len(unitIds) - len(results), "of", len(unitIds), "units are not finished yet, run merge again when they are")
+        sys.exit(1)
+
+    # units of one algorithm, disease gene file and parameter, in fold order
+    groups = {}
+    for unitId in unitIds:
+        unit = queue.unit(unitId)
+        groups.setdefault((unit["algorithm"], unit["diseaseGenes"], unit["param"]), []).append((unit, results[unitId]))
+    PPI_Network = load_network(job["network"])
+    with open(outputFile, "w") as of:
+        for (algorithm, diseaseGeneFilePath, param), group in groups.items():
+            allDiseaseGenes, geneIndexes = leaveOneOut.disease_gene_indexes(diseaseGeneFilePath, PPI_Network)
+            folds = leaveOneOut.make_folds(job["split"], len(allDiseaseGenes))
+            ranks = [None] * len(folds)
+            for unit, result in group:
+                for f, foldRanks in zip(unit["folds"], result["ranks"]):
+                    ranks[f] = np.asarray(foldRanks, dtype=np.int64)
+            result, summary = leaveOneOut.save_summary(algorithm, diseaseGeneFilePath, PPI_Network, param, job["split"],
+                                                       job["topK"], allDiseaseGenes, folds, ranks)
+            leaveOneOut.write_result(of, algorithm, job["network"], diseaseGeneFilePath, job["split"], result, summary, param)
+    print("Saving results to:", outputFile)
+
+
+COMMANDS = {"submit": submit, "work": work, "status": status, "merge": merge}
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in COMMANDS:
+        print(__doc__)
+        sys.exit()
+    COMMANDS[sys.argv[1]](sys.argv[2])
+
+
+if __name__ == '__main__':
+    main()
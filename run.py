@@ -4,6 +4,7 @@
 
 
 from signal import signal, SIGINT
+import importlib.util
 import subprocess
 import platform
 import sys
@@ -22,6 +23,10 @@ except ImportError:
 
 # Interface Utility Functions
 
+# Same interpreter for the algorithm/validation scripts as for this menu (matters when started from the console entry point)
+PYTHON = '"' + sys.executable + '"'
+REPOSITORY_DIRECTORIES = ["Algorithms", "Imports", "Validation", "Data"]
+
 def resetScreen():
     if platform.system() == "Windows":
         os.system("cls")
@@ -51,7 +56,7 @@ def checkDependencies():
             sys.exit(0)
         else:
             print("\nInstalling dependencies..\n")
-            subprocess.Popen(["python3", "Scripts/setup.py"]).wait()
+            subprocess.Popen([sys.executable, "Scripts/setup.py"]).wait()
             print("\nExiting script.. please restart it.\n")
             sys.exit(0)
             
@@ -88,14 +93,12 @@ def checkDependencies():
 
 
 def checkPipLibrary(lib):
+    # find_spec only locates the module, it does not import it (importing numpy, scipy and matplotlib takes seconds)
     print("checking for {0}".format(lib), end=" ")
-    error = False
-    try:
-        __import__(lib)
-    except ImportError:
+    error = importlib.util.find_spec(lib) is None
+    if error:
         print(colored("missing", "red"))
-        error = True
-    if not error:
+    else:
         print(colored("yes", "green"))
     return error 
 
@@ -148,6 +151,33 @@ def select_dataset():
     return datasets[choice]
 
 
+def select_datasets():
+    resetScreen()
+    print("\n\nSelect the PPI network datasets you'd like to compare (the first one is the reference):\n\n")
+
+    datasets = {}
+    for i, f in enumerate(get_ppi_data_files(), start=1):
+        datasets[i] = f
+        print(("\t- " + colored("{0}", "cyan") + ": {1}").format(i, f))
+
+    print("\n\n")
+    choices = []
+    while len(choices) < 2:
+        try:
+            choices = [int(c) for c in input("Select two or more datasets, separated by commas: >>").split(",")]
+        except ValueError:
+            cprint("please enter numbers separated by commas", "red")
+            choices = []
+            continue
+        if any(c < 1 or c > len(datasets) for c in choices):
+            cprint("numbers must be between 1 and {0}".format(len(datasets)), "red")
+            choices = []
+        elif len(choices) < 2:
+            cprint("select at least two datasets", "red")
+
+    return [datasets[c] for c in choices]
+
+
 def select_disease_gene_file():
     resetScreen()
     print("\n\nSelect the disease gene file you'd like to use:\n\n")
@@ -211,6 +241,8 @@ def select_algorithm(all=False):
     print("\t- " + colored("3", "cyan") + ": Random walk with restart")
     if all:
         print("\t- " + colored("4", "cyan") + ": All algorithms")
+    else:
+        print("\t- " + colored("4", "cyan") + ": Ensemble of all three algorithms, fused into one ranking")
 
     print("\n\n")
     
@@ -222,6 +254,8 @@ def select_algorithm(all=False):
     }
     if all:
         algorithms[4] = "All"
+    else:
+        algorithms[4] = "Algorithms/Ensemble.py"
 
     choice = 0
     while choice == 0:
@@ -245,6 +279,9 @@ def select_algorithm(all=False):
     if algorithms[choice] == "All":
         numeric = select_rwr_r_value(all=True)
 
+    if algorithms[choice] == "Algorithms/Ensemble.py":
+        numeric = select_fusion_method()
+
     return algorithms[choice], numeric
 
 
@@ -334,6 +371,34 @@ def select_rwr_r_value(all=False):
     return choice
 
 
+def select_fusion_method():
+    resetScreen()
+    print("\nThe ensemble runs random walk with restart, PageRank and the diffusion kernel with their default parameters, and fuses their rankings.\n\n")
+
+    print("\t- " + colored("1", "cyan") + ": Average rank")
+    print("\t- " + colored("2", "cyan") + ": Borda count")
+    print("\t- " + colored("3", "cyan") + ": Weights learned from held out disease genes")
+
+    print("\n\n")
+
+    methods = {
+        1:"rank",
+        2:"borda",
+        3:"learned"
+    }
+
+    choice = 0
+    while choice == 0:
+        try:
+            choice = int(input("Select a fusion method: >>"))
+        except ValueError:
+            cprint("please enter a number", "red")
+        if choice > len(methods):
+            cprint("number must be between 1 and {0}".format(len(methods)), "red")
+            choice = 0
+    return methods[choice]
+
+
 def select_validation():
     resetScreen()
     print("\n\nSelect the validation method you'd like to use:\n\n")
@@ -341,12 +406,16 @@ def select_validation():
     cprint("---VALIDATION---\n", "green")
     print("\t- " + colored("1", "cyan") + ": Area under ROC curve")
     print("\t- " + colored("2", "cyan") + ": Leave one out cross validation")
+    print("\t- " + colored("3", "cyan") + ": Cross-disease panel (every disease gene file in one run)")
+    print("\t- " + colored("4", "cyan") + ": Cross-network panel (the disease panel on several networks, with rank changes)")
 
     print("\n\n")
 
     validations = {
         1:"Validation/areaUnderROC.py",
-        2:"Validation/leaveOneOut.py"
+        2:"Validation/leaveOneOut.py",
+        3:"Validation/diseasePanel.py",
+        4:"Validation/multiNetworkPanel.py"
     }
 
     choice = 0
@@ -376,6 +445,14 @@ def select_output_file():
 
 def main():
     # Initialization
+    # All data, algorithm and result paths are relative to the repository, so the console entry point works from any directory
+    root = os.path.dirname(os.path.abspath(__file__))
+    if not all(os.path.isdir(os.path.join(root, d)) for d in REPOSITORY_DIRECTORIES):
+        # a regular install copies only run.py into site-packages
+        print("The Algorithms/, Imports/, Validation/ and Data/ directories were not found next to", os.path.abspath(__file__))
+        print("Install from a clone of the repository with `pip install -e .` (editable), or run `python3 run.py` in it.")
+        sys.exit(1)
+    os.chdir(root)
     signal(SIGINT, sigint_handler)
     resetScreen()
 
@@ -394,7 +471,7 @@ def main():
         algorithm, numeric = select_algorithm()
         ppiDataset = select_dataset()
         diseaseGeneFile = select_disease_gene_file()
-        if algorithm == "Algorithms/PageRank.py":
+        if algorithm in ("Algorithms/PageRank.py", "Algorithms/Ensemble.py"):
             priorBiasFile = select_prior_bias()
             if priorBiasFile == "None":
                 priorBiasFile = diseaseGeneFile
@@ -405,6 +482,8 @@ def main():
             algorithm, numeric = select_algorithm(all=True)
             ppiDataset = select_dataset()
             diseaseGeneFile = select_disease_gene_file()
+        elif validation == "Validation/multiNetworkPanel.py":
+            ppiDatasets = select_datasets()
         else:
             ppiDataset = select_dataset()
 
@@ -421,7 +500,7 @@ def main():
     if program == "algorithm":
         cprint("----Algorithm----", "green")
         print((colored("\nRunning:\t\t", "yellow") + "{0}" + colored("\n  on dataset:\t\t", "yellow") + "{1}" + colored("\n  using disease genes:\t", "yellow") + "{2}").format(algorithm, ppiDataset, diseaseGeneFile))
-        if algorithm == "Algorithms/PageRank.py":
+        if algorithm in ("Algorithms/PageRank.py", "Algorithms/Ensemble.py"):
             print((colored("  prior bias file:\t", "yellow") + "{0}").format(priorBiasFile))
         print(colored("\nSaving results to:\t", "yellow") + outputFile)
         input(colored("\nPress enter to continue (ctrl+c to cancel)..", "green"))
@@ -432,6 +511,15 @@ def main():
             print((colored("\nRunning:\t\t", "yellow") + "{0}" + colored("\n  on dataset:\t\t", "yellow") + "{1}" + colored("\n  using disease genes:\t", "yellow") + "{2}" + colored("\n\nValidating with:\t", "yellow") + "{3}").format(algorithm, ppiDataset, diseaseGeneFile, validation))
             print(colored("\nSaving results to:\t", "yellow") + outputFile)
             input(colored("\nPress enter to continue (ctrl+c to cancel)..", "green"))
+        elif validation == "Validation/diseasePanel.py":
+            cprint("\nRunning all algorithms on every disease gene file in Data/", "green")
+            print(colored("\nSaving results to:\t", "yellow") + "Results/panel")
+            input(colored("\nPress enter to continue (ctrl+c to cancel)..", "green"))
+        elif validation == "Validation/multiNetworkPanel.py":
+            cprint("\nRunning all algorithms on every disease gene file in Data/ and every selected network:", "green")
+            print("\n\t" + "\n\t".join(ppiDatasets))
+            print(colored("\nSaving results to:\t", "yellow") + "Results/multi-network-panel")
+            input(colored("\nPress enter to continue (ctrl+c to cancel)..", "green"))
         else:
             cprint("\nGenerating area under ROC curves", "green")
             print(colored("\nSaving results to:\t", "yellow") + "Results folder")
@@ -440,15 +528,20 @@ def main():
 
     # Run stuff
     if program == "algorithm":
-        cmd = "python3 {0} {1} {2} {3} {4}".format(algorithm, ppiDataset, diseaseGeneFile, numeric, outputFile)
+        cmd = PYTHON + " {0} {1} {2} {3} {4}".format(algorithm, ppiDataset, diseaseGeneFile, numeric, outputFile)
         if algorithm == "Algorithms/PageRank.py":
-            cmd = "python3 {0} {1} {2} {3} {4} {5}".format(algorithm, ppiDataset, diseaseGeneFile, priorBiasFile, numeric, outputFile)
+            cmd = PYTHON + " {0} {1} {2} {3} {4} {5}".format(algorithm, ppiDataset, diseaseGeneFile, priorBiasFile, numeric, outputFile)
+        elif algorithm == "Algorithms/Ensemble.py":
+            cmd = PYTHON + " {0} {1} {2} {3} {4} --fusion {5}".format(algorithm, ppiDataset, diseaseGeneFile, priorBiasFile, outputFile, numeric)
         os.system(cmd)
     elif validation == "Validation/leaveOneOut.py":
-        cmd = "python3 {0} {1} {2} {3} {4} {5}".format(validation, algorithm, ppiDataset, diseaseGeneFile, numeric, outputFile)
+        cmd = PYTHON + " {0} {1} {2} {3} {4} {5}".format(validation, algorithm, ppiDataset, diseaseGeneFile, numeric, outputFile)
+        os.system(cmd)
+    elif validation == "Validation/multiNetworkPanel.py":
+        cmd = PYTHON + " {0} {1}".format(validation, " ".join(ppiDatasets))
         os.system(cmd)
     else:
-        cmd = "python3 {0} {1}".format(validation, ppiDataset)
+        cmd = PYTHON + " {0} {1}".format(validation, ppiDataset)
         os.system(cmd)
 
 